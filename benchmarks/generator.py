@@ -0,0 +1,95 @@
+import argparse
+import csv
+import random
+from datetime import date, timedelta
+
+from schedule.event_types import type_cache
+from schedule.exporter import HEADER
+from schedule.recurrence import parse_rrule, set_rule
+
+DEFAULT_SEED = 2024
+FIRST_DAY = date(2024, 9, 2)
+# Учебный год: события раскладываются по этому числу дней
+DEFAULT_DAYS = 300
+# Доля событий, которые повторяются каждую неделю до конца семестра
+RECURRING_SHARE = 0.01
+SEMESTER_WEEKS = 16
+
+SUBJECTS = [
+    "Математический анализ", "Линейная алгебра", "Дискретная математика", "Базы данных",
+    "Операционные системы", "Компьютерные сети", "Программирование на Python", "Алгоритмы и структуры данных",
+    "Теория вероятностей", "Физика", "История", "Иностранный язык", "Физическая культура",
+    "Методы и средства проектирования", "Оценка опыта пользователей", "Виртуальная реальность",
+    "Машинное обучение", "Информационная безопасность", "Экономика", "Философия",
+]
+EVENT_TYPES = ["Лекция", "Практика", "Лабораторная", "Семинар", "Консультация", "Экзамен"]
+TYPE_WEIGHTS = [35, 30, 20, 10, 4, 1]
+# Расписание пар
+SLOTS = [
+    ("08:30:00", "10:00:00"), ("10:10:00", "11:40:00"), ("11:50:00", "13:20:00"),
+    ("14:00:00", "15:30:00"), ("15:40:00", "17:10:00"), ("17:20:00", "18:50:00"),
+]
+GROUPS = [f"{faculty}-{year}{number}" for faculty in ("ИСТ", "ПИ", "БИ", "ИВТ") for year in range(1, 5)
+          for number in range(1, 6)]
+
+
+def generate_events(count, seed=DEFAULT_SEED, first_day=FIRST_DAY, days=DEFAULT_DAYS,
+                    recurring_share=RECURRING_SHARE):
+    # Строки (название, дата, начало, конец, тип, правило). Одинаковые
+    # count и seed всегда дают одно и то же расписание
+    rng = random.Random(seed)
+    # Воскресенье — выходной, по субботам занятия есть
+    study_days = [first_day + timedelta(days=offset) for offset in range(days)
+                  if (first_day + timedelta(days=offset)).weekday() < 6]
+    weekly = f"FREQ=WEEKLY;COUNT={SEMESTER_WEEKS}"
+    for _ in range(count):
+        day = rng.choice(study_days)
+        start_time, end_time = rng.choice(SLOTS)
+        title = f"{rng.choice(SUBJECTS)} ({rng.choice(GROUPS)})"
+        event_type = rng.choices(EVENT_TYPES, TYPE_WEIGHTS)[0]
+        rrule = weekly if rng.random() < recurring_share else ""
+        yield title, day.isoformat(), start_time, end_time, event_type, rrule
+
+
+def write_csv(path, count, seed=DEFAULT_SEED):
+    # Формат совпадает с экспортом, поэтому файл подходит для импорта
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(HEADER)
+        writer.writerows(("",) + row for row in generate_events(count, seed))
+    return path
+
+
+def populate(db, count, seed=DEFAULT_SEED):
+    # Прямая вставка без разбора CSV — для подготовки больших баз
+    types = type_cache(db)
+    with db.transaction() as conn:
+        recurring = []
+        rows = []
+        for title, day, start_time, end_time, event_type, rrule in generate_events(count, seed):
+            row = (title, day, start_time, end_time, types.id_for(conn, event_type))
+            if rrule:
+                recurring.append((row, rrule))
+            else:
+                rows.append(row)
+        conn.executemany("INSERT INTO events (title, date, start_time, end_time, type_id) VALUES (?, ?, ?, ?, ?)",
+                         rows)
+        for row, rrule in recurring:
+            cursor = conn.execute("INSERT INTO events (title, date, start_time, end_time, type_id) "
+                                  "VALUES (?, ?, ?, ?, ?)", row)
+            set_rule(conn, cursor.lastrowid, parse_rrule(rrule))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.generator",
+                                     description="Синтетическое расписание для нагрузочных замеров")
+    parser.add_argument("path", help="CSV-файл для импорта")
+    parser.add_argument("--events", type=int, default=10000, help="число событий")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    args = parser.parse_args(argv)
+    write_csv(args.path, args.events, args.seed)
+    print(f"Сгенерировано событий: {args.events} в {args.path}")
+
+
+if __name__ == "__main__":
+    main()
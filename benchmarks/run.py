@@ -0,0 +1,330 @@
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import namedtuple
+from datetime import timedelta
+
+# Виджеты создаются без дисплея; переменную нужно задать до импорта PyQt5
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from benchmarks.generator import DEFAULT_SEED, FIRST_DAY, populate, write_csv
+from schedule import repository
+from schedule.timeutil import to_epoch
+
+DEFAULT_SIZES = (10000,)
+DEFAULT_REPEAT = 3
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+# Замедление больше чем на столько (доля) считается регрессией
+DEFAULT_THRESHOLD = 0.25
+# Разница меньше этих порогов — шум измерений, а не регрессия
+MIN_REGRESSION_SECONDS = 0.005
+MIN_REGRESSION_KIB = 256
+# Сколько строк снимка читает замер просмотра
+VIEW_ROWS = 256
+
+EXIT_OK = 0
+EXIT_REGRESSION = 1
+
+# setup(context) готовит состояние вне замера, run(state) — замеряемая операция
+Benchmark = namedtuple("Benchmark", "name setup run needs_qt")
+Measurement = namedtuple("Measurement", "median_s min_s peak_kib")
+
+
+class Context:
+    # Общие для всех замеров одного размера: сгенерированный CSV и заполненная база
+    def __init__(self, workdir, size, seed):
+        self.workdir = workdir
+        self.size = size
+        self.csv_path = write_csv(os.path.join(workdir, f"events_{size}.csv"), size, seed)
+        self.db = repository.open_database(os.path.join(workdir, f"events_{size}.db"))
+        populate(self.db, size, seed)
+        self.counter = 0
+        self._snapshot_path = None
+
+    def fresh_path(self, suffix):
+        self.counter += 1
+        return os.path.join(self.workdir, f"run_{self.counter}{suffix}")
+
+    def snapshot_path(self):
+        # Снимок той же базы нужен только замерам снимков, поэтому пишется по первому запросу
+        if self._snapshot_path is None:
+            from schedule.snapshot import export_snapshot
+            self._snapshot_path = export_snapshot(self.db, os.path.join(self.workdir, f"events_{self.size}.snap")).path
+        return self._snapshot_path
+
+    def close(self):
+        self.db.close()
+
+
+def _import_setup(context):
+    return repository.open_database(context.fresh_path(".db")), context.csv_path
+
+
+def _import_run(state):
+    from schedule.importer import import_csv
+    db, path = state
+    try:
+        import_csv(db, path)
+    finally:
+        db.close()
+
+
+def _export_run(state):
+    from schedule.exporter import export_events
+    context, path = state
+    export_events(context.db, path)
+
+
+def _import_snapshot_setup(context):
+    return repository.open_database(context.fresh_path(".db")), context.snapshot_path()
+
+
+def _import_snapshot_run(state):
+    from schedule.snapshot import import_snapshot
+    db, path = state
+    try:
+        import_snapshot(db, path)
+    finally:
+        db.close()
+
+
+def _export_snapshot_run(state):
+    from schedule.snapshot import export_snapshot
+    context, path = state
+    export_snapshot(context.db, path)
+
+
+def _view_snapshot_run(path):
+    # Открытие для просмотра: проверка контрольной суммы и первый экран таблицы
+    from schedule.snapshot import Snapshot
+    with Snapshot(path) as snapshot:
+        for index in range(min(VIEW_ROWS, len(snapshot))):
+            snapshot.row(index)
+
+
+def _model_setup(context):
+    from PyQt5.QtWidgets import QTableView
+    from gui.event_table_model import RESIZE_PRECISION_ROWS, EventTableModel
+    model = EventTableModel(context.db)
+    view = QTableView()
+    view.setModel(model)
+    view.horizontalHeader().setResizeContentsPrecision(RESIZE_PRECISION_ROWS)
+    return context, model, view
+
+
+def _loaded_model_setup(context):
+    # Сортировка и поиск выполняются над уже загруженной таблицей
+    from schedule.query import EventQuery
+    state = _model_setup(context)
+    state[1].set_query(EventQuery())
+    return state
+
+
+def _load_events_run(state):
+    # То же, что EventManager.load_events: первая страница и ширина столбцов
+    from schedule.query import EventQuery
+    _, model, view = state
+    model.set_query(EventQuery())
+    view.resizeColumnsToContents()
+
+
+def _sort_by_title_run(state):
+    from PyQt5.QtCore import Qt
+    _, model, _ = state
+    model.sort(1, Qt.AscendingOrder)
+
+
+def _search_run(state):
+    context, model, _ = state
+    model.set_query(repository.event_query(context.db, text="лекция алгебра"))
+
+
+def _filter_by_date_run(state):
+    context, model, _ = state
+    model.set_query(repository.event_query(context.db, "2024-10-01", "2024-10-07"))
+    while model.canFetchMore():
+        model.fetchMore()
+
+
+def _reminders_run(context):
+    # check_upcoming_events: очередь напоминаний от начала учебного года
+    from schedule.reminders import ReminderQueue
+    queue = ReminderQueue(context.db)
+    now = to_epoch(FIRST_DAY.isoformat(), "12:00:00")
+    queue.reload(now)
+    queue.pop_due(now + 3600)
+
+
+def _conflicts_run(context):
+    from schedule.conflicts import find_all_conflicts
+    find_all_conflicts(context.db, by_type=True)
+
+
+def _month_run(context):
+    from schedule.month_summary import load_month
+    load_month(context.db, FIRST_DAY.year, FIRST_DAY.month)
+
+
+def _statistics_run(context):
+    from schedule.event_types import PERIOD_WEEK, type_statistics
+    type_statistics(context.db, FIRST_DAY.isoformat(), "2025-06-30", PERIOD_WEEK)
+
+
+def _timetable_setup(context):
+    return context, context.fresh_path(".html")
+
+
+def _timetable_run(state):
+    # Сетка первого месяца учебного года без кэша раскладок
+    from schedule.timetable import FORMAT_HTML, export_timetable
+    context, path = state
+    export_timetable(context.db, path, FORMAT_HTML, FIRST_DAY.isoformat(),
+                     (FIRST_DAY + timedelta(days=27)).isoformat())
+
+
+def _same(context):
+    return context
+
+
+BENCHMARKS = [
+    Benchmark("import_csv", _import_setup, _import_run, False),
+    Benchmark("export_csv", lambda context: (context, context.fresh_path(".csv")), _export_run, False),
+    Benchmark("import_snapshot", _import_snapshot_setup, _import_snapshot_run, False),
+    Benchmark("export_snapshot", lambda context: (context, context.fresh_path(".snap")), _export_snapshot_run, False),
+    Benchmark("view_snapshot", lambda context: context.snapshot_path(), _view_snapshot_run, False),
+    Benchmark("load_events", _model_setup, _load_events_run, True),
+    Benchmark("sort_by_title", _loaded_model_setup, _sort_by_title_run, True),
+    Benchmark("search_events", _loaded_model_setup, _search_run, True),
+    Benchmark("filter_by_date", _loaded_model_setup, _filter_by_date_run, True),
+    Benchmark("check_upcoming_events", _same, _reminders_run, False),
+    Benchmark("find_conflicts", _same, _conflicts_run, False),
+    Benchmark("month_summary", _same, _month_run, False),
+    Benchmark("type_statistics", _same, _statistics_run, False),
+    Benchmark("timetable_html", _timetable_setup, _timetable_run, False),
+]
+
+
+def measure(benchmark, context, repeat):
+    # Время — по repeat запускам без трассировки памяти; пик памяти — отдельным
+    # запуском под tracemalloc, который сам замедляет Python-код
+    timings = []
+    for _ in range(repeat):
+        state = benchmark.setup(context)
+        started = time.perf_counter()
+        benchmark.run(state)
+        timings.append(time.perf_counter() - started)
+
+    state = benchmark.setup(context)
+    tracemalloc.start()
+    try:
+        benchmark.run(state)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return Measurement(statistics.median(timings), min(timings), peak // 1024)
+
+
+def run_suite(sizes, repeat, seed, selected=None, log=print):
+    app = None
+    try:
+        from PyQt5.QtWidgets import QApplication
+        app = QApplication.instance() or QApplication(sys.argv[:1])
+    except ImportError:
+        log("PyQt5 не установлен: замеры модели таблицы пропущены")
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="schedule-bench-") as workdir:
+        for size in sizes:
+            log(f"Подготовка: {size} событий")
+            context = Context(workdir, size, seed)
+            try:
+                results[str(size)] = {}
+                for benchmark in BENCHMARKS:
+                    if selected and benchmark.name not in selected:
+                        continue
+                    if benchmark.needs_qt and app is None:
+                        continue
+                    measurement = measure(benchmark, context, repeat)
+                    results[str(size)][benchmark.name] = measurement._asdict()
+                    log(f"  {benchmark.name:<22} {measurement.median_s * 1000:10.1f} мс"
+                        f" {measurement.peak_kib:10d} КиБ")
+            finally:
+                context.close()
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "seed": seed,
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def compare(report, baseline, threshold=DEFAULT_THRESHOLD):
+    # Список (размер, замер, что ухудшилось, было, стало)
+    regressions = []
+    for size, operations in report["results"].items():
+        for name, current in operations.items():
+            previous = baseline.get("results", {}).get(size, {}).get(name)
+            if previous is None:
+                continue
+            if (current["median_s"] > previous["median_s"] * (1 + threshold)
+                    and current["median_s"] - previous["median_s"] > MIN_REGRESSION_SECONDS):
+                regressions.append((size, name, "время, с", previous["median_s"], current["median_s"]))
+            if (current["peak_kib"] > previous["peak_kib"] * (1 + threshold)
+                    and current["peak_kib"] - previous["peak_kib"] > MIN_REGRESSION_KIB):
+                regressions.append((size, name, "память, КиБ", previous["peak_kib"], current["peak_kib"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run",
+                                     description="Замеры основных операций на синтетическом расписании")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="размеры расписания, например 10000 100000 1000000")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--only", nargs="+", choices=[benchmark.name for benchmark in BENCHMARKS],
+                        help="запустить только эти замеры")
+    parser.add_argument("--output", help="сохранить результаты в JSON")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="JSON с эталонными результатами")
+    parser.add_argument("--save-baseline", action="store_true", help="записать результаты как новый эталон")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="допустимое замедление, доля (по умолчанию 0.25)")
+    args = parser.parse_args(argv)
+
+    report = run_suite(args.sizes, args.repeat, args.seed, args.only)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        print(f"Эталон сохранён в {args.baseline}")
+        return EXIT_OK
+
+    if not os.path.exists(args.baseline):
+        print("Эталона нет — сравнивать не с чем (см. --save-baseline)")
+        return EXIT_OK
+    with open(args.baseline, encoding="utf-8") as file:
+        baseline = json.load(file)
+    regressions = compare(report, baseline, args.threshold)
+    for size, name, metric, previous, current in regressions:
+        print(f"РЕГРЕССИЯ {name} ({size} событий), {metric}: {previous:g} → {current:g}")
+    if not regressions:
+        print("Регрессий нет")
+    return EXIT_REGRESSION if regressions else EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
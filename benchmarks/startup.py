@@ -0,0 +1,74 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.generator import DEFAULT_SEED, populate
+from schedule import repository
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_EVENTS = 100000
+DEFAULT_REPEAT = 5
+# Цель: окно отрисовано меньше чем за столько миллисекунд
+TARGET_FIRST_PAINT_MS = 300
+
+EXIT_OK = 0
+EXIT_SLOW = 1
+
+
+def prepare(workdir, events, seed):
+    # Приложение ищет базу и картинки относительно рабочего каталога
+    os.makedirs(os.path.join(workdir, "db"))
+    os.symlink(os.path.join(ROOT, "static"), os.path.join(workdir, "static"))
+    db = repository.open_database(os.path.join(workdir, "db", "schedule.db"))
+    try:
+        populate(db, events, seed)
+    finally:
+        db.close()
+
+
+def launch(workdir):
+    # Время до отрисовки считает само окно (от начала импорта main);
+    # полное время с запуском интерпретатора — отсюда
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get("QT_QPA_PLATFORM", "offscreen"),
+               SCHEDULE_STARTUP_REPORT="1")
+    started = time.perf_counter()
+    output = subprocess.run([sys.executable, os.path.join(ROOT, "main.py")], cwd=workdir, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    wall_ms = (time.perf_counter() - started) * 1000
+    report = dict(item.split("=") for line in output.splitlines() if line.startswith("first_paint_ms=")
+                  for item in line.split())
+    return float(report["first_paint_ms"]), float(report["first_page_ms"]), wall_ms
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.startup",
+                                     description="Время запуска окна на синтетическом расписании")
+    parser.add_argument("--events", type=int, default=DEFAULT_EVENTS)
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--target-ms", type=float, default=TARGET_FIRST_PAINT_MS)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="schedule-startup-") as workdir:
+        prepare(workdir, args.events, args.seed)
+        # Первый запуск прогревает файловый кэш и не учитывается
+        launch(workdir)
+        runs = [launch(workdir) for _ in range(args.repeat)]
+
+    first_paint, first_page, wall = (statistics.median(values) for values in zip(*runs))
+    print(f"Событий: {args.events}, запусков: {args.repeat}")
+    print(f"  первая отрисовка   {first_paint:8.1f} мс")
+    print(f"  первая страница    {first_page:8.1f} мс")
+    print(f"  с запуском Python  {wall:8.1f} мс (до закрытия окна)")
+    if first_paint > args.target_ms:
+        print(f"Медленнее цели {args.target_ms:g} мс")
+        return EXIT_SLOW
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+from PyQt5.QtCore import QRect, QThreadPool, Qt
+from PyQt5.QtGui import QColor, QFont
+from PyQt5.QtWidgets import QCalendarWidget
+
+from gui.workers import BackgroundTask
+from schedule.month_summary import load_month, neighbour_months
+
+# Полная полоса занятости соответствует восьмичасовому дню
+FULL_DAY_MINUTES = 8 * 60
+BUSY_BAR_HEIGHT = 3
+
+
+class EventCalendar(QCalendarWidget):
+    # Ячейки рисуются только из кэша месяцев; недостающие месяцы
+    # догружаются в фоне вместе с соседними
+    def __init__(self, db, cache, parent=None):
+        super().__init__(parent)
+        self.setGridVisible(True)
+
+        self._db = db
+        self._cache = cache
+        self._tasks = {}
+
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(1)
+        self._pool.setExpiryTimeout(-1)
+
+        self._count_font = QFont("Arial", 7, QFont.Bold)
+        self._count_color = QColor("darkblue")
+        self._busy_color = QColor("orange")
+
+        self.currentPageChanged.connect(self._request_page)
+        self._request_page(self.yearShown(), self.monthShown())
+
+    def reload(self):
+        self._request_page(self.yearShown(), self.monthShown())
+        self.updateCells()
+
+    def _request_page(self, year, month):
+        self._load((year, month))
+        for key in neighbour_months(year, month):
+            self._load(key)
+
+    def _load(self, key):
+        if key in self._cache or key in self._tasks:
+            return
+
+        task = BackgroundTask(load_month, self._db, *key)
+        version = self._cache.version
+        task.signals.finished.connect(lambda data, key=key, task=task: self._on_loaded(key, task, version, data))
+        task.signals.failed.connect(lambda _message, key=key, task=task: self._forget(key, task))
+        self._tasks[key] = task
+        self._pool.start(task)
+
+    def _forget(self, key, task):
+        # Задачу могли уже снять в shutdown, а месяц — поставить в очередь заново
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+
+    def _on_loaded(self, key, task, version, data):
+        self._forget(key, task)
+        if data is not None and self._cache.put(key, data, version):
+            self.updateCells()
+
+    def day_events(self, date):
+        key = (date.year(), date.month())
+        data = self._cache.get(key)
+        if data is None:
+            # Месяц ещё не успел загрузиться в фоне
+            data = load_month(self._db, *key)
+            self._cache.put(key, data)
+        return data.events.get(date.toString("yyyy-MM-dd"), [])
+
+    def paintCell(self, painter, rect, date):
+        super().paintCell(painter, rect, date)
+
+        data = self._cache.get((date.year(), date.month()))
+        if data is None:
+            return
+        summary = data.days.get(date.toString("yyyy-MM-dd"))
+        if summary is None:
+            return
+
+        painter.save()
+        painter.setFont(self._count_font)
+        painter.setPen(self._count_color)
+        painter.drawText(rect.adjusted(2, 1, -3, 0), Qt.AlignTop | Qt.AlignRight, str(summary.count))
+
+        busy = min(1.0, (summary.busy_minutes or 0) / FULL_DAY_MINUTES)
+        if busy > 0:
+            width = max(1, int((rect.width() - 4) * busy))
+            painter.fillRect(QRect(rect.left() + 2, rect.bottom() - BUSY_BAR_HEIGHT, width, BUSY_BAR_HEIGHT),
+                             self._busy_color)
+        painter.restore()
+
+    def shutdown(self):
+        for task in self._tasks.values():
+            task.cancel()
+        # Снятые из очереди месяцы должны загрузиться заново при следующем открытии
+        self._tasks.clear()
+        self._pool.clear()
+        self._pool.waitForDone()
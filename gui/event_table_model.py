@@ -0,0 +1,228 @@
+from PyQt5.QtCore import QAbstractTableModel, QDate, QModelIndex, Qt
+from PyQt5.QtGui import QBrush, QColor
+
+from schedule.db import CHANGE_RELOADED
+from schedule.event_store import EventStore
+from schedule.event_types import type_cache
+from schedule.profiling import profiled
+from schedule.query import EVENT_FIELDS, EventQuery
+from schedule.recurrence import describe_rrule, ensure_window, parse_rrule
+
+COLUMN_TITLES = ["ID", "Название", "Дата", "Начало", "Конец", "Тип"]
+COLUMN_FIELDS = list(EVENT_FIELDS)
+TITLE_COLUMN = 1
+DATE_COLUMN = 2
+TYPE_COLUMN = 5
+
+# Сколько строк подгружается за один вызов fetchMore
+PAGE_SIZE = 256
+# По скольким строкам оценивается ширина столбцов: по всей странице это заметная пауза
+RESIZE_PRECISION_ROWS = 64
+# Начиная с такого числа изменённых событий дешевле перечитать первую страницу
+BULK_REFRESH_IDS = 64
+
+
+class EventTableModel(QAbstractTableModel):
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self._db = db
+        self._types = type_cache(db)
+        self._store = EventStore()
+        # Пока не задан запрос (первая страница грузится в фоне), модель пуста и ничего не подгружает
+        self._loaded = False
+        self._exhausted = True
+        self._query = EventQuery()
+        self._last_key = None
+        self._rules = {}
+        self._sort_field = "event_id"
+        self._sort_desc = False
+        self._today = QDate.currentDate().toString("yyyy-MM-dd")
+
+        self._past_brush = QBrush(QColor("lightgray"))
+        self._alternate_brush = QBrush(QColor("lightblue"))
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._store)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(COLUMN_FIELDS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        record = self._store[index.row()]
+        col = index.column()
+
+        if role == Qt.DisplayRole:
+            value = record.value(col)
+            if col == TYPE_COLUMN:
+                return self._types.name(value)
+            if col == TITLE_COLUMN and record.event_id in self._rules:
+                return f"↻ {value}"
+            return "" if value is None else str(value)
+
+        if role == Qt.ToolTipRole and col == TITLE_COLUMN and record.event_id in self._rules:
+            return "Повторяется " + describe_rrule(parse_rrule(self._rules[record.event_id]))
+
+        if role == Qt.BackgroundRole:
+            # Даты в формате yyyy-MM-dd сравниваются как строки
+            if col == DATE_COLUMN and record.date < self._today:
+                return self._past_brush
+            if index.row() % 2 == 0:
+                return self._alternate_brush
+
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return COLUMN_TITLES[section]
+        return section + 1
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return False
+        return not self._exhausted
+
+    @profiled("model.fetch_more")
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._exhausted:
+            return
+
+        rows = self._fetch_page(self._page_key())
+        if len(rows) < PAGE_SIZE:
+            self._exhausted = True
+        if not rows:
+            return
+
+        first = len(self._store)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self._store.extend(rows)
+        self._last_key = self._query.page_key(rows[-1])
+        self.endInsertRows()
+
+    @profiled("model.sort")
+    def sort(self, column, order=Qt.AscendingOrder):
+        # Сортировка — это ORDER BY того же запроса, а не перестановка строк в модели
+        self._sort_field = COLUMN_FIELDS[column]
+        self._sort_desc = order == Qt.DescendingOrder
+        self._query = self._query.sorted_by(self._sort_field, self._sort_desc)
+        if self._loaded:
+            self.refresh()
+
+    def set_query(self, query, first_page=None):
+        self._query = self._with_sort(query)
+        self.refresh(first_page)
+
+    def _with_sort(self, query):
+        # Результаты поиска остаются в порядке релевантности, пока не выбран столбец
+        if query.ranked:
+            return query
+        return query.sorted_by(self._sort_field, self._sort_desc)
+
+    @profiled("model.refresh")
+    def refresh(self, first_page=None):
+        self.beginResetModel()
+        self._today = QDate.currentDate().toString("yyyy-MM-dd")
+        self._rules = dict(self._db.query("SELECT event_id, rrule FROM recurrence_rules"))
+        if self._query.window is not None:
+            ensure_window(self._db, *self._query.window)
+        rows = self._fetch_page(None) if first_page is None else first_page
+        self._store.load(rows)
+        self._last_key = self._query.page_key(rows[-1]) if rows else None
+        self._exhausted = len(self._store) < PAGE_SIZE
+        self._loaded = True
+        self.endResetModel()
+
+    @profiled("model.apply_change")
+    def apply_change(self, kind, event_ids):
+        # Изменения отдельных событий применяются к подгруженным строкам точечно.
+        # Порядок по релевантности и повторения без запроса всей выборки
+        # не восстановить — тогда выборка перечитывается
+        if not self._loaded:
+            return
+        if (kind == CHANGE_RELOADED or len(event_ids) >= BULK_REFRESH_IDS or self._query.ranked
+                or self._touches_recurring(event_ids)):
+            self.refresh()
+            return
+        for event_id in event_ids:
+            if not self._apply_event_change(event_id):
+                self.refresh()
+                return
+
+    def _touches_recurring(self, event_ids):
+        if any(event_id in self._rules for event_id in event_ids):
+            return True
+        placeholders = ", ".join("?" * len(event_ids))
+        return self._db.query_one(f"SELECT 1 FROM recurrence_rules WHERE event_id IN ({placeholders})",
+                                  event_ids) is not None
+
+    def _apply_event_change(self, event_id):
+        positions = self._store.positions(event_id, self._query.key_fields(), self._query.descending)
+        if len(positions) > 1:
+            return False
+        position = positions[0] if positions else None
+
+        row = self._query_event(event_id)
+        target = None
+        if row is not None:
+            target = self._store.insert_position(row, self._query.key_fields(), self._query.descending)
+            size = len(self._store)
+            if position is not None:
+                size -= 1
+                if target > position:
+                    target -= 1
+            # Строка за последней подгруженной придёт со следующей страницей
+            if target == size and not self._exhausted:
+                target = None
+
+        if position is not None:
+            if target == position:
+                self._store.replace(position, row)
+                self.dataChanged.emit(self.index(position, 0), self.index(position, len(COLUMN_FIELDS) - 1))
+                return True
+            self.beginRemoveRows(QModelIndex(), position, position)
+            self._store.remove(position)
+            self.endRemoveRows()
+
+        if target is not None:
+            self.beginInsertRows(QModelIndex(), target, target)
+            self._store.insert(target, row)
+            self.endInsertRows()
+        return True
+
+    def _query_event(self, event_id):
+        # Событие в текущей выборке: тот же запрос, ограниченный одним ID
+        query, params = self._query.where("events.event_id = ?", (event_id,)).compile()
+        return self._db.query_one(query, params)
+
+    def _page_key(self):
+        if not len(self._store):
+            return None
+        if self._query.ranked:
+            return self._last_key
+        # Последняя строка могла измениться после apply_change, поэтому ключ берётся из неё
+        record = self._store[len(self._store) - 1]
+        return self._query.page_key([record.value(column) for column in range(len(COLUMN_FIELDS))])
+
+    def first_page_query(self, query):
+        return self._with_sort(query).compile(limit=PAGE_SIZE, with_rank=True)
+
+    def is_loaded(self):
+        return self._loaded
+
+    def event_id(self, row):
+        return self._store[row].event_id
+
+    def current_query(self):
+        return self._query.compile(type_names=True)
+
+    def _fetch_page(self, after):
+        query, params = self._query.compile(after=after, limit=PAGE_SIZE, with_rank=True)
+        return self._db.query(query, params)
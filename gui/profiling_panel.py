@@ -0,0 +1,143 @@
+import os
+import time
+
+from PyQt5.QtCore import QObject, QTimer
+from PyQt5.QtWidgets import (
+    QDialog, QFileDialog, QHBoxLayout, QLabel, QMessageBox, QPlainTextEdit, QPushButton, QTableWidget,
+    QTableWidgetItem, QTabWidget, QVBoxLayout)
+
+from schedule.profiling import profiler
+
+STALL_ENV = "SCHEDULE_STALL_MS"
+# Период опроса цикла событий и задержка, начиная с которой интерфейс считается зависшим
+WATCHDOG_INTERVAL_MS = 50
+STALL_THRESHOLD_MS = 200
+PANEL_REFRESH_MS = 1000
+# Сколько самых затратных запросов показывать
+TOP_QUERIES = 30
+
+OPERATION_COLUMNS = ["Операция", "Вызовов", "Всего, мс", "Среднее, мс", "Максимум, мс"]
+
+
+def _stall_threshold_ms():
+    try:
+        return float(os.environ.get(STALL_ENV, STALL_THRESHOLD_MS))
+    except ValueError:
+        return STALL_THRESHOLD_MS
+
+
+class StallWatchdog(QObject):
+    # Таймер в потоке интерфейса: если он сработал сильно позже срока,
+    # всё это время цикл событий был занят и окно не отвечало
+    def __init__(self, parent=None, threshold_ms=None):
+        super().__init__(parent)
+        self._threshold = (_stall_threshold_ms() if threshold_ms is None else threshold_ms) / 1000
+        self._interval = WATCHDOG_INTERVAL_MS / 1000
+        self._last = time.perf_counter()
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self._tick)
+
+    def start(self):
+        self._last = time.perf_counter()
+        self._timer.start(WATCHDOG_INTERVAL_MS)
+
+    def stop(self):
+        self._timer.stop()
+
+    def _tick(self):
+        now = time.perf_counter()
+        lag = now - self._last - self._interval
+        self._last = now
+        if lag >= self._threshold:
+            profiler.record_stall(lag)
+
+
+class ProfilerPanel(QDialog):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Профилирование")
+        self.resize(760, 480)
+        layout = QVBoxLayout(self)
+
+        self.summary_label = QLabel()
+        layout.addWidget(self.summary_label)
+
+        tabs = QTabWidget()
+        self.operations_table = self._stats_table()
+        self.queries_table = self._stats_table()
+        self.queries_table.setHorizontalHeaderLabels(["Запрос"] + OPERATION_COLUMNS[1:])
+        self.slow_queries_text = QPlainTextEdit()
+        self.slow_queries_text.setReadOnly(True)
+        tabs.addTab(self.operations_table, "Операции")
+        tabs.addTab(self.queries_table, "Запросы")
+        tabs.addTab(self.slow_queries_text, "Медленные запросы")
+        layout.addWidget(tabs)
+
+        button_layout = QHBoxLayout()
+        reset_button = QPushButton("Сбросить")
+        reset_button.clicked.connect(self.reset)
+        dump_button = QPushButton("Сохранить в файл…")
+        dump_button.clicked.connect(self.dump)
+        close_button = QPushButton("Закрыть")
+        close_button.clicked.connect(self.close)
+        button_layout.addWidget(reset_button)
+        button_layout.addWidget(dump_button)
+        button_layout.addStretch()
+        button_layout.addWidget(close_button)
+        layout.addLayout(button_layout)
+
+        # Панель обновляется, только пока открыта
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.refresh)
+
+    def _stats_table(self):
+        table = QTableWidget(0, len(OPERATION_COLUMNS))
+        table.setHorizontalHeaderLabels(OPERATION_COLUMNS)
+        table.setEditTriggers(QTableWidget.NoEditTriggers)
+        table.verticalHeader().setVisible(False)
+        table.horizontalHeader().setStretchLastSection(True)
+        return table
+
+    def showEvent(self, event):
+        self.refresh()
+        self._timer.start(PANEL_REFRESH_MS)
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self._timer.stop()
+        super().hideEvent(event)
+
+    def refresh(self):
+        snapshot = profiler.snapshot()
+        stalls = snapshot["stalls"]
+        self.summary_label.setText(
+            f"Время работы: {snapshot['uptime_s']:.0f} с   "
+            f"Зависаний интерфейса: {stalls['count']} (самое долгое {stalls['longest_ms']:.0f} мс)   "
+            f"Медленных запросов: {len(snapshot['slow_queries'])}")
+        self._fill(self.operations_table, profiler.operations())
+        self._fill(self.queries_table, profiler.queries(TOP_QUERIES))
+        self.slow_queries_text.setPlainText("\n\n".join(
+            f"{query.duration_ms} мс [{query.thread}]\n{query.sql}\n{query.plan}"
+            for query in reversed(snapshot["slow_queries"])))
+
+    def _fill(self, table, rows):
+        table.setRowCount(len(rows))
+        for row, stats in enumerate(rows):
+            mean = stats.total_ms / stats.count if stats.count else 0
+            values = [stats.name, str(stats.count), f"{stats.total_ms:.1f}", f"{mean:.2f}", f"{stats.max_ms:.1f}"]
+            for column, value in enumerate(values):
+                table.setItem(row, column, QTableWidgetItem(value))
+        table.resizeColumnsToContents()
+
+    def reset(self):
+        profiler.reset()
+        self.refresh()
+
+    def dump(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Сохранить статистику", "profile.json", "JSON (*.json)")
+        if not path:
+            return
+        try:
+            profiler.dump(path)
+        except OSError as e:
+            QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить статистику: {e}")
@@ -0,0 +1,74 @@
+from datetime import date
+
+from PyQt5.QtCore import QDate
+from PyQt5.QtWidgets import QComboBox, QDateEdit, QLineEdit
+
+from schedule.recurrence import (
+    FREQ_DAILY, FREQ_WEEKLY, RecurrenceRule, describe_rrule, series_end)
+from schedule.timeutil import DATE_FORMAT, normalize_date
+
+REPEAT_PRESETS = [
+    ("Не повторять", None),
+    ("Каждый день", (FREQ_DAILY, 1, ())),
+    ("Каждую неделю", (FREQ_WEEKLY, 1, ())),
+    ("Каждые 2 недели", (FREQ_WEEKLY, 2, ())),
+]
+
+# Семестр по умолчанию — около 16 недель
+DEFAULT_SERIES_DAYS = 16 * 7
+
+
+class RecurrenceInputs:
+    # Поля повторения для диалогов добавления и редактирования события
+    def __init__(self, layout, date_input, rule=None):
+        self._date_input = date_input
+
+        self.repeat_input = QComboBox()
+        for text, preset in REPEAT_PRESETS:
+            self.repeat_input.addItem(text, preset)
+
+        self.until_input = QDateEdit()
+        self.until_input.setCalendarPopup(True)
+        self.until_input.setDate(date_input.date().addDays(DEFAULT_SERIES_DAYS))
+
+        self.exdates_input = QLineEdit()
+        self.exdates_input.setPlaceholderText("ГГГГ-ММ-ДД, через запятую")
+
+        if rule is not None:
+            preset = (rule.freq, rule.interval, rule.by_weekday)
+            index = self.repeat_input.findData(preset)
+            if index == -1:
+                self.repeat_input.addItem(describe_rrule(rule), preset)
+                index = self.repeat_input.count() - 1
+            self.repeat_input.setCurrentIndex(index)
+
+            end = series_end(rule, date_input.date().toPyDate())
+            if end is not None:
+                self.until_input.setDate(QDate(end.year, end.month, end.day))
+            self.exdates_input.setText(", ".join(day.strftime(DATE_FORMAT) for day in sorted(rule.exdates)))
+
+        self.repeat_input.currentIndexChanged.connect(self._update_enabled)
+        self._update_enabled()
+
+        layout.addRow("Повторять:", self.repeat_input)
+        layout.addRow("До даты:", self.until_input)
+        layout.addRow("Кроме дат:", self.exdates_input)
+
+    def _update_enabled(self):
+        repeating = self.repeat_input.currentData() is not None
+        self.until_input.setEnabled(repeating)
+        self.exdates_input.setEnabled(repeating)
+
+    def rule(self):
+        preset = self.repeat_input.currentData()
+        if preset is None:
+            return None
+
+        freq, interval, by_weekday = preset
+        until = self.until_input.date().toPyDate()
+        if until < self._date_input.date().toPyDate():
+            raise ValueError("Дата окончания повторений раньше даты события")
+
+        exdates = [date.fromisoformat(normalize_date(value))
+                   for value in self.exdates_input.text().split(",") if value.strip()]
+        return RecurrenceRule(freq, interval, by_weekday, until=until, exdates=exdates)
@@ -0,0 +1,70 @@
+from PyQt5.QtCore import QThreadPool, QTimer
+from PyQt5.QtWidgets import QLineEdit
+
+from gui.workers import QueryTask
+from schedule.query import EventQuery
+from schedule.search import search_clause
+
+# Пауза после последнего нажатия клавиши перед запуском запроса, мс
+DEBOUNCE_MS = 200
+
+
+class SearchBar(QLineEdit):
+    def __init__(self, db, model, parent=None):
+        super().__init__(parent)
+        self.setPlaceholderText("Поиск по названию и типу…")
+        self.setClearButtonEnabled(True)
+
+        self._db = db
+        self._model = model
+        self._generation = 0
+        self._task = None
+        self._query = None
+
+        # Один поток: устаревший запрос прерывается, а не копится в очереди
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(1)
+        self._pool.setExpiryTimeout(-1)
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(DEBOUNCE_MS)
+        self._timer.timeout.connect(self._run_search)
+        self.textChanged.connect(self._on_text_changed)
+
+    def _on_text_changed(self, _text):
+        self._cancel_task()
+        self._timer.start()
+
+    def _cancel_task(self):
+        if self._task is not None:
+            self._pool.tryTake(self._task)
+            self._task.cancel()
+            self._task = None
+
+    def _run_search(self):
+        self._generation += 1
+        self._query = EventQuery(search_clause(self._db, text=self.text()))
+        sql, params = self._model.first_page_query(self._query)
+
+        self._task = QueryTask(self._db, self._generation, sql, params)
+        self._task.signals.finished.connect(self._on_results)
+        self._task.signals.failed.connect(self._on_failed)
+        self._pool.start(self._task)
+
+    def _on_results(self, generation, rows):
+        if generation != self._generation:
+            return
+        self._task = None
+        self._model.set_query(self._query, first_page=rows)
+
+    def _on_failed(self, generation, message):
+        if generation != self._generation:
+            return
+        self._task = None
+        self.setToolTip(f"Ошибка поиска: {message}")
+
+    def shutdown(self):
+        self._timer.stop()
+        self._cancel_task()
+        self._pool.waitForDone()
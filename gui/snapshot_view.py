@@ -0,0 +1,76 @@
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt
+from PyQt5.QtWidgets import QDialog, QHBoxLayout, QLabel, QPushButton, QTableView, QVBoxLayout
+
+from gui.event_table_model import COLUMN_TITLES, RESIZE_PRECISION_ROWS, TITLE_COLUMN
+from schedule.recurrence import describe_rrule, parse_rrule
+
+RULE_COLUMN = 6
+
+
+class SnapshotTableModel(QAbstractTableModel):
+    # Строки берутся прямо из снимка, открытого через mmap: в память ничего не копируется,
+    # поэтому даже снимок на миллион событий открывается сразу
+    def __init__(self, snapshot, parent=None):
+        super().__init__(parent)
+        self._snapshot = snapshot
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._snapshot)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(COLUMN_TITLES)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self._snapshot.row(index.row())
+        col = index.column()
+
+        if role == Qt.DisplayRole:
+            if col == TITLE_COLUMN and row[RULE_COLUMN]:
+                return f"↻ {row[col]}"
+            return "" if row[col] is None else str(row[col])
+
+        if role == Qt.ToolTipRole and col == TITLE_COLUMN and row[RULE_COLUMN]:
+            return "Повторяется " + describe_rrule(parse_rrule(row[RULE_COLUMN]))
+
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return COLUMN_TITLES[section]
+        return section + 1
+
+
+class SnapshotDialog(QDialog):
+    # Просмотр снимка без импорта в базу; файл закрывается вместе с окном
+    def __init__(self, snapshot, parent=None):
+        super().__init__(parent)
+        self._snapshot = snapshot
+        self.setWindowTitle(f"Снимок расписания — {snapshot.path}")
+        self.resize(760, 520)
+        layout = QVBoxLayout(self)
+
+        layout.addWidget(QLabel(f"Событий: {len(snapshot)}"))
+        table = QTableView()
+        table.setModel(SnapshotTableModel(snapshot, self))
+        table.setSelectionBehavior(QTableView.SelectRows)
+        table.setEditTriggers(QTableView.NoEditTriggers)
+        table.horizontalHeader().setResizeContentsPrecision(RESIZE_PRECISION_ROWS)
+        table.resizeColumnsToContents()
+        layout.addWidget(table)
+
+        button_layout = QHBoxLayout()
+        close_button = QPushButton("Закрыть")
+        close_button.clicked.connect(self.close)
+        button_layout.addStretch()
+        button_layout.addWidget(close_button)
+        layout.addLayout(button_layout)
+
+        self.finished.connect(lambda _result: self._snapshot.close())
@@ -0,0 +1,17 @@
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QComboBox
+
+
+class TypePicker(QComboBox):
+    # Тип выбирается из справочника (см. schedule.event_types.TypeCache),
+    # новое название можно ввести вручную — тип появится при сохранении события
+    def __init__(self, types, current="", parent=None):
+        super().__init__(parent)
+        self.setEditable(True)
+        self.setInsertPolicy(QComboBox.NoInsert)
+        self.addItems(types.names())
+        self.completer().setCaseSensitivity(Qt.CaseInsensitive)
+        self.setCurrentText(current)
+
+    def text(self):
+        return self.currentText()
@@ -0,0 +1,46 @@
+import sqlite3
+
+from PyQt5.QtCore import pyqtSignal
+from PyQt5.QtWidgets import QUndoCommand, QUndoStack
+
+
+class JournalCommand(QUndoCommand):
+    # Шаг schedule.journal.Journal на QUndoStack. К моменту push изменение уже
+    # записано в базу, поэтому первый redo(), который вызывает QUndoStack, пропускается
+    def __init__(self, stack, label):
+        super().__init__(label)
+        self._stack = stack
+        self._pushed = False
+
+    def undo(self):
+        self._stack.replay(self._stack.journal.undo)
+
+    def redo(self):
+        if not self._pushed:
+            self._pushed = True
+            return
+        self._stack.replay(self._stack.journal.redo)
+
+
+class UndoStack(QUndoStack):
+    replayed = pyqtSignal()
+    failed = pyqtSignal(str)
+
+    def __init__(self, journal, parent=None):
+        super().__init__(parent)
+        self.journal = journal
+        self.setUndoLimit(journal.limit)
+        journal.step_recorded = lambda label: self.push(JournalCommand(self, label))
+
+    def replay(self, move):
+        # Исключение из undo()/redo() QUndoStack не переживёт — ошибку отдаём сигналом
+        try:
+            move()
+        except sqlite3.Error as e:
+            self.failed.emit(str(e))
+            return
+        self.replayed.emit()
+
+    def reset(self):
+        self.journal.clear()
+        self.clear()
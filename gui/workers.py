@@ -0,0 +1,84 @@
+import sqlite3
+
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+
+
+class QuerySignals(QObject):
+    finished = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
+
+
+class QueryTask(QRunnable):
+    def __init__(self, db, generation, query, params=()):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.signals = QuerySignals()
+        self.generation = generation
+        self._db = db
+        self._query = query
+        self._params = params
+        self._conn = None
+        self._cancelled = False
+
+    def run(self):
+        if self._cancelled:
+            return
+
+        self._conn = self._db.connection()
+        try:
+            rows = self._conn.execute(self._query, self._params).fetchall()
+        except sqlite3.Error as e:
+            if not self._cancelled:
+                self.signals.failed.emit(self.generation, str(e))
+            return
+        finally:
+            self._conn = None
+
+        if not self._cancelled:
+            self.signals.finished.emit(self.generation, rows)
+
+    def cancel(self):
+        self._cancelled = True
+        conn = self._conn
+        if conn is not None:
+            # sqlite3_interrupt можно вызывать из другого потока
+            conn.interrupt()
+
+
+class ChangeRelay(QObject):
+    # Database.notify вызывается в потоке записи (например, импорта);
+    # сигнал доставляет уведомление подписчикам в поток интерфейса
+    changed = pyqtSignal(str, object)
+
+
+class TaskSignals(QObject):
+    progress = pyqtSignal(int)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+
+class BackgroundTask(QRunnable):
+    # Функция получает progress(percent) и is_cancelled() именованными аргументами
+    def __init__(self, func, *args, **kwargs):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.signals = TaskSignals()
+        self._func = func
+        self._args = args
+        self._kwargs = kwargs
+        self._cancelled = False
+
+    def run(self):
+        try:
+            result = self._func(*self._args, progress=self.signals.progress.emit,
+                                is_cancelled=self.is_cancelled, **self._kwargs)
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+            return
+        self.signals.finished.emit(result)
+
+    def cancel(self):
+        self._cancelled = True
+
+    def is_cancelled(self):
+        return self._cancelled
@@ -1,13 +1,87 @@
-import csv
+import time
+
+# Отсчёт времени запуска — до тяжёлых импортов
+STARTED = time.perf_counter()
+
+import os
 import sys
 import sqlite3
 
-from PyQt5.QtCore import QDate, QTime, Qt, QTimer
-from PyQt5.QtGui import QColor, QPixmap, QFont
+from PyQt5.QtCore import QDate, QSettings, QTime, Qt, QThreadPool, QTimer
+from PyQt5.QtGui import QPixmap, QFont, QKeySequence
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
-    QTableWidget, QTableWidgetItem, QFormLayout, QLineEdit, QDateEdit, QTimeEdit,
-    QMessageBox, QFileDialog, QDialog, QLabel, QComboBox, QCheckBox, QInputDialog, QCalendarWidget)
+    QTableView, QAbstractItemView, QFormLayout, QLineEdit, QDateEdit, QTimeEdit,
+    QMessageBox, QFileDialog, QDialog, QLabel, QComboBox, QCheckBox, QInputDialog, QListWidget,
+    QPlainTextEdit, QProgressDialog, QMenu, QDialogButtonBox, QSpinBox)
+
+from gui.event_table_model import RESIZE_PRECISION_ROWS, EventTableModel
+from gui.recurrence_inputs import RecurrenceInputs
+from gui.search_bar import SearchBar
+from gui.type_picker import TypePicker
+from gui.undo import UndoStack
+from gui.workers import BackgroundTask, ChangeRelay, QueryTask
+from schedule import repository
+from schedule.changes import ChangeWatcher
+from schedule.db import CHANGE_RELOADED, DEFAULT_DB_PATH
+from schedule.event_types import PERIOD_MONTH, PERIOD_WEEK, type_cache, type_statistics
+from schedule.journal import Journal
+from schedule.profiling import dump_on_exit, profiled, profiler
+from schedule.query import EventQuery
+from schedule.recurrence import ensure_window, get_rule
+from schedule.reminders import ReminderQueue
+from schedule.timeutil import normalize_date, now_epoch, to_epoch
+
+# Импорт и экспорт (csv), календарь (calendar), поиск конфликтов и панель профилирования
+# подключаются при первом использовании: окно должно появиться как можно раньше
+
+MAX_REMINDER_DELAY = 60 * 60
+# Настройка профилирования; действует со следующего запуска
+PROFILING_SETTING = "debug/profiling"
+# Пределы сдвига выбранных событий, в минутах
+MAX_SHIFT_MINUTES = 12 * 60
+# С этой переменной окружения окно печатает время запуска и закрывается (см. benchmarks.startup)
+STARTUP_REPORT_ENV = "SCHEDULE_STARTUP_REPORT"
+# Как часто проверять изменения, записанные другими копиями приложения
+CHANGE_POLL_MS = 1000
+
+SNAPSHOT_FILTER = "Снимок расписания (*.snap)"
+# Снимок можно открыть только для просмотра (через mmap, без записи в базу) или импортировать
+SNAPSHOT_ACTIONS = {
+    "Открыть для просмотра": False,
+    "Импортировать в расписание": True,
+}
+
+OVERLAP_CHECKS = {
+    "Разрешить": None,
+    "Пропускать пересекающиеся": False,
+    "Пропускать пересекающиеся внутри типа": True,
+}
+
+TIMETABLE_FORMATS = {
+    "HTML": "html",
+    "PDF": "pdf",
+    "iCalendar (.ics)": "ics",
+}
+
+CONFLICT_SCOPES = {
+    "Любые пересечения": False,
+    "Пересечения внутри одного типа": True,
+}
+
+STATISTICS_PERIODS = {
+    "По неделям": PERIOD_WEEK,
+    "По месяцам": PERIOD_MONTH,
+}
+
+
+def import_policies():
+    from schedule.importer import POLICY_RENUMBER, POLICY_SKIP, POLICY_UPSERT
+    return {
+        "Пропустить строку": POLICY_SKIP,
+        "Обновить событие": POLICY_UPSERT,
+        "Присвоить новый ID": POLICY_RENUMBER,
+    }
 
 
 class EventManager(QMainWindow):
@@ -16,9 +90,38 @@ class EventManager(QMainWindow):
         self.setWindowTitle("Расписание")
         self.resize(800, 600)
 
+        self.settings = QSettings("schedule", "schedule")
+        # Включается до первого соединения с БД, иначе запросы не будут замеряться
+        if self.settings.value(PROFILING_SETTING, False, type=bool):
+            profiler.enable()
+        self.profiler_panel = None
+        self.stall_watchdog = None
+        self.search_dialog = None
+        self.filter_dialog = None
+        self.calendar_dialog = None
+        self.settings_dialog = None
+        self.first_paint_ms = None
+
+        self.db = repository.open_database(DEFAULT_DB_PATH)
+        # Фоновые потоки живут всё время работы приложения, чтобы не плодить соединения с БД
+        self.task_pool = QThreadPool(self)
+        self.task_pool.setExpiryTimeout(-1)
+        self.running_tasks = set()
+        self.month_cache = None
+        self.week_cache = None
+        self.changes = ChangeRelay(self)
+        self.db.add_listener(self.changes.changed.emit)
+        self.undo_stack = UndoStack(Journal(self.db), self)
+        self.undo_stack.replayed.connect(self.reload_reminders)
+        self.undo_stack.failed.connect(self.on_undo_failed, Qt.QueuedConnection)
+        # Отслеживание включается до первого запроса: всё, что другие процессы запишут
+        # после него, дойдёт до таблицы через poll_changes
+        self.change_watcher = ChangeWatcher(self.db)
+        self.change_timer = QTimer(self)
+        self.change_timer.timeout.connect(self.poll_changes)
         self.init_ui()
-        self.create_database()
-        self.load_events()
+        self.create_notification_timer()
+        # События, напоминания и прочее загружаются после первой отрисовки окна, см. paintEvent
 
     def init_ui(self):
         container = QWidget()
@@ -53,6 +156,32 @@ class EventManager(QMainWindow):
         self.edit_button = QPushButton("Редактировать событие")
         self.edit_button.clicked.connect(self.edit_event)
 
+        # Групповые действия над всеми выделенными строками таблицы
+        self.selection_button = QPushButton("Выбранные")
+        selection_menu = QMenu(self.selection_button)
+        selection_menu.addAction("Изменить тип…", self.change_events_type)
+        selection_menu.addAction("Перенести на дату…", self.move_events)
+        selection_menu.addAction("Сдвинуть время…", self.shift_events)
+        selection_menu.addSeparator()
+        selection_menu.addAction("Удалить", self.delete_event)
+        self.selection_button.setMenu(selection_menu)
+
+        undo_action = self.undo_stack.createUndoAction(self, "Отменить")
+        undo_action.setShortcut(QKeySequence.Undo)
+        redo_action = self.undo_stack.createRedoAction(self, "Повторить")
+        redo_action.setShortcut(QKeySequence.Redo)
+        self.addActions([undo_action, redo_action])
+
+        self.undo_button = QPushButton("Отменить")
+        self.undo_button.setEnabled(False)
+        self.undo_button.clicked.connect(self.undo_stack.undo)
+        self.undo_stack.canUndoChanged.connect(self.undo_button.setEnabled)
+
+        self.redo_button = QPushButton("Повторить")
+        self.redo_button.setEnabled(False)
+        self.redo_button.clicked.connect(self.undo_stack.redo)
+        self.undo_stack.canRedoChanged.connect(self.redo_button.setEnabled)
+
         self.export_button = QPushButton("Экспортировать CSV")
         self.export_button.clicked.connect(self.export_schedule)
 
@@ -74,6 +203,9 @@ class EventManager(QMainWindow):
         button_layout.addWidget(self.add_button)
         button_layout.addWidget(self.delete_button)
         button_layout.addWidget(self.edit_button)
+        button_layout.addWidget(self.selection_button)
+        button_layout.addWidget(self.undo_button)
+        button_layout.addWidget(self.redo_button)
         button_layout.addWidget(self.export_button)
         button_layout.addWidget(self.export_txt_button)
         button_layout.addWidget(self.import_button)
@@ -81,15 +213,25 @@ class EventManager(QMainWindow):
         button_layout.addWidget(self.filter_button)
         button_layout.addWidget(self.setting_button)
 
-        self.schedule_table = QTableWidget()
-        self.schedule_table.setColumnCount(6)
-        self.schedule_table.setHorizontalHeaderLabels([
-            "ID", "Название", "Дата", "Начало", "Конец", "Тип"
-        ])
-        self.schedule_table.resizeColumnsToContents()
+        self.event_model = EventTableModel(self.db, self)
+        # Таблица и календарь обновляются по уведомлениям из записи, без перезагрузки
+        self.changes.changed.connect(self.event_model.apply_change)
+        self.changes.changed.connect(self.on_events_changed)
+
+        self.schedule_table = QTableView()
+        self.schedule_table.setModel(self.event_model)
+        self.schedule_table.setFont(QFont("Arial", 10))
+        self.schedule_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.schedule_table.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.schedule_table.verticalHeader().setDefaultSectionSize(24)
+        self.schedule_table.horizontalHeader().setResizeContentsPrecision(RESIZE_PRECISION_ROWS)
+        self.schedule_table.horizontalHeader().setSortIndicator(0, Qt.AscendingOrder)
         self.schedule_table.setSortingEnabled(True)
 
+        self.search_bar = SearchBar(self.db, self.event_model)
+
         layout.addLayout(button_layout)
+        layout.addWidget(self.search_bar)
         layout.addWidget(self.schedule_table)
 
         container.setLayout(layout)
@@ -102,27 +244,75 @@ class EventManager(QMainWindow):
         self.calendar_button.clicked.connect(self.show_calendar)
         button_layout.addWidget(self.calendar_button)
 
+        self.conflicts_button = QPushButton("Конфликты")
+        self.conflicts_button.clicked.connect(self.show_conflicts)
+        button_layout.addWidget(self.conflicts_button)
+
+        self.solver_button = QPushButton("Автоподбор")
+        self.solver_button.clicked.connect(self.auto_schedule)
+        button_layout.addWidget(self.solver_button)
+
+        self.statistics_button = QPushButton("Статистика")
+        self.statistics_button.clicked.connect(self.show_statistics)
+        button_layout.addWidget(self.statistics_button)
+
+        self.timetable_button = QPushButton("Печать расписания")
+        self.timetable_button.clicked.connect(self.export_timetable)
+        button_layout.addWidget(self.timetable_button)
+
         self.theme_button = QPushButton("Сменить тему")
         self.theme_button.clicked.connect(self.toggle_theme)
         button_layout.addWidget(self.theme_button)
 
-        self.start_notification_timer()
-
-    def create_database(self):
-        conn = sqlite3.connect("./db/schedule.db")
-        cursor = conn.cursor()
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS events (
-                event_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                date TEXT NOT NULL,
-                start_time TEXT NOT NULL,
-                end_time TEXT NOT NULL,
-                type_id INTEGER
-            )
-        """)
-        conn.commit()
-        conn.close()
+        if profiler.enabled:
+            self.profiler_button = QPushButton("Профилирование")
+            self.profiler_button.clicked.connect(self.show_profiler)
+            button_layout.addWidget(self.profiler_button)
+            from gui.profiling_panel import StallWatchdog
+            self.stall_watchdog = StallWatchdog(self)
+            self.stall_watchdog.start()
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self.first_paint_ms is None:
+            self.first_paint_ms = (time.perf_counter() - STARTED) * 1000
+            QTimer.singleShot(0, self.load_first_page)
+
+    def load_first_page(self):
+        # Первая страница читается в фоне; до её прихода таблица пуста, но окно уже отвечает
+        query = EventQuery()
+        sql, params = self.event_model.first_page_query(query)
+        task = QueryTask(self.db, 0, sql, params)
+        task.signals.finished.connect(lambda _generation, rows: self.on_first_page(task, query, rows))
+        task.signals.failed.connect(lambda _generation, message: self.on_first_page_failed(task, message))
+        self.running_tasks.add(task)
+        self.task_pool.start(task)
+
+    def on_first_page(self, task, query, rows):
+        self.running_tasks.discard(task)
+        # Если пользователь уже успел задать поиск или фильтр, первая страница не нужна
+        if not self.event_model.is_loaded():
+            self.event_model.set_query(query, first_page=rows)
+            self.schedule_table.resizeColumnsToContents()
+        self.startup_finished()
+
+    def on_first_page_failed(self, task, message):
+        self.running_tasks.discard(task)
+        QMessageBox.critical(self, "Ошибка базы данных", f"Не удалось загрузить события: {message}")
+        self.startup_finished()
+
+    def startup_finished(self):
+        first_page_ms = (time.perf_counter() - STARTED) * 1000
+        if profiler.enabled:
+            profiler.record("startup.first_paint", self.first_paint_ms / 1000)
+            profiler.record("startup.first_page", first_page_ms / 1000)
+        # Напоминания не нужны в первые миллисекунды, их очередь собирается последней
+        self.reload_reminders()
+        self.change_watcher.prune()
+        self.change_timer.start(CHANGE_POLL_MS)
+        if os.environ.get(STARTUP_REPORT_ENV):
+            print(f"first_paint_ms={self.first_paint_ms:.1f} first_page_ms={first_page_ms:.1f}", flush=True)
+            self.close()
 
     def add_event_dialog(self):
         dialog = QDialog(self)
@@ -141,13 +331,14 @@ class EventManager(QMainWindow):
         end_time_input = QTimeEdit()
         end_time_input.setTime(QTime.currentTime().addSecs(3600))
 
-        type_input = QLineEdit()
+        type_input = TypePicker(type_cache(self.db))
 
         layout.addRow("Название:", title_input)
         layout.addRow("Дата:", date_input)
         layout.addRow("Начало:", start_time_input)
         layout.addRow("Конец:", end_time_input)
         layout.addRow("Тип:", type_input)
+        recurrence = RecurrenceInputs(layout, date_input)
 
         save_button = QPushButton("Сохранить")
         save_button.clicked.connect(lambda: self.add_event(
@@ -156,86 +347,133 @@ class EventManager(QMainWindow):
             start_time_input.time().toString("HH:mm:ss"),
             end_time_input.time().toString("HH:mm:ss"),
             type_input.text(),
-            dialog
+            dialog,
+            recurrence
         ))
         layout.addWidget(save_button)
 
         dialog.exec_()
 
+    @profiled("load_events")
     def load_events(self):
-        self.schedule_table.setRowCount(0)
-
-        conn = sqlite3.connect("./db/schedule.db")
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM events")
-        events = cursor.fetchall()
-        conn.close()
+        self.event_model.set_query(EventQuery())
+        self.schedule_table.resizeColumnsToContents()
 
-        for row_idx, event in enumerate(events):
-            self.schedule_table.insertRow(row_idx)
-            for col_idx, data in enumerate(event):
-                item = QTableWidgetItem(str(data))
+    def on_events_changed(self, kind, event_ids):
+        if self.month_cache is not None:
+            self.month_cache.clear()
+        if self.week_cache is not None:
+            self.week_cache.invalidate(self.db, kind, event_ids)
+        if kind == CHANGE_RELOADED:
+            self.undo_stack.reset()
 
-                if col_idx == 2:
-                    event_date = QDate.fromString(data, "yyyy-MM-dd")
-                    if event_date < QDate.currentDate():
-                        item.setBackground(QColor("lightgray"))
+    def poll_changes(self):
+        try:
+            event_ids = self.change_watcher.poll()
+        except sqlite3.OperationalError:
+            # База занята другим процессом дольше тайм-аута: проверим на следующем тике
+            return
+        if not event_ids:
+            if event_ids is None:
+                self.reload_reminders()
+            return
+        # Шаги отмены с этими событиями вернули бы их к состоянию до чужой правки
+        if self.undo_stack.journal.touches(event_ids):
+            self.undo_stack.reset()
+        self.reload_reminders()
 
-                self.schedule_table.setItem(row_idx, col_idx, item)
+    def on_undo_failed(self, message):
+        self.undo_stack.reset()
+        self.load_events()
+        self.reload_reminders()
+        QMessageBox.warning(self, "История изменений",
+                            f"Не удалось отменить или повторить изменение, история очищена: {message}")
+
+    def selected_event_id(self):
+        index = self.schedule_table.currentIndex()
+        if not index.isValid():
+            return None
+        return self.event_model.event_id(index.row())
+
+    def selected_event_ids(self):
+        rows = sorted({index.row() for index in self.schedule_table.selectionModel().selectedRows()})
+        return [self.event_model.event_id(row) for row in rows]
+
+    def confirm_overlaps(self, date, start_time, end_time, event_id=None):
+        ensure_window(self.db, date, date)
+        from schedule.conflicts import find_overlaps
+        overlaps = find_overlaps(self.db.connection(), date, start_time, end_time, event_id, limit=5)
+        if not overlaps:
+            return True
+
+        listed = "\n".join(f"{slot.start_time[:5]}–{slot.end_time[:5]} {slot.title}" for slot in overlaps)
+        reply = QMessageBox.question(
+            self,
+            "Пересечение по времени",
+            f"Событие пересекается с уже запланированными:\n{listed}\n\nВсё равно сохранить?",
+            QMessageBox.Yes | QMessageBox.No
+        )
+        return reply == QMessageBox.Yes
 
-        self.add_styling_to_rows()
+    def read_rule(self, recurrence):
+        if recurrence is None:
+            return True, None
+        try:
+            return True, recurrence.rule()
+        except ValueError as e:
+            QMessageBox.warning(self, "Ошибка", str(e))
+            return False, None
 
-    def add_event(self, title, date, start_time, end_time, event_type, dialog):
-        if QTime.fromString(start_time, "HH:mm:ss") >= QTime.fromString(end_time, "HH:mm:ss"):
-            QMessageBox.warning(self, "Ошибка", "Время начала должно быть раньше времени окончания!")
+    def add_event(self, title, date, start_time, end_time, event_type, dialog, recurrence=None):
+        try:
+            repository.check_times(start_time, end_time)
+        except ValueError as e:
+            QMessageBox.warning(self, "Ошибка", str(e))
+            return
+        valid, rule = self.read_rule(recurrence)
+        if not valid:
+            return
+        if not self.confirm_overlaps(date, start_time, end_time):
             return
 
         try:
-            conn = sqlite3.connect("./db/schedule.db")
-            cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO events (title, date, start_time, end_time, type_id)
-                VALUES (?, ?, ?, ?, ?)
-            """, (title, date, start_time, end_time, event_type))
-            conn.commit()
+            with self.undo_stack.journal.command("добавление события"):
+                event_id = repository.add_event(self.db, title, date, start_time, end_time, event_type, rule)
+            if rule is None:
+                self.reminder_event_changed(event_id, title, date, start_time)
+            else:
+                self.reload_reminders()
             QMessageBox.information(self, "Успех", "Событие добавлено!")
             dialog.accept()
-            self.load_events()
         except sqlite3.Error as e:
             QMessageBox.critical(self, "Ошибка базы данных", f"Ошибка добавления: {str(e)}")
-        finally:
-            if conn:
-                conn.close()
 
     def edit_event(self):
-        selected_row = self.schedule_table.currentRow()
-        if selected_row == -1:
+        event_id = self.selected_event_id()
+        if event_id is None:
             QMessageBox.warning(self, "Ошибка", "Выберите событие для редактирования.")
             return
 
-        event_id = self.schedule_table.item(selected_row, 0).text()
         dialog = QDialog(self)
         dialog.setWindowTitle("Редактировать событие")
         layout = QFormLayout(dialog)
 
-        conn = sqlite3.connect("./db/schedule.db")
-        cursor = conn.cursor()
-        cursor.execute("SELECT title, date, start_time, end_time, type_id FROM events WHERE event_id = ?",
-                        (event_id,))
-        event_data = cursor.fetchone()
-        conn.close()
+        event = repository.get_event(self.db, event_id)
 
-        title_input = QLineEdit(event_data[0])
-        date_input = QDateEdit(QDate.fromString(event_data[1], "yyyy-MM-dd"))
-        start_time_input = QTimeEdit(QTime.fromString(event_data[2], "HH:mm:ss"))
-        end_time_input = QTimeEdit(QTime.fromString(event_data[3], "HH:mm:ss"))
-        type_input = QLineEdit(event_data[4])
+        title_input = QLineEdit(event.title)
+        date_input = QDateEdit(QDate.fromString(event.date, "yyyy-MM-dd"))
+        date_input.setCalendarPopup(True)
+        start_time_input = QTimeEdit(QTime.fromString(event.start_time, "HH:mm:ss"))
+        end_time_input = QTimeEdit(QTime.fromString(event.end_time, "HH:mm:ss"))
+        types = type_cache(self.db)
+        type_input = TypePicker(types, types.name(event.type_id))
 
         layout.addRow("Название:", title_input)
         layout.addRow("Дата:", date_input)
         layout.addRow("Начало:", start_time_input)
         layout.addRow("Конец:", end_time_input)
         layout.addRow("Тип:", type_input)
+        recurrence = RecurrenceInputs(layout, date_input, get_rule(self.db, event_id))
 
         save_button = QPushButton("Сохранить")
         save_button.clicked.connect(lambda: self.update_event(
@@ -244,76 +482,138 @@ class EventManager(QMainWindow):
             date_input.date().toString("yyyy-MM-dd"),
             start_time_input.time().toString("HH:mm:ss"),
             end_time_input.time().toString("HH:mm:ss"),
-            type_input.text(), save_button.clicked.connect(lambda: self.update_event(
-                event_id,
-                title_input.text(),
-                date_input.date().toString("yyyy-MM-dd"),
-                start_time_input.time().toString("HH:mm:ss"),
-                end_time_input.time().toString("HH:mm:ss"),
-                type_input.text(),
-                dialog
-            ))))
+            type_input.text(),
+            dialog,
+            recurrence
+        ))
         layout.addWidget(save_button)
 
         dialog.exec_()
 
-    def update_event(self, event_id, title, date, start_time, end_time, event_type, dialog):
-        if QTime.fromString(start_time, "HH:mm:ss") >= QTime.fromString(end_time, "HH:mm:ss"):
-            QMessageBox.warning(self, "Ошибка", "Время начала должно быть раньше времени окончания!")
+    def update_event(self, event_id, title, date, start_time, end_time, event_type, dialog, recurrence=None):
+        try:
+            repository.check_times(start_time, end_time)
+        except ValueError as e:
+            QMessageBox.warning(self, "Ошибка", str(e))
+            return
+        valid, rule = self.read_rule(recurrence)
+        if not valid:
+            return
+        if not self.confirm_overlaps(date, start_time, end_time, event_id):
             return
 
         try:
-            conn = sqlite3.connect("./db/schedule.db")
-            cursor = conn.cursor()
-            cursor.execute("""
-                    UPDATE events
-                    SET title = ?, date = ?, start_time = ?, end_time = ?, type_id = ?
-                    WHERE event_id = ?
-                """, (title, date, start_time, end_time, event_type, event_id))
-            conn.commit()
+            was_recurring = get_rule(self.db, event_id) is not None
+            with self.undo_stack.journal.command("изменение события"):
+                repository.update_event(self.db, event_id, title, date, start_time, end_time, event_type,
+                                        rule if recurrence is not None else repository.KEEP_RULE)
+            if rule is None and not was_recurring:
+                self.reminder_event_changed(event_id, title, date, start_time)
+            else:
+                self.reload_reminders()
             QMessageBox.information(self, "Успех", "Событие обновлено!")
             dialog.accept()
-            self.load_events()
         except sqlite3.Error as e:
             QMessageBox.critical(self, "Ошибка базы данных", f"Ошибка обновления: {str(e)}")
-        finally:
-            if conn:
-                conn.close()
 
     def delete_event(self):
-        selected_row = self.schedule_table.currentRow()
+        event_ids = self.selected_event_ids()
 
-        if selected_row == -1:
+        if not event_ids:
             QMessageBox.warning(self, "Ошибка", "Выберите событие для удаления.")
             return
 
-        event_id = self.schedule_table.item(selected_row, 0).text()
-
         reply = QMessageBox.question(
             self,
             "Подтвердить удаление",
-            "Вы уверены, что хотите удалить это событие?",
+            "Вы уверены, что хотите удалить это событие?" if len(event_ids) == 1
+            else f"Вы уверены, что хотите удалить выбранные события ({len(event_ids)})?",
             QMessageBox.Yes | QMessageBox.No
         )
 
         if reply == QMessageBox.Yes:
             try:
-                conn = sqlite3.connect("./db/schedule.db")
-                cursor = conn.cursor()
+                with self.undo_stack.journal.command("удаление событий"):
+                    repository.delete_events(self.db, event_ids)
+                for event_id in event_ids:
+                    self.reminders.event_deleted(event_id)
+                self.arm_notification_timer()
+
+                QMessageBox.information(self, "Успех",
+                                        "Событие удалено!" if len(event_ids) == 1 else "События удалены!")
+            except sqlite3.Error as e:
+                QMessageBox.critical(self, "Ошибка базы данных", f"Ошибка удаления: {str(e)}")
 
-                cursor.execute("DELETE FROM events WHERE event_id = ?", (event_id,))
-                conn.commit()
+    def shift_events(self):
+        event_ids = self.selected_event_ids()
+        if not event_ids:
+            QMessageBox.warning(self, "Ошибка", "Выберите события для сдвига.")
+            return
 
-                QMessageBox.information(self, "Успех", "Событие удалено!")
+        minutes, ok = QInputDialog.getInt(self, "Сдвинуть время", "Сдвиг в минутах (назад — со знаком минус):",
+                                          15, -MAX_SHIFT_MINUTES, MAX_SHIFT_MINUTES)
+        if not ok or minutes == 0:
+            return
 
-                self.load_events()
-            except sqlite3.Error as e:
-                QMessageBox.critical(self, "Ошибка базы данных", f"Ошибка удаления: {str(e)}")
-            finally:
-                if conn:
-                    conn.close()
+        try:
+            with self.undo_stack.journal.command("сдвиг времени"):
+                repository.shift_events(self.db, event_ids, minutes)
+            self.reload_reminders()
+        except ValueError as e:
+            QMessageBox.warning(self, "Ошибка", str(e))
+        except sqlite3.Error as e:
+            QMessageBox.critical(self, "Ошибка базы данных", f"Ошибка сдвига: {str(e)}")
+
+    def change_events_type(self):
+        event_ids = self.selected_event_ids()
+        if not event_ids:
+            QMessageBox.warning(self, "Ошибка", "Выберите события.")
+            return
+
+        event_type, ok = QInputDialog.getItem(self, "Изменить тип", f"Тип для выбранных событий ({len(event_ids)}):",
+                                              type_cache(self.db).names(), 0, True)
+        if not ok:
+            return
+
+        try:
+            with self.undo_stack.journal.command("изменение типа"):
+                repository.set_events_type(self.db, event_ids, event_type)
+        except sqlite3.Error as e:
+            QMessageBox.critical(self, "Ошибка базы данных", f"Ошибка изменения типа: {str(e)}")
+
+    def move_events(self):
+        event_ids = self.selected_event_ids()
+        if not event_ids:
+            QMessageBox.warning(self, "Ошибка", "Выберите события.")
+            return
+
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Перенести на дату")
+        layout = QFormLayout(dialog)
+        date_input = QDateEdit(QDate.currentDate())
+        date_input.setCalendarPopup(True)
+        layout.addRow(f"Новая дата ({len(event_ids)} соб.):", date_input)
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(dialog.accept)
+        buttons.rejected.connect(dialog.reject)
+        layout.addRow(buttons)
+        if dialog.exec_() != QDialog.Accepted:
+            return
+
+        try:
+            with self.undo_stack.journal.command("перенос на дату"):
+                repository.move_events(self.db, event_ids, date_input.date().toString("yyyy-MM-dd"))
+            self.reload_reminders()
+        except sqlite3.Error as e:
+            QMessageBox.critical(self, "Ошибка базы данных", f"Ошибка переноса: {str(e)}")
 
     def search_event_dialog(self):
+        # Диалоги строятся при первом открытии и переиспользуются вместе с введёнными значениями
+        if self.search_dialog is None:
+            self.search_dialog = self.build_search_dialog()
+        self.search_dialog.exec_()
+
+    def build_search_dialog(self):
         dialog = QDialog(self)
         dialog.setWindowTitle("Поиск событий")
 
@@ -342,40 +642,23 @@ class EventManager(QMainWindow):
 
         layout.addWidget(search_button)
 
-        dialog.exec_()
+        return dialog
 
     def search_events(self, title, event_type, date, dialog):
-        query = "SELECT * FROM events WHERE 1=1"
-        params = []
-
-        if title:
-            query += " AND title LIKE ?"
-            params.append(f"%{title}%")
-
-        if event_type:
-            query += " AND type_id LIKE ?"
-            params.append(f"%{event_type}%")
-
         if date:
-            query += " AND date = ?"
-            params.append(date)
-
-        conn = sqlite3.connect("./db/schedule.db")
-        cursor = conn.cursor()
-        cursor.execute(query, params)
-        results = cursor.fetchall()
-        conn.close()
-
-        self.schedule_table.setRowCount(0)
-
-        for row_idx, event in enumerate(results):
-            self.schedule_table.insertRow(row_idx)
-            for col_idx, data in enumerate(event):
-                self.schedule_table.setItem(row_idx, col_idx, QTableWidgetItem(str(data)))
+            query = repository.event_query(self.db, date, date, title, event_type)
+        else:
+            query = repository.event_query(self.db, title=title, event_type=event_type)
+        self.event_model.set_query(query)
 
         dialog.accept()
 
     def filter_by_date_dialog(self):
+        if self.filter_dialog is None:
+            self.filter_dialog = self.build_filter_dialog()
+        self.filter_dialog.exec_()
+
+    def build_filter_dialog(self):
         dialog = QDialog(self)
         dialog.setWindowTitle("Фильтровать по дате")
 
@@ -389,31 +672,32 @@ class EventManager(QMainWindow):
         end_date_input.setCalendarPopup(True)
         end_date_input.setDate(QDate.currentDate())
 
+        start_time_input = QTimeEdit(QTime(0, 0))
+        end_time_input = QTimeEdit(QTime(23, 59, 59))
+
         layout.addRow("Дата начала:", start_date_input)
         layout.addRow("Дата окончания:", end_date_input)
+        layout.addRow("Начинаются не раньше:", start_time_input)
+        layout.addRow("Заканчиваются не позже:", end_time_input)
 
         filter_button = QPushButton("Применить")
         filter_button.clicked.connect(lambda: self.filter_by_date(
             start_date_input.date().toString("yyyy-MM-dd"),
             end_date_input.date().toString("yyyy-MM-dd"),
-            dialog
+            dialog,
+            start_time_input.time().toString("HH:mm:ss"),
+            end_time_input.time().toString("HH:mm:ss")
         ))
         layout.addWidget(filter_button)
 
-        dialog.exec_()
-
-    def filter_by_date(self, start_date, end_date, dialog):
-        conn = sqlite3.connect("./db/schedule.db")
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM events WHERE date BETWEEN ? AND ?", (start_date, end_date))
-        results = cursor.fetchall()
-        conn.close()
+        return dialog
 
-        self.schedule_table.setRowCount(0)
-        for row_idx, event in enumerate(results):
-            self.schedule_table.insertRow(row_idx)
-            for col_idx, data in enumerate(event):
-                self.schedule_table.setItem(row_idx, col_idx, QTableWidgetItem(str(data)))
+    def filter_by_date(self, start_date, end_date, dialog, time_from=None, time_to=None):
+        # Границы суток не ограничивают выборку — лишнее условие в запрос не добавляем
+        time_from = None if time_from == "00:00:00" else time_from
+        time_to = None if time_to == "23:59:59" else time_to
+        self.event_model.set_query(repository.event_query(self.db, start_date, end_date,
+                                                          time_from=time_from, time_to=time_to))
 
         dialog.accept()
 
@@ -421,18 +705,12 @@ class EventManager(QMainWindow):
         date, ok = QInputDialog.getText(self, "Фильтр по дате", "Введите дату в формате YYYY-MM-DD:")
         if ok and date:
             try:
-                conn = sqlite3.connect("./db/schedule.db")
-                cursor = conn.cursor()
-                cursor.execute("SELECT * FROM events WHERE date = ?", (date,))
-                events = cursor.fetchall()
-                conn.close()
-
-                self.schedule_table.setRowCount(0)
-                for row_idx, event in enumerate(events):
-                    self.schedule_table.insertRow(row_idx)
-                    for col_idx, data in enumerate(event):
-                        self.schedule_table.setItem(row_idx, col_idx, QTableWidgetItem(str(data)))
-
+                date = normalize_date(date)
+            except ValueError as e:
+                QMessageBox.warning(self, "Ошибка", str(e))
+                return
+            try:
+                self.event_model.set_query(repository.event_query(self.db, date, date))
             except sqlite3.Error as e:
                 QMessageBox.critical(self, "Ошибка базы данных", f"Ошибка фильтрации: {str(e)}")
 
@@ -441,148 +719,490 @@ class EventManager(QMainWindow):
         if not file_path:
             return
 
-        try:
-            with open(file_path, "w", encoding="utf-8") as txt_file:
-                txt_file.write("ID\tНазвание\tДата\tНачало\tКонец\tТип\n")
-                for row in range(self.schedule_table.rowCount()):
-                    row_data = []
-                    for col in range(self.schedule_table.columnCount()):
-                        item = self.schedule_table.item(row, col)
-                        row_data.append(item.text() if item else "")
-                    txt_file.write("\t".join(row_data) + "\n")
-            QMessageBox.information(self, "Успех", "Расписание экспортировано в TXT!")
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"Не удалось экспортировать: {str(e)}")
+        # В TXT попадает текущая выборка таблицы целиком, а не только подгруженные строки
+        from schedule.exporter import FORMAT_TXT, export_events
+        query, params = self.event_model.current_query()
+        task = BackgroundTask(export_events, self.db, file_path, FORMAT_TXT, query, params)
+        self.run_with_progress(task, "Экспорт в TXT…",
+                               lambda result: self.on_export_finished(result, "Расписание экспортировано в TXT!"),
+                               "Не удалось экспортировать")
 
     def export_schedule(self):
         options = QFileDialog.Options()
-        file_name, _ = QFileDialog.getSaveFileName(self, "Экспортировать расписание", "./static/files", "CSV Files (*.csv)", options=options)
-
-        if file_name:
-            try:
-                conn = sqlite3.connect("./db/schedule.db")
-                cursor = conn.cursor()
-                cursor.execute("SELECT * FROM events")
-                events = cursor.fetchall()
+        file_name, file_filter = QFileDialog.getSaveFileName(self, "Экспортировать расписание", "./static/files",
+                                                             f"CSV Files (*.csv);;{SNAPSHOT_FILTER}", options=options)
 
-                with open(file_name, mode='w', newline='', encoding="utf-8") as file:
-                    writer = csv.writer(file)
-                    writer.writerow(["ID", "Название", "Дата", "Начало", "Конец", "Тип"])
-                    writer.writerows(events)
-
-                QMessageBox.information(self, "Успех", "Расписание экспортировано!")
-            except sqlite3.Error as e:
-                QMessageBox.critical(self, "Ошибка базы данных", f"Ошибка экспорта: {str(e)}")
-            finally:
-                if conn:
-                    conn.close()
+        if not file_name:
+            return
+        from schedule.snapshot import SNAPSHOT_EXTENSION, export_snapshot
+        if file_filter == SNAPSHOT_FILTER or file_name.endswith(SNAPSHOT_EXTENSION):
+            if not file_name.endswith(SNAPSHOT_EXTENSION):
+                file_name += SNAPSHOT_EXTENSION
+            task = BackgroundTask(export_snapshot, self.db, file_name)
+            self.run_with_progress(task, "Экспорт снимка…",
+                                   lambda result: self.on_export_finished(result, "Снимок расписания сохранён!"),
+                                   "Ошибка экспорта")
+        else:
+            from schedule.exporter import FORMAT_CSV, export_events
+            task = BackgroundTask(export_events, self.db, file_name, FORMAT_CSV)
+            self.run_with_progress(task, "Экспорт расписания…",
+                                   lambda result: self.on_export_finished(result, "Расписание экспортировано!"),
+                                   "Ошибка экспорта")
+
+    def on_export_finished(self, result, message):
+        if result.cancelled:
+            QMessageBox.information(self, "Экспорт", "Экспорт отменён.")
+        else:
+            QMessageBox.information(self, "Успех", f"{message}\nСобытий: {result.rows}")
 
     def import_schedule(self):
         options = QFileDialog.Options()
-        file_name, _ = QFileDialog.getOpenFileName(self, "Импортировать расписание", "./static/files", "CSV Files (*.csv)", options=options)
+        file_name, _ = QFileDialog.getOpenFileName(self, "Импортировать расписание", "./static/files",
+                                                   f"CSV Files (*.csv);;{SNAPSHOT_FILTER}", options=options)
 
         if file_name:
+            from schedule.conflicts import make_import_validator
+            from schedule.importer import import_csv
+            from schedule.snapshot import import_snapshot, is_snapshot
             try:
-                with open(file_name, mode='r', encoding="utf-8") as file:
-                    reader = csv.reader(file)
-                    header = next(reader)
+                snapshot = is_snapshot(file_name)
+            except OSError as e:
+                QMessageBox.critical(self, "Ошибка импорта", f"Не удалось открыть файл: {e}")
+                return
+            if snapshot:
+                action, ok = QInputDialog.getItem(
+                    self, "Снимок расписания", "Что сделать со снимком:", list(SNAPSHOT_ACTIONS), 0, False)
+                if not ok:
+                    return
+                if not SNAPSHOT_ACTIONS[action]:
+                    self.view_snapshot(file_name)
+                    return
+
+            policies = import_policies()
+            policy_name, ok = QInputDialog.getItem(
+                self, "Импортировать расписание", "Если ID уже есть в расписании:",
+                list(policies), 0, False)
+            if not ok:
+                return
+
+            overlap_name, ok = QInputDialog.getItem(
+                self, "Импортировать расписание", "Пересечения по времени:",
+                list(OVERLAP_CHECKS), 0, False)
+            if not ok:
+                return
+
+            policy = policies[policy_name]
+            overlap_check = OVERLAP_CHECKS[overlap_name]
+            validate = None if overlap_check is None else make_import_validator(self.db, overlap_check, policy)
+            task = BackgroundTask(import_snapshot if snapshot else import_csv, self.db, file_name, policy,
+                                  validate=validate)
+            self.run_with_progress(task, "Импорт расписания…", self.on_import_finished, "Ошибка импорта")
+
+    def view_snapshot(self, file_name):
+        from gui.snapshot_view import SnapshotDialog
+        from schedule.snapshot import Snapshot
+        try:
+            snapshot = Snapshot(file_name)
+        except (OSError, ValueError) as e:
+            QMessageBox.critical(self, "Снимок расписания", f"Не удалось открыть снимок: {e}")
+            return
+        dialog = SnapshotDialog(snapshot, self)
+        dialog.setAttribute(Qt.WA_DeleteOnClose)
+        dialog.show()
 
-                    conn = sqlite3.connect("./db/schedule.db")
-                    cursor = conn.cursor()
+    def on_import_finished(self, result):
+        if result.cancelled:
+            QMessageBox.information(self, "Импорт", "Импорт отменён, расписание не изменено.")
+            return
 
-                    for row in reader:
-                        cursor.execute("""
-                            INSERT INTO events (event_id, title, date, start_time, end_time, type_id)
-                            VALUES (?, ?, ?, ?, ?, ?)
-                        """, (row[0], row[1], row[2], row[3], row[4], row[5]))
+        message = (f"Расписание импортировано!\n"
+                   f"Прочитано строк: {result.read}\n"
+                   f"Записано: {result.written}\n"
+                   f"Пропущено: {result.skipped + len(result.errors)}")
+        if result.errors:
+            shown = "\n".join(f"Строка {error.line}: {error.message}" for error in result.errors[:10])
+            message += f"\n\nОшибки в данных:\n{shown}"
+            if len(result.errors) > 10:
+                message += f"\n… и ещё {len(result.errors) - 10}"
+        QMessageBox.information(self, "Успех", message)
+        self.reload_reminders()
+
+    def run_with_progress(self, task, label, on_finished, error_title):
+        progress_dialog = QProgressDialog(label, "Отмена", 0, 100, self)
+        progress_dialog.setWindowTitle(label.rstrip("…"))
+        progress_dialog.setWindowModality(Qt.WindowModal)
+        progress_dialog.setMinimumDuration(300)
+        progress_dialog.setAutoClose(False)
+        progress_dialog.setAutoReset(False)
+        progress_dialog.canceled.connect(task.cancel)
+
+        def finish():
+            progress_dialog.canceled.disconnect(task.cancel)
+            progress_dialog.close()
+            self.running_tasks.discard(task)
+
+        def succeeded(result):
+            finish()
+            on_finished(result)
+
+        def failed(message):
+            finish()
+            QMessageBox.critical(self, "Ошибка", f"{error_title}: {message}")
+
+        task.signals.progress.connect(progress_dialog.setValue)
+        task.signals.finished.connect(succeeded)
+        task.signals.failed.connect(failed)
+        self.running_tasks.add(task)
+        self.task_pool.start(task)
+
+    def show_conflicts(self):
+        scope_name, ok = QInputDialog.getItem(
+            self, "Конфликты", "Что считать конфликтом:", list(CONFLICT_SCOPES), 0, False)
+        if not ok:
+            return
+
+        from schedule.conflicts import find_all_conflicts
+        task = BackgroundTask(find_all_conflicts, self.db, CONFLICT_SCOPES[scope_name])
+        self.run_with_progress(task, "Поиск конфликтов…", self.on_conflicts_found, "Ошибка поиска конфликтов")
+
+    def auto_schedule(self):
+        file_name, _ = QFileDialog.getOpenFileName(self, "Задания для автоподбора", "./static/files",
+                                                   "CSV Files (*.csv)")
+        if not file_name:
+            return
+
+        from schedule.solver import DEFAULT_TIME_BUDGET, plan_week, read_requests
+        from schedule.timeutil import week_start
+        try:
+            requests = read_requests(file_name)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "Автоподбор", f"Не удалось прочитать задания: {e}")
+            return
+        if not requests:
+            QMessageBox.information(self, "Автоподбор", "В файле нет заданий.")
+            return
+
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Автоподбор")
+        layout = QFormLayout(dialog)
+        week_input = QDateEdit(QDate.currentDate())
+        week_input.setCalendarPopup(True)
+        scope_input = QComboBox()
+        scope_input.addItems(list(CONFLICT_SCOPES))
+        budget_input = QSpinBox()
+        budget_input.setRange(1, 60)
+        budget_input.setValue(int(DEFAULT_TIME_BUDGET))
+        budget_input.setSuffix(" с")
+        layout.addRow(f"Неделя ({len(requests)} соб.):", week_input)
+        layout.addRow("Запрещены пересечения:", scope_input)
+        layout.addRow("Время на подбор:", budget_input)
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(dialog.accept)
+        buttons.rejected.connect(dialog.reject)
+        layout.addRow(buttons)
+        if dialog.exec_() != QDialog.Accepted:
+            return
+
+        monday = week_start(week_input.date().toString("yyyy-MM-dd"))
+        task = BackgroundTask(plan_week, self.db, requests, monday, CONFLICT_SCOPES[scope_input.currentText()],
+                              budget_input.value())
+        self.run_with_progress(task, "Подбор расписания…", self.on_schedule_planned, "Ошибка автоподбора")
+
+    def export_timetable(self):
+        from schedule.timetable import WeekLayoutCache, export_timetable, export_timetables
+
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Печать расписания")
+        layout = QFormLayout(dialog)
+        today = QDate.currentDate()
+        monday = today.addDays(1 - today.dayOfWeek())
+        from_input = QDateEdit(monday)
+        from_input.setCalendarPopup(True)
+        to_input = QDateEdit(monday.addDays(6))
+        to_input.setCalendarPopup(True)
+        type_input = QComboBox()
+        type_input.addItem("Все типы")
+        type_input.addItems(type_cache(self.db).names())
+        format_input = QComboBox()
+        format_input.addItems(list(TIMETABLE_FORMATS))
+        per_type_input = QCheckBox("Отдельный файл для каждого типа")
+        layout.addRow("С:", from_input)
+        layout.addRow("По:", to_input)
+        layout.addRow("Тип:", type_input)
+        layout.addRow("Формат:", format_input)
+        layout.addRow(per_type_input)
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(dialog.accept)
+        buttons.rejected.connect(dialog.reject)
+        layout.addRow(buttons)
+        if dialog.exec_() != QDialog.Accepted:
+            return
+
+        date_from = from_input.date().toString("yyyy-MM-dd")
+        date_to = to_input.date().toString("yyyy-MM-dd")
+        if date_from > date_to:
+            QMessageBox.warning(self, "Печать расписания", "Начальная дата позже конечной.")
+            return
+        fmt = TIMETABLE_FORMATS[format_input.currentText()]
+        event_type = type_input.currentText() if type_input.currentIndex() > 0 else None
+
+        if per_type_input.isChecked():
+            directory = QFileDialog.getExistingDirectory(self, "Каталог для расписаний", "./static/files")
+            if not directory:
+                return
+            # Выбранный тип ограничивает выгрузку им одним, иначе — все типы с событиями за период
+            task = BackgroundTask(export_timetables, self.db, directory, fmt, date_from, date_to,
+                                  [event_type] if event_type else None)
+        else:
+            path, _ = QFileDialog.getSaveFileName(self, "Сохранить расписание", f"./static/files/timetable.{fmt}",
+                                                  f"{format_input.currentText()} (*.{fmt})")
+            if not path:
+                return
+            if self.week_cache is None:
+                self.week_cache = WeekLayoutCache()
+            task = BackgroundTask(export_timetable, self.db, path, fmt, date_from, date_to, event_type,
+                                  self.week_cache)
+        self.run_with_progress(task, "Печать расписания…", self.on_timetable_exported, "Ошибка печати расписания")
+
+    def on_timetable_exported(self, result):
+        if result.cancelled:
+            QMessageBox.information(self, "Печать расписания", "Отменено.")
+        elif not result.paths:
+            QMessageBox.information(self, "Печать расписания", "За этот период событий нет.")
+        else:
+            shown = "\n".join(result.paths[:10]) + ("\n…" if len(result.paths) > 10 else "")
+            QMessageBox.information(self, "Печать расписания",
+                                    f"Сохранено файлов: {len(result.paths)}, событий: {result.events}\n{shown}")
+
+    def on_schedule_planned(self, result):
+        if result.cancelled:
+            QMessageBox.information(self, "Автоподбор", "Подбор отменён, расписание не изменено.")
+            return
+        if not result.placements:
+            QMessageBox.information(self, "Автоподбор", "Свободного времени ни для одного события не нашлось.")
+            return
+
+        message = (f"Размещено событий: {len(result.placements)} из "
+                   f"{len(result.placements) + len(result.unplaced)} за {result.elapsed:.1f} с.")
+        if result.unplaced:
+            titles = sorted({request.title for request in result.unplaced})
+            shown = ", ".join(titles[:10]) + (" …" if len(titles) > 10 else "")
+            message += f"\nНе поместились: {shown}"
+        answer = QMessageBox.question(self, "Автоподбор", f"{message}\n\nЗаписать в расписание?",
+                                      QMessageBox.Yes | QMessageBox.No)
+        if answer != QMessageBox.Yes:
+            return
+
+        from schedule.solver import save_placements
+        try:
+            with self.undo_stack.journal.command("автоподбор"):
+                save_placements(self.db, result.placements)
+            self.reload_reminders()
+        except (sqlite3.Error, ValueError) as e:
+            QMessageBox.critical(self, "Ошибка базы данных", f"Не удалось записать события: {e}")
+
+    def show_statistics(self):
+        period_name, ok = QInputDialog.getItem(
+            self, "Статистика", "Группировать:", list(STATISTICS_PERIODS), 0, False)
+        if not ok:
+            return
+
+        year = QDate.currentDate().year()
+        task = BackgroundTask(type_statistics, self.db, f"{year:04d}-01-01", f"{year:04d}-12-31",
+                              STATISTICS_PERIODS[period_name])
+        self.run_with_progress(task, "Подсчёт статистики…",
+                               lambda stats: self.on_statistics_ready(stats, year), "Ошибка подсчёта статистики")
+
+    def on_statistics_ready(self, stats, year):
+        if not stats:
+            QMessageBox.information(self, "Статистика", f"В {year} году событий нет.")
+            return
+
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Статистика по типам")
+        dialog.resize(500, 400)
+        layout = QVBoxLayout(dialog)
+        layout.addWidget(QLabel(f"События и часы по типам за {year} год"))
+
+        types = type_cache(self.db)
+        lines = []
+        current_type = object()
+        for row in stats:
+            if row.type_id != current_type:
+                current_type = row.type_id
+                lines.append(types.name(row.type_id) or "Без типа")
+            lines.append(f"    {row.period}: событий {row.events}, часов {row.minutes / 60:.1f}")
+
+        report = QPlainTextEdit()
+        report.setReadOnly(True)
+        report.setPlainText("\n".join(lines))
+        layout.addWidget(report)
+
+        close_button = QPushButton("Закрыть")
+        close_button.clicked.connect(dialog.close)
+        layout.addWidget(close_button)
+
+        dialog.exec_()
+
+    def on_conflicts_found(self, conflicts):
+        if conflicts is None:
+            return
+        if not conflicts:
+            QMessageBox.information(self, "Конфликты", "Пересечений по времени не найдено.")
+            return
+
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Конфликты")
+        dialog.resize(700, 400)
+        layout = QVBoxLayout(dialog)
+
+        from schedule.conflicts import MAX_REPORTED_CONFLICTS
+        suffix = " (показаны первые)" if len(conflicts) >= MAX_REPORTED_CONFLICTS else ""
+        layout.addWidget(QLabel(f"Найдено пересечений: {len(conflicts)}{suffix}"))
+
+        report = QPlainTextEdit()
+        report.setReadOnly(True)
+        report.setPlainText("\n".join(
+            f"{conflict.date}  "
+            f"[{conflict.first.event_id}] {conflict.first.title} "
+            f"{conflict.first.start_time[:5]}–{conflict.first.end_time[:5]}  ×  "
+            f"[{conflict.second.event_id}] {conflict.second.title} "
+            f"{conflict.second.start_time[:5]}–{conflict.second.end_time[:5]}"
+            for conflict in conflicts))
+        layout.addWidget(report)
+
+        close_button = QPushButton("Закрыть")
+        close_button.clicked.connect(dialog.close)
+        layout.addWidget(close_button)
+
+        dialog.exec_()
+
+    def create_notification_timer(self):
+        # Очередь пуста до первого reload_reminders: его вызывает startup_finished
+        self.reminders = ReminderQueue(self.db)
 
-                    conn.commit()
-                    QMessageBox.information(self, "Успех", "Расписание импортировано!")
-            except sqlite3.Error as e:
-                QMessageBox.critical(self, "Ошибка базы данных", f"Ошибка импорта: {str(e)}")
-            except Exception as e:
-                QMessageBox.critical(self, "Ошибка", f"Ошибка при чтении файла: {str(e)}")
-            finally:
-                if conn:
-                    conn.close()
-
-    def start_notification_timer(self):
         self.notification_timer = QTimer(self)
+        self.notification_timer.setSingleShot(True)
         self.notification_timer.timeout.connect(self.check_upcoming_events)
-        self.notification_timer.start(60000)  # Проверка каждую минуту
 
-    def check_upcoming_events(self):
-        conn = sqlite3.connect("./db/schedule.db")
-        cursor = conn.cursor()
-        cursor.execute("SELECT title, date, start_time FROM events")
-        events = cursor.fetchall()
-        conn.close()
+    def arm_notification_timer(self):
+        # Таймер не ставится дольше часа: так сон компьютера и перевод часов не сбивают
+        # напоминания, а окно развёрнутых повторений вовремя сдвигается вперёд
+        due = self.reminders.next_due()
+        delay = MAX_REMINDER_DELAY if due is None else min(max(0, due - now_epoch()), MAX_REMINDER_DELAY)
+        self.notification_timer.start(delay * 1000)
 
-        current_date = QDate.currentDate().toString("yyyy-MM-dd")
-        current_time = QTime.currentTime()
+    def reload_reminders(self):
+        # Повторения проще перечитать окном, чем править кучу по каждому экземпляру
+        self.reminders.reload(now_epoch())
+        self.arm_notification_timer()
 
-        for title, event_date, start_time in events:
-            if event_date == current_date:
-                event_time = QTime.fromString(start_time, "HH:mm:ss")
-                if current_time.secsTo(event_time) <= 900:  # 15 минут до события
-                    QMessageBox.information(self, "Напоминание", f"Скоро начнется событие: {title}")
+    def reminder_event_changed(self, event_id, title, date, start_time):
+        self.reminders.event_changed(event_id, title, to_epoch(date, start_time), now_epoch())
+        self.arm_notification_timer()
+
+    def check_upcoming_events(self):
+        for _, title, _ in self.reminders.pop_due(now_epoch()):
+            message = QMessageBox(QMessageBox.Information, "Напоминание", f"Скоро начнется событие: {title}",
+                                  QMessageBox.Ok, self)
+            message.setModal(False)
+            message.setAttribute(Qt.WA_DeleteOnClose)
+            message.show()
+        self.arm_notification_timer()
 
     def show_calendar(self):
+        if self.calendar_dialog is None:
+            self.calendar_dialog = self.build_calendar_dialog()
+        else:
+            # Пока диалог был закрыт, кэш месяцев мог очиститься
+            self.calendar.reload()
+        self.show_events_for_date(self.calendar, self.calendar_events_list, self.calendar.selectedDate())
+        self.calendar_dialog.exec_()
+        self.calendar.shutdown()
+
+    def build_calendar_dialog(self):
+        from gui.calendar_view import EventCalendar
+        from schedule.month_summary import MonthCache
+        self.month_cache = MonthCache()
+
         dialog = QDialog(self)
         dialog.setWindowTitle("Календарь событий")
         layout = QVBoxLayout(dialog)
 
-        calendar = QCalendarWidget()
-        calendar.setGridVisible(True)
-        calendar.clicked.connect(lambda date: self.show_events_for_date(date.toString("yyyy-MM-dd")))
-        layout.addWidget(calendar)
+        calendar_layout = QHBoxLayout()
+        calendar = EventCalendar(self.db, self.month_cache)
+        events_list = QListWidget()
+        events_list.setMinimumWidth(260)
+        calendar.clicked.connect(lambda date: self.show_events_for_date(calendar, events_list, date))
+        calendar_layout.addWidget(calendar)
+        calendar_layout.addWidget(events_list)
+        layout.addLayout(calendar_layout)
 
         close_button = QPushButton("Закрыть")
         close_button.clicked.connect(dialog.close)
         layout.addWidget(close_button)
 
-        dialog.exec_()
+        self.calendar = calendar
+        self.calendar_events_list = events_list
+        return dialog
 
-    def show_events_for_date(self, date):
-        QMessageBox.information(self, "События", f"Показать события для даты: {date}")
+    def show_events_for_date(self, calendar, events_list, date):
+        events_list.clear()
+        events = calendar.day_events(date)
+        if not events:
+            events_list.addItem(f"{date.toString('dd.MM.yyyy')}: событий нет")
+            return
+        for _, title, _, start_time, end_time, event_type in events:
+            events_list.addItem(f"{start_time[:5]}–{end_time[:5]}  {title} ({event_type})")
 
     def change_table_style(self):
+        if self.settings_dialog is None:
+            self.settings_dialog = self.build_settings_dialog()
+        self.settings_dialog.exec_()
+
+    def build_settings_dialog(self):
         dialog = QDialog(self)
         dialog.setWindowTitle("Настройки таблицы")
         layout = QVBoxLayout(dialog)
 
         font_size_combo = QComboBox()
         font_size_combo.addItems([str(size) for size in range(8, 25)])
+        font_size_combo.setCurrentText(str(self.schedule_table.font().pointSize()))
         layout.addWidget(QLabel("Размер шрифта:"))
         layout.addWidget(font_size_combo)
 
         alternating_row_check = QCheckBox("Чередовать строки")
         layout.addWidget(alternating_row_check)
 
+        profiling_check = QCheckBox("Профилирование (после перезапуска)")
+        profiling_check.setChecked(self.settings.value(PROFILING_SETTING, False, type=bool))
+        layout.addWidget(profiling_check)
+
         apply_button = QPushButton("Применить")
         apply_button.clicked.connect(lambda: self.apply_table_style(
             int(font_size_combo.currentText()),
             alternating_row_check.isChecked(),
-            dialog
+            dialog,
+            profiling_check.isChecked()
         ))
         layout.addWidget(apply_button)
 
-        dialog.exec_()
+        return dialog
 
-    def apply_table_style(self, font_size, alternate_rows, dialog):
+    def apply_table_style(self, font_size, alternate_rows, dialog, profiling=False):
         font = QFont("Arial", font_size)
         self.schedule_table.setFont(font)
         self.schedule_table.setAlternatingRowColors(alternate_rows)
+        self.settings.setValue(PROFILING_SETTING, profiling)
         dialog.accept()
 
-    def add_styling_to_rows(self):
-        for row in range(self.schedule_table.rowCount()):
-            for col in range(self.schedule_table.columnCount()):
-                item = self.schedule_table.item(row, col)
-                if item:
-                    item.setFont(QFont("Arial", 10))
-                    if row % 2 == 0:
-                        item.setBackground(QColor("lightblue"))
+    def show_profiler(self):
+        # Панель одна на окно и не модальная: её держат открытой во время работы
+        if self.profiler_panel is None:
+            from gui.profiling_panel import ProfilerPanel
+            self.profiler_panel = ProfilerPanel(self)
+        self.profiler_panel.show()
+        self.profiler_panel.raise_()
 
     def set_theme(self, theme):
         if theme == "dark":
@@ -597,8 +1217,26 @@ class EventManager(QMainWindow):
         else:
             self.set_theme("dark")
 
+    def closeEvent(self, event):
+        self.notification_timer.stop()
+        self.change_timer.stop()
+        if self.stall_watchdog is not None:
+            self.stall_watchdog.stop()
+        self.search_bar.shutdown()
+        for task in list(self.running_tasks):
+            task.cancel()
+        self.task_pool.waitForDone()
+        self.db.close()
+        dump_on_exit()
+        super().closeEvent(event)
+
 
 if __name__ == "__main__":
+    # В собранном PyInstaller exe процессы автоподбора и печати расписаний запускают
+    # этот же файл: без freeze_support каждый открыл бы ещё одно окно.
+    # Модуль импортируется здесь, чтобы не замедлять запуск окна
+    import multiprocessing
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     window = EventManager()
     window.show()
@@ -0,0 +1,5 @@
+import sys
+
+from schedule.cli import main
+
+sys.exit(main())
@@ -0,0 +1,77 @@
+from schedule.db import CHANGE_ADDED, CHANGE_DELETED, CHANGE_RELOADED, CHANGE_UPDATED
+from schedule.event_types import type_cache
+
+# Столько последних записей change_log хранится; отставшему сильнее процессу проще перечитать всё
+CHANGE_LOG_KEEP = 10000
+# Больше стольких изменённых событий за один опрос — тоже перечитать всё
+MAX_APPLIED_CHANGES = 2000
+
+
+class ChangeWatcher:
+    # Следит за изменениями, которые записали другие процессы, и рассылает их
+    # подписчикам db.notify так же, как свои. PRAGMA data_version меняется только
+    # после чужой фиксации, поэтому пока базу никто не трогает, опрос — один дешёвый запрос
+    def __init__(self, db):
+        self._db = db
+        db.track_changes = True
+        self._version = self._data_version()
+        self._last_seq = db.query_one("SELECT IFNULL(MAX(seq), 0) FROM change_log")[0]
+        db.take_own_changes()
+        self._own = []
+
+    def prune(self):
+        with self._db.transaction() as conn:
+            conn.execute("DELETE FROM change_log WHERE seq <= (SELECT IFNULL(MAX(seq), 0) FROM change_log) - ?",
+                         (CHANGE_LOG_KEEP,))
+
+    def _data_version(self):
+        return self._db.query_one("PRAGMA data_version")[0]
+
+    def poll(self):
+        # Возвращает ID событий, изменённых другими процессами; None, если надо перечитать всё
+        version = self._data_version()
+        if version == self._version:
+            return set()
+        self._version = version
+
+        first_seq = self._db.query_one("SELECT IFNULL(MIN(seq), 0) FROM change_log")[0]
+        rows = self._db.query("SELECT seq, event_id, op FROM change_log WHERE seq > ? ORDER BY seq",
+                              (self._last_seq,))
+        # Свои диапазоны забираются после чтения журнала: так среди прочитанных записей
+        # не останется своих, которые ещё не отмечены (см. Database.transaction)
+        self._own += self._db.take_own_changes()
+        if not rows:
+            return set()
+        # Нужные записи уже удалены из журнала другим процессом
+        gap = first_seq > self._last_seq + 1
+        self._last_seq = rows[-1][0]
+        own, self._own = self._own, [(first, last) for first, last in self._own if last > self._last_seq]
+        rows = [row for row in rows if not any(first <= row[0] <= last for first, last in own)]
+        if gap or len(rows) > MAX_APPLIED_CHANGES:
+            return self._reload()
+
+        ops = {}
+        for _, event_id, op in rows:
+            if op in ("R", "T"):
+                return self._reload()
+            ops.setdefault(event_id, []).append(op)
+        if not ops:
+            return set()
+
+        added, updated, deleted = [], [], []
+        for event_id, history in ops.items():
+            if history[-1] == "D":
+                deleted.append(event_id)
+            elif history[0] == "I":
+                added.append(event_id)
+            else:
+                updated.append(event_id)
+        for kind, event_ids in ((CHANGE_DELETED, deleted), (CHANGE_ADDED, added), (CHANGE_UPDATED, updated)):
+            if event_ids:
+                self._db.notify(kind, sorted(event_ids))
+        return set(ops)
+
+    def _reload(self):
+        type_cache(self._db).invalidate()
+        self._db.notify(CHANGE_RELOADED)
+        return None
@@ -0,0 +1,274 @@
+import argparse
+import os
+import sqlite3
+import sys
+from datetime import date, timedelta
+
+from schedule import repository
+from schedule.db import DEFAULT_DB_PATH
+from schedule.importer import POLICIES, POLICY_SKIP
+from schedule.profiling import dump_on_exit
+from schedule.query import SORT_COLUMNS
+from schedule.recurrence import ensure_window
+from schedule.timeutil import normalize_date, normalize_time
+
+# Импорт, экспорт и поиск конфликтов подключаются только нужной команде:
+# каждая лишняя зависимость — это время запуска пакетной задачи
+
+EXIT_OK = 0
+EXIT_ERRORS = 1
+EXIT_INTERRUPTED = 130
+
+FORMAT_SNAPSHOT = "snapshot"
+
+# Показывать не больше стольких пересечений, если не задан --limit
+DEFAULT_CONFLICT_LIMIT = 10000
+
+OVERLAP_CHECKS = {
+    "allow": None,
+    "skip": False,
+    "skip-type": True,
+}
+
+
+def _date(value):
+    try:
+        return normalize_date(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def _time(value):
+    try:
+        return normalize_time(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def _progress_printer(label):
+    # Прогресс выводится только в терминал, чтобы не засорять логи пакетных задач
+    if not sys.stderr.isatty():
+        return None
+    last = [-1]
+
+    def progress(percent):
+        if percent != last[0]:
+            last[0] = percent
+            sys.stderr.write(f"\r{label}: {percent}%")
+            if percent >= 100:
+                sys.stderr.write("\n")
+            sys.stderr.flush()
+    return progress
+
+
+def _add_filter_arguments(parser):
+    parser.add_argument("--from", dest="date_from", type=_date, help="начальная дата (включительно)")
+    parser.add_argument("--to", dest="date_to", type=_date, help="конечная дата (включительно)")
+    parser.add_argument("--title", default="", help="поиск по названию")
+    parser.add_argument("--type", dest="event_type", default="", help="поиск по типу")
+    parser.add_argument("--search", dest="text", default="", help="поиск по названию и типу")
+    parser.add_argument("--time-from", type=_time, help="события, начинающиеся не раньше (ЧЧ:ММ)")
+    parser.add_argument("--time-to", type=_time, help="события, заканчивающиеся не позже (ЧЧ:ММ)")
+    parser.add_argument("--sort", choices=tuple(SORT_COLUMNS), help="поле сортировки (по умолчанию ID или релевантность)")
+    parser.add_argument("--desc", action="store_true", help="сортировать по убыванию")
+
+
+def _has_filter(args):
+    return any((args.date_from, args.date_to, args.title, args.event_type, args.text,
+                args.time_from, args.time_to, args.sort))
+
+
+def _event_query(db, args):
+    query = repository.event_query(db, args.date_from, args.date_to, args.title, args.event_type, args.text,
+                                   args.time_from, args.time_to)
+    if args.sort:
+        query = query.sorted_by(args.sort, args.desc)
+    return query
+
+
+def cmd_import(db, args):
+    from schedule.importer import import_csv
+    from schedule.snapshot import import_snapshot, is_snapshot
+
+    validate = None
+    by_type = OVERLAP_CHECKS[args.overlaps]
+    if by_type is not None:
+        from schedule.conflicts import make_import_validator
+        validate = make_import_validator(db, by_type, args.policy)
+
+    import_file = import_snapshot if is_snapshot(args.path) else import_csv
+    result = import_file(db, args.path, args.policy, validate=validate, progress=_progress_printer("Импорт"))
+    print(f"Прочитано строк: {result.read}, записано: {result.written}, "
+          f"пропущено: {result.skipped + len(result.errors)}")
+    for error in result.errors:
+        print(f"Строка {error.line}: {error.message}", file=sys.stderr)
+    return EXIT_ERRORS if result.errors else EXIT_OK
+
+
+def cmd_export(db, args):
+    from schedule.exporter import ALL_EVENTS_QUERY, export_events
+
+    if args.format == FORMAT_SNAPSHOT:
+        from schedule.snapshot import export_snapshot
+        if _has_filter(args):
+            raise ValueError("снимок сохраняет всё расписание, фильтры к нему не применяются")
+        result = export_snapshot(db, args.path, progress=_progress_printer("Экспорт"))
+    elif _has_filter(args):
+        event_query = _event_query(db, args)
+        if event_query.window is not None:
+            ensure_window(db, *event_query.window)
+        query, params = event_query.compile()
+        result = export_events(db, args.path, args.format, query, params, progress=_progress_printer("Экспорт"))
+    else:
+        result = export_events(db, args.path, args.format, ALL_EVENTS_QUERY, progress=_progress_printer("Экспорт"))
+    print(f"Экспортировано событий: {result.rows} в {result.path}")
+    return EXIT_OK
+
+
+def cmd_query(db, args):
+    out = sys.stdout
+    for event in repository.iter_events(db, _event_query(db, args), args.limit):
+        out.write("\t".join("" if value is None else str(value) for value in event) + "\n")
+    return EXIT_OK
+
+
+def cmd_conflicts(db, args):
+    from schedule.conflicts import find_all_conflicts
+
+    conflicts = find_all_conflicts(db, args.by_type, args.date_from, args.date_to, args.limit,
+                                   progress=_progress_printer("Проверка"))
+    for conflict in conflicts:
+        first, second = conflict.first, conflict.second
+        print(f"{conflict.date}\t{first.start_time[:5]}–{first.end_time[:5]} {first.title} (#{first.event_id})"
+              f"\t{second.start_time[:5]}–{second.end_time[:5]} {second.title} (#{second.event_id})")
+    print(f"Найдено пересечений: {len(conflicts)}", file=sys.stderr)
+    return EXIT_ERRORS if conflicts else EXIT_OK
+
+
+def cmd_stats(db, args):
+    from schedule.event_types import type_cache, type_statistics
+
+    year = date.today().year
+    date_from = args.date_from or f"{year:04d}-01-01"
+    date_to = args.date_to or f"{year:04d}-12-31"
+    types = type_cache(db)
+    for row in type_statistics(db, date_from, date_to, args.by):
+        print(f"{types.name(row.type_id)}\t{row.period}\t{row.events}\t{row.minutes / 60:.2f}")
+    return EXIT_OK
+
+
+def cmd_solve(db, args):
+    from schedule.solver import plan_week, read_requests, save_placements
+    from schedule.timeutil import week_start
+
+    requests = read_requests(args.path)
+    result = plan_week(db, requests, week_start(args.week or date.today().isoformat()), args.by_type,
+                       args.time_budget, progress=_progress_printer("Подбор"))
+    for placement in result.placements:
+        print(f"{placement.date}\t{placement.start_time[:5]}\t{placement.end_time[:5]}"
+              f"\t{placement.title}\t{placement.event_type}")
+    for request in result.unplaced:
+        print(f"Не размещено: {request.title}", file=sys.stderr)
+    if not args.dry_run:
+        save_placements(db, result.placements)
+    print(f"Размещено: {len(result.placements)} из {len(requests)} за {result.elapsed:.1f} с", file=sys.stderr)
+    return EXIT_ERRORS if result.unplaced else EXIT_OK
+
+
+def cmd_timetable(db, args):
+    from schedule.timetable import check_range, export_timetable, export_timetables
+
+    today = date.today()
+    date_from = args.date_from or (today - timedelta(days=today.weekday())).isoformat()
+    date_to = args.date_to or (date.fromisoformat(date_from) + timedelta(days=6)).isoformat()
+    check_range(date_from, date_to)
+    fmt = args.format or os.path.splitext(args.path)[1].lstrip(".").lower()
+    if args.per_type:
+        # path — каталог, формат задаётся явно (по умолчанию HTML)
+        result = export_timetables(db, args.path, args.format or "html", date_from, date_to,
+                                   args.event_type or None, args.processes, progress=_progress_printer("Расписания"))
+    else:
+        event_type = args.event_type[0] if args.event_type else None
+        result = export_timetable(db, args.path, fmt, date_from, date_to, event_type,
+                                  progress=_progress_printer("Расписание"))
+    for path in result.paths:
+        print(path)
+    print(f"Файлов: {len(result.paths)}, событий: {result.events}", file=sys.stderr)
+    return EXIT_OK
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m schedule", description="Расписание без графического интерфейса")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help=f"файл базы данных (по умолчанию {DEFAULT_DB_PATH})")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("import", help="импорт событий из CSV или снимка (.snap)")
+    command.add_argument("path")
+    command.add_argument("--policy", choices=POLICIES, default=POLICY_SKIP,
+                         help="строка с уже занятым ID: skip — пропустить, upsert — обновить, renumber — новый ID")
+    command.add_argument("--overlaps", choices=OVERLAP_CHECKS, default="allow",
+                         help="пропускать строки, пересекающиеся по времени (skip-type: только внутри типа)")
+    command.set_defaults(handler=cmd_import)
+
+    command = commands.add_parser("export", help="экспорт событий в CSV, TXT или двоичный снимок")
+    command.add_argument("path")
+    command.add_argument("--format", default="csv", help="csv, txt или snapshot (всё расписание, без фильтров)")
+    _add_filter_arguments(command)
+    command.set_defaults(handler=cmd_export)
+
+    command = commands.add_parser("query", help="вывод событий через табуляцию")
+    _add_filter_arguments(command)
+    command.add_argument("--limit", type=int)
+    command.set_defaults(handler=cmd_query)
+
+    command = commands.add_parser("conflicts", help="отчёт о пересечениях; код возврата 1, если они есть")
+    command.add_argument("--by-type", action="store_true", help="только пересечения внутри одного типа")
+    command.add_argument("--from", dest="date_from", type=_date)
+    command.add_argument("--to", dest="date_to", type=_date)
+    command.add_argument("--limit", type=int, default=DEFAULT_CONFLICT_LIMIT)
+    command.set_defaults(handler=cmd_conflicts)
+
+    command = commands.add_parser("stats", help="число событий и часы по типам: тип, период, события, часы")
+    command.add_argument("--by", choices=("week", "month"), default="week", help="период группировки")
+    command.add_argument("--from", dest="date_from", type=_date, help="по умолчанию — начало текущего года")
+    command.add_argument("--to", dest="date_to", type=_date, help="по умолчанию — конец текущего года")
+    command.set_defaults(handler=cmd_stats)
+
+    command = commands.add_parser("solve", help="разместить события из файла заданий в свободное время недели")
+    command.add_argument("path", help="CSV: Название, Длительность, Тип, Дни, С, До, Ресурсы, Количество")
+    command.add_argument("--week", type=_date, help="любой день недели (по умолчанию текущая неделя)")
+    command.add_argument("--by-type", action="store_true", help="запрещать пересечения только внутри одного типа")
+    command.add_argument("--time-budget", type=float, default=5.0, help="сколько секунд искать, по умолчанию 5")
+    command.add_argument("--dry-run", action="store_true", help="только показать, ничего не записывать")
+    command.set_defaults(handler=cmd_solve)
+
+    command = commands.add_parser("timetable", help="сетка по неделям (HTML, PDF) или календарь iCalendar (.ics)")
+    command.add_argument("path", help="файл; с --per-type — каталог")
+    command.add_argument("--format", choices=("html", "pdf", "ics"), help="по умолчанию — по расширению файла")
+    command.add_argument("--from", dest="date_from", type=_date, help="по умолчанию — начало текущей недели")
+    command.add_argument("--to", dest="date_to", type=_date, help="по умолчанию — неделя от начальной даты")
+    command.add_argument("--type", dest="event_type", action="append",
+                         help="только события этого типа; с --per-type можно повторять")
+    command.add_argument("--per-type", action="store_true",
+                         help="отдельный файл для каждого типа (по умолчанию — для всех типов за период)")
+    command.add_argument("--processes", type=int, help="сколько процессов рисуют файлы (по умолчанию — по ядрам)")
+    command.set_defaults(handler=cmd_timetable)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    db = repository.open_database(args.db)
+    try:
+        return args.handler(db, args)
+    except KeyboardInterrupt:
+        # Импорт идёт одной транзакцией и при прерывании откатывается целиком
+        print("Прервано", file=sys.stderr)
+        return EXIT_INTERRUPTED
+    except (OSError, ValueError, RuntimeError, sqlite3.Error) as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return EXIT_ERRORS
+    finally:
+        db.close()
+        dump_on_exit()
@@ -0,0 +1,131 @@
+import heapq
+from bisect import bisect_left, insort
+from collections import defaultdict, namedtuple
+
+from schedule.importer import POLICY_RENUMBER, RowError
+from schedule.recurrence import close_window, ensure_window
+from schedule.timeutil import time_to_seconds
+
+Conflict = namedtuple("Conflict", "date first second")
+# Событие в отчёте о конфликтах
+Slot = namedtuple("Slot", "event_id title start_time end_time type_id")
+
+_OVERLAPS_SQL = """
+    SELECT event_id, title, start_time, end_time, type_id FROM event_instances
+    WHERE date = ? AND start_time < ? AND end_time > ? AND event_id IS NOT ?
+"""
+
+
+class IntervalIndex:
+    # Интервалы одного дня, отсортированные по началу. Пересечение с [start, end)
+    # ищется только среди интервалов, начавшихся не раньше start - самая длинная длительность
+    def __init__(self):
+        self._items = []
+        self._max_length = 0
+
+    def add(self, start, end, value):
+        insort(self._items, (start, end, value))
+        self._max_length = max(self._max_length, end - start)
+
+    def overlaps(self, start, end):
+        low = bisect_left(self._items, (start - self._max_length,))
+        high = bisect_left(self._items, (end,))
+        return [value for item_start, item_end, value in self._items[low:high] if item_end > start]
+
+    def __len__(self):
+        return len(self._items)
+
+
+# Повторения учитываются, если окно с этой датой уже развёрнуто (см. recurrence.ensure_window)
+def find_overlaps(conn, date, start_time, end_time, exclude_id=None, event_type=None, limit=-1):
+    query = _OVERLAPS_SQL
+    params = [date, end_time, start_time, exclude_id]
+    if event_type is not None:
+        query += " AND type_id IS ?"
+        params.append(event_type)
+    query += " ORDER BY start_time LIMIT ?"
+    params.append(limit)
+    return [Slot(*row) for row in conn.execute(query, params)]
+
+
+# Отчёт ограничен, чтобы одно «склеенное» расписание не породило миллионы пар
+MAX_REPORTED_CONFLICTS = 10000
+
+
+def find_all_conflicts(db, by_type=False, date_from=None, date_to=None, limit=MAX_REPORTED_CONFLICTS,
+                       progress=None, is_cancelled=None):
+    # Один проход по индексу (date, start_time): для каждого дня держим кучу
+    # ещё не закончившихся событий, всё что в ней осталось — пересекается с текущим
+    # Бесконечные серии разворачиваются только до последней даты в расписании
+    window = close_window(db, date_from, date_to)
+    if window is None:
+        return []
+    date_from, date_to = window
+    ensure_window(db, date_from, date_to)
+
+    query = ("SELECT event_id, title, date, start_time, end_time, type_id FROM event_instances"
+             " WHERE date BETWEEN ? AND ? ORDER BY date, start_time")
+    params = [date_from, date_to]
+    total = db.query_one("SELECT COUNT(*) FROM event_instances WHERE date BETWEEN ? AND ?", params)[0] or 1
+    conflicts = []
+    current_date = None
+    active = defaultdict(list)
+
+    for number, (event_id, title, date, start_time, end_time, type_id) in enumerate(
+            db.execute(query, params), start=1):
+        if number % 5000 == 0 or number == 1:
+            if is_cancelled is not None and is_cancelled():
+                return None
+            if progress is not None:
+                progress(number * 100 // total)
+        if date != current_date:
+            current_date = date
+            active.clear()
+
+        slot = Slot(event_id, title, start_time, end_time, type_id)
+        running = active[type_id if by_type else None]
+        while running and running[0][0] <= start_time:
+            heapq.heappop(running)
+        for _, _, other in running:
+            conflicts.append(Conflict(date, other, slot))
+        if len(conflicts) >= limit:
+            del conflicts[limit:]
+            break
+        heapq.heappush(running, (end_time, event_id, slot))
+
+    if progress is not None:
+        progress(100)
+    return conflicts
+
+
+def make_import_validator(db, by_type=False, policy=None):
+    # Проверка импортируемых строк до фиксации транзакции: и против базы
+    # (включая уже вставленные пачки), и внутри текущей пачки.
+    # Строка с тем же ID заменяет событие в базе, поэтому с ним не сравнивается —
+    # кроме политики renumber, где строка станет новым событием
+    keep_own = policy == POLICY_RENUMBER
+
+    def validate(conn, entries):
+        errors = []
+        batch = defaultdict(IntervalIndex)
+        dates = [row[2] for _, row in entries]
+        ensure_window(db, min(dates), max(dates))
+        for line, row in entries:
+            event_id, title, date, start_time, end_time, event_type = row[:6]
+            scope_type = event_type if by_type else None
+            exclude_id = None if keep_own else event_id
+            clash = find_overlaps(conn, date, start_time, end_time, exclude_id, scope_type, limit=1)
+            if clash:
+                other = clash[0].title
+            else:
+                start, end = time_to_seconds(start_time), time_to_seconds(end_time)
+                index = batch[(date, scope_type)]
+                overlaps = index.overlaps(start, end)
+                if not overlaps:
+                    index.add(start, end, title)
+                    continue
+                other = overlaps[0]
+            errors.append(RowError(line, f"пересекается по времени с «{other}» ({date})"))
+        return errors
+
+    return validate
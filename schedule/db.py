@@ -0,0 +1,176 @@
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from schedule.profiling import TimedConnection, profiler
+
+DEFAULT_DB_PATH = "./db/schedule.db"
+
+# sqlite3 кэширует подготовленные запросы по тексту SQL, поэтому
+# одинаковые запросы из разных методов компилируются один раз
+STATEMENT_CACHE_SIZE = 256
+
+# С базой работают несколько копий приложения. Столько секунд SQLite ждёт,
+# пока другой процесс освободит блокировку записи
+BUSY_TIMEOUT = 10.0
+# Если база всё ещё занята, начало транзакции и одиночная запись повторяются
+LOCK_RETRIES = 3
+LOCK_RETRY_DELAY = 0.5
+
+_LAST_CHANGE_SQL = "SELECT IFNULL(MAX(seq), 0) FROM change_log"
+
+PRAGMAS = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("temp_store", "MEMORY"),
+    ("mmap_size", 256 * 1024 * 1024),
+    ("cache_size", -16000),
+    ("foreign_keys", "ON"),
+)
+
+
+# Виды уведомлений об изменении событий, см. Database.notify
+CHANGE_ADDED = "added"
+CHANGE_UPDATED = "updated"
+CHANGE_DELETED = "deleted"
+# Массовое изменение (импорт): подписчикам проще перечитать всё
+CHANGE_RELOADED = "reloaded"
+
+
+def _is_locked(error):
+    message = str(error)
+    return "locked" in message or "busy" in message
+
+
+def _retry_locked(func, *args):
+    for attempt in range(LOCK_RETRIES):
+        try:
+            return func(*args)
+        except sqlite3.OperationalError as e:
+            if not _is_locked(e) or attempt == LOCK_RETRIES - 1:
+                raise
+            time.sleep(LOCK_RETRY_DELAY * (attempt + 1))
+
+
+def _casefold(value):
+    return value.casefold() if isinstance(value, str) else value
+
+
+class Database:
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+        self._listeners = []
+        # Когда включено (см. schedule.changes), транзакции запоминают, какие записи
+        # журнала change_log сделал этот процесс, чтобы не применять их повторно
+        self.track_changes = False
+        self._own_changes = []
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        self._listeners.remove(callback)
+
+    def notify(self, kind, event_ids=()):
+        # Вызывается после фиксации изменений в том потоке, который их записал
+        event_ids = tuple(event_ids)
+        for callback in list(self._listeners):
+            callback(kind, event_ids)
+
+    def connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            self._local.depth = 0
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _connect(self):
+        # isolation_level=None: одиночные запросы фиксируются сразу,
+        # группы запросов оборачиваются в transaction()
+        # С профилированием каждый запрос замеряется; без него соединение обычное
+        factory = TimedConnection if profiler.enabled else sqlite3.Connection
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None, check_same_thread=False,
+                               cached_statements=STATEMENT_CACHE_SIZE, factory=factory)
+        for name, value in PRAGMAS:
+            conn.execute(f"PRAGMA {name} = {value}")
+        # Встроенная lower() SQLite не понимает кириллицу
+        conn.create_function("casefold", 1, _casefold, deterministic=True)
+        return conn
+
+    def execute(self, sql, params=()):
+        conn = self.connection()
+        if self._local.depth:
+            return conn.execute(sql, params)
+        # Вне транзакции запрос атомарен, его можно просто повторить
+        return _retry_locked(conn.execute, sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.connection().executemany(sql, seq_of_params)
+
+    def query(self, sql, params=()):
+        return self.connection().execute(sql, params).fetchall()
+
+    def query_one(self, sql, params=()):
+        return self.connection().execute(sql, params).fetchone()
+
+    @contextmanager
+    def transaction(self):
+        conn = self.connection()
+        depth = self._local.depth
+        savepoint = f"sp_{depth}"
+
+        first_change = None
+        if depth == 0:
+            _retry_locked(conn.execute, "BEGIN IMMEDIATE")
+            if self.track_changes:
+                # Блокировка записи уже наша: до COMMIT в журнал пишет только эта транзакция
+                first_change = conn.execute(_LAST_CHANGE_SQL).fetchone()[0]
+        else:
+            conn.execute(f"SAVEPOINT {savepoint}")
+        self._local.depth = depth + 1
+
+        try:
+            yield conn
+        except BaseException:
+            if depth == 0:
+                conn.execute("ROLLBACK")
+            else:
+                conn.execute(f"ROLLBACK TO {savepoint}")
+                conn.execute(f"RELEASE {savepoint}")
+            raise
+        else:
+            if depth == 0:
+                if first_change is None:
+                    conn.execute("COMMIT")
+                else:
+                    # Фиксация и запись диапазона под одной блокировкой: кто увидел
+                    # эти записи журнала, тот получит и диапазон из take_own_changes
+                    last_change = conn.execute(_LAST_CHANGE_SQL).fetchone()[0]
+                    with self._lock:
+                        conn.execute("COMMIT")
+                        if last_change > first_change:
+                            self._own_changes.append((first_change + 1, last_change))
+            else:
+                conn.execute(f"RELEASE {savepoint}")
+        finally:
+            self._local.depth = depth
+
+    def take_own_changes(self):
+        # Диапазоны seq журнала change_log, записанные этим процессом с прошлого вызова
+        with self._lock:
+            changes, self._own_changes = self._own_changes, []
+        return changes
+
+    def close(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
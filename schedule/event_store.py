@@ -0,0 +1,132 @@
+from schedule.query import EVENT_FIELDS
+from schedule.timeutil import seconds_to_time, time_to_seconds
+
+FIELD_INDEX = {field: index for index, field in enumerate(EVENT_FIELDS)}
+
+
+class EventRecord:
+    # Время хранится числом секунд, дата и тип — общими объектами из таблиц
+    # хранилища, поэтому запись весит заметно меньше кортежа из шести строк
+    __slots__ = ("event_id", "title", "date", "start", "end", "type_id")
+
+    def __init__(self, event_id, title, date, start, end, type_id):
+        self.event_id = event_id
+        self.title = title
+        self.date = date
+        self.start = start
+        self.end = end
+        self.type_id = type_id
+
+    def value(self, column):
+        if column == 0:
+            return self.event_id
+        if column == 1:
+            return self.title
+        if column == 2:
+            return self.date
+        if column == 3:
+            return seconds_to_time(self.start)
+        if column == 4:
+            return seconds_to_time(self.end)
+        return self.type_id
+
+    def sort_value(self, column):
+        # Для сортировки время не нужно переводить обратно в строку:
+        # HH:MM:SS и число секунд упорядочены одинаково
+        if column == 3:
+            return self.start
+        if column == 4:
+            return self.end
+        return self.value(column)
+
+
+def _sql_order(value):
+    # Порядок значений разных типов как в SQLite: NULL, числа, строки
+    if value is None:
+        return (0, 0)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    return (2, value)
+
+
+class EventStore:
+    # Записи лежат в порядке выборки. _by_id хранит записи каждого события, а место
+    # записи находится двоичным поиском по ключу сортировки — без обхода всего списка
+    def __init__(self):
+        self._records = []
+        self._by_id = {}
+        self._dates = {}
+        self._types = {}
+
+    def __len__(self):
+        return len(self._records)
+
+    def __getitem__(self, position):
+        return self._records[position]
+
+    def make_record(self, row):
+        event_id, title, date, start_time, end_time, type_id = row[:6]
+        date = self._dates.setdefault(date, date)
+        type_id = self._types.setdefault(type_id, type_id)
+        return EventRecord(event_id, title, date, time_to_seconds(start_time), time_to_seconds(end_time), type_id)
+
+    def _add(self, record):
+        self._by_id.setdefault(record.event_id, []).append(record)
+        return record
+
+    def _discard(self, record):
+        records = self._by_id[record.event_id]
+        records.remove(record)
+        if not records:
+            del self._by_id[record.event_id]
+
+    def load(self, rows):
+        self._dates = {}
+        self._types = {}
+        self._by_id = {}
+        self._records = [self._add(self.make_record(row)) for row in rows]
+
+    def extend(self, rows):
+        self._records.extend(self._add(self.make_record(row)) for row in rows)
+
+    def insert(self, position, row):
+        self._records.insert(position, self._add(self.make_record(row)))
+
+    def replace(self, position, row):
+        self._discard(self._records[position])
+        self._records[position] = self._add(self.make_record(row))
+
+    def remove(self, position):
+        self._discard(self._records.pop(position))
+
+    def positions(self, event_id, fields, descending=False):
+        # fields и descending — порядок выборки, как у insert_position
+        columns = [FIELD_INDEX[field] for field in fields]
+        positions = []
+        for record in self._by_id.get(event_id, ()):
+            position = self._bisect(self._key(record, columns), columns, descending)
+            if position >= len(self._records) or self._records[position] is not record:
+                # Порядок записей разошёлся с ключом — место ищется обходом
+                position = self._records.index(record)
+            positions.append(position)
+        return sorted(positions)
+
+    def insert_position(self, row, fields, descending=False):
+        # Двоичный поиск по тем же полям, что и ORDER BY запроса (EventQuery.key_fields)
+        columns = [FIELD_INDEX[field] for field in fields]
+        return self._bisect(self._key(self.make_record(row), columns), columns, descending)
+
+    @staticmethod
+    def _key(record, columns):
+        return tuple(_sql_order(record.sort_value(column)) for column in columns)
+
+    def _bisect(self, key, columns, descending):
+        low, high = 0, len(self._records)
+        while low < high:
+            middle = (low + high) // 2
+            other = self._key(self._records[middle], columns)
+            if (other > key) if descending else (other < key):
+                low = middle + 1
+            else:
+                high = middle
+        return low
@@ -0,0 +1,111 @@
+import threading
+import weakref
+from collections import namedtuple
+
+from schedule.recurrence import ensure_window
+
+# Название типа для строки events; подзапрос по первичному ключу дешевле JOIN
+# и не мешает ORDER BY по индексам таблицы events
+TYPE_NAME_SQL = "(SELECT name FROM event_types WHERE event_types.type_id = events.type_id)"
+
+PERIOD_WEEK = "week"
+PERIOD_MONTH = "month"
+PERIODS = {
+    PERIOD_WEEK: "strftime('%Y-W%W', date)",
+    PERIOD_MONTH: "substr(date, 1, 7)",
+}
+
+TypeStats = namedtuple("TypeStats", "type_id period events minutes")
+
+_caches = weakref.WeakKeyDictionary()
+_caches_lock = threading.Lock()
+
+
+def normalize_type_name(name):
+    return " ".join((name or "").split())
+
+
+def type_key(name):
+    # «Лекция», «лекция » и «ЛЕКЦИЯ» — один тип
+    return normalize_type_name(name).casefold()
+
+
+class TypeCache:
+    # Справочник типов в памяти процесса: типов десятки, а обращаются к нему
+    # на каждую строку таблицы. Незнакомый ID или название перечитывают справочник,
+    # поэтому типы, добавленные другим процессом, подхватываются сами
+    def __init__(self, db):
+        self._db = db
+        self._lock = threading.Lock()
+        self._names = None
+        self._ids = {}
+
+    def _load(self):
+        rows = self._db.query("SELECT type_id, name FROM event_types")
+        self._names = dict(rows)
+        self._ids = {type_key(name): type_id for type_id, name in rows}
+
+    def name(self, type_id):
+        if type_id is None:
+            return ""
+        with self._lock:
+            if self._names is None or type_id not in self._names:
+                self._load()
+            return self._names.get(type_id, "")
+
+    def names(self):
+        with self._lock:
+            if self._names is None:
+                self._load()
+            return sorted(self._names.values(), key=str.casefold)
+
+    def id_for(self, conn, name):
+        # Вызывается внутри транзакции записи: новый тип создаётся в ней же
+        name = normalize_type_name(name)
+        if not name:
+            return None
+        key = type_key(name)
+        with self._lock:
+            if self._names is None or key not in self._ids:
+                self._load()
+            type_id = self._ids.get(key)
+            if type_id is None:
+                conn.execute("INSERT INTO event_types (name) VALUES (?) ON CONFLICT (name) DO NOTHING", (name,))
+                type_id = conn.execute("SELECT type_id FROM event_types WHERE name = ?", (name,)).fetchone()[0]
+                self._names[type_id] = name
+                self._ids[key] = type_id
+            return type_id
+
+    def invalidate(self):
+        # После отката транзакции в кэше могут остаться типы, которых нет в базе
+        with self._lock:
+            self._names = None
+            self._ids = {}
+
+
+def type_cache(db):
+    with _caches_lock:
+        cache = _caches.get(db)
+        if cache is None:
+            cache = _caches[db] = TypeCache(db)
+        return cache
+
+
+def type_statistics(db, date_from, date_to, period=PERIOD_WEEK, progress=None, is_cancelled=None):
+    # Число событий и минуты по типам за каждую неделю или месяц диапазона.
+    # Одиночные события читаются из покрывающего индекса (date, type_id, start_time, end_time)
+    if period not in PERIODS:
+        raise ValueError(f"Неизвестный период: {period}")
+    ensure_window(db, date_from, date_to)
+    query = f"""
+        SELECT type_id, {PERIODS[period]} AS period, COUNT(*),
+               SUM(strftime('%s', end_time) - strftime('%s', start_time)) / 60
+        FROM event_instances
+        WHERE date BETWEEN ? AND ?
+        GROUP BY type_id, period
+        ORDER BY type_id, period
+    """
+    rows = [TypeStats(*row) for row in db.query(query, (date_from, date_to))]
+    if progress is not None:
+        progress(100)
+    return rows
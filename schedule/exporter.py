@@ -0,0 +1,95 @@
+import csv
+import os
+import tempfile
+from collections import namedtuple
+
+from schedule.profiling import profiled
+
+
+FORMAT_CSV = "csv"
+FORMAT_TXT = "txt"
+
+HEADER = ["ID", "Название", "Дата", "Начало", "Конец", "Тип", "Повторение"]
+FETCH_SIZE = 2000
+WRITE_BUFFER = 1024 * 1024
+
+# Полный экспорт сохраняет правила повторения, чтобы файл можно было импортировать обратно
+ALL_EVENTS_QUERY = """
+    SELECT e.event_id, e.title, e.date, e.start_time, e.end_time, t.name, r.rrule
+    FROM events e
+    LEFT JOIN event_types t ON t.type_id = e.type_id
+    LEFT JOIN recurrence_rules r ON r.event_id = e.event_id
+    ORDER BY e.event_id
+"""
+
+ExportResult = namedtuple("ExportResult", "path rows cancelled")
+
+
+class _TxtWriter:
+    # Формат TXT: значения через табуляцию, без кавычек
+    def __init__(self, file):
+        self._file = file
+
+    def writerow(self, row):
+        self._file.write("\t".join(_txt_value(value) for value in row) + "\n")
+
+    def writerows(self, rows):
+        self._file.writelines("\t".join(_txt_value(value) for value in row) + "\n" for row in rows)
+
+
+def _txt_value(value):
+    if value is None:
+        return ""
+    return str(value).replace("\t", " ").replace("\n", " ")
+
+
+def _make_writer(file, fmt):
+    if fmt == FORMAT_CSV:
+        return csv.writer(file)
+    if fmt == FORMAT_TXT:
+        return _TxtWriter(file)
+    raise ValueError(f"Неизвестный формат экспорта: {fmt}")
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+@profiled("export_events")
+def export_events(db, path, fmt=FORMAT_CSV, query=ALL_EVENTS_QUERY, params=(),
+                  progress=None, is_cancelled=None):
+    conn = db.connection()
+    total = conn.execute(f"SELECT COUNT(*) FROM ({query})", params).fetchone()[0] or 1
+    written = 0
+
+    # Пишем во временный файл рядом с целевым и подменяем его только в конце,
+    # чтобы при ошибке или отмене не оставить обрезанный файл
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".part")
+    try:
+        with os.fdopen(fd, "w", newline="", encoding="utf-8", buffering=WRITE_BUFFER) as file:
+            writer = _make_writer(file, fmt)
+            cursor = conn.execute(query, params)
+            writer.writerow(HEADER[:len(cursor.description)])
+
+            while True:
+                rows = cursor.fetchmany(FETCH_SIZE)
+                if not rows:
+                    break
+                if is_cancelled is not None and is_cancelled():
+                    cursor.close()
+                    raise ExportCancelled()
+
+                writer.writerows(rows)
+                written += len(rows)
+                if progress is not None:
+                    progress(min(100, written * 100 // total))
+
+        os.replace(temp_path, path)
+    except ExportCancelled:
+        os.remove(temp_path)
+        return ExportResult(path, written, True)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+    return ExportResult(path, written, False)
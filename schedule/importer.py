@@ -0,0 +1,244 @@
+import csv
+import json
+import os
+from collections import namedtuple
+
+from schedule.db import CHANGE_RELOADED
+from schedule.event_types import type_cache
+from schedule.migrations import (
+    create_change_log_triggers, create_fts_triggers, create_indexes, drop_change_log_triggers, drop_event_indexes,
+    drop_fts_triggers, log_reload, rebuild_fts)
+from schedule.profiling import profiled
+from schedule.recurrence import parse_rrule, set_rule
+from schedule.search import fts_available
+from schedule.timeutil import normalize_date, normalize_time
+
+POLICY_SKIP = "skip"
+POLICY_UPSERT = "upsert"
+POLICY_RENUMBER = "renumber"
+POLICIES = (POLICY_SKIP, POLICY_UPSERT, POLICY_RENUMBER)
+
+BATCH_SIZE = 5000
+# Примерный размер строки CSV; нужен, чтобы оценить объём импорта по размеру файла
+AVERAGE_ROW_BYTES = 80
+# Начиная с этого объёма полнотекстовый индекс дешевле перестроить целиком,
+# чем обновлять триггером на каждую строку
+BULK_FTS_ROWS = 50000
+# То же для индексов таблицы событий, если импорт не меньше уже записанного
+# и ему не нужна проверка пересечений (она ищет по индексам)
+BULK_INDEX_ROWS = 50000
+MAX_REPORTED_ERRORS = 1000
+
+RowError = namedtuple("RowError", "line message")
+ImportResult = namedtuple("ImportResult", "read written skipped errors cancelled")
+
+_INSERT_SQL = {
+    POLICY_SKIP: """
+        INSERT OR IGNORE INTO events (event_id, title, date, start_time, end_time, type_id)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """,
+    POLICY_UPSERT: """
+        INSERT INTO events (event_id, title, date, start_time, end_time, type_id)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (event_id) DO UPDATE SET
+            title = excluded.title, date = excluded.date, start_time = excluded.start_time,
+            end_time = excluded.end_time, type_id = excluded.type_id
+    """,
+    POLICY_RENUMBER: """
+        INSERT INTO events (event_id, title, date, start_time, end_time, type_id)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """,
+}
+
+
+def parse_row(row):
+    if len(row) < 6:
+        raise ValueError(f"ожидалось 6 колонок, получено {len(row)}")
+
+    raw_id, title, date, start_time, end_time, event_type = row[:6]
+    if raw_id and not raw_id.isspace():
+        try:
+            event_id = int(raw_id)
+        except ValueError:
+            raise ValueError(f"некорректный ID: {raw_id!r}") from None
+    else:
+        event_id = None
+    title = title.strip()
+    event_type = event_type.strip()
+    if not title:
+        raise ValueError("пустое название")
+
+    date = normalize_date(date)
+    start_time = normalize_time(start_time)
+    end_time = normalize_time(end_time)
+    if start_time >= end_time:
+        raise ValueError("время начала должно быть раньше времени окончания")
+
+    parsed = (event_id, title, date, start_time, end_time, event_type or None)
+    # Необязательная седьмая колонка — правило повторения (см. schedule.recurrence)
+    if len(row) > 6 and row[6].strip():
+        return parsed + (parse_rrule(row[6]),)
+    return parsed
+
+
+def _counted_lines(binary_file, counter):
+    # csv.reader читает построчно, а tell() у текстового файла при этом недоступен
+    for raw in binary_file:
+        counter[0] += len(raw)
+        yield raw.decode("utf-8-sig" if counter[0] == len(raw) else "utf-8")
+
+
+def read_batches(path, batch_size=BATCH_SIZE, counter=None):
+    counter = counter if counter is not None else [0]
+    with open(path, "rb") as binary_file:
+        reader = csv.reader(_counted_lines(binary_file, counter))
+        next(reader, None)  # заголовок
+
+        batch = []
+        for row in reader:
+            batch.append((reader.line_num, row))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+def _renumber_conflicts(conn, rows, seen_ids):
+    ids = [row[0] for row in rows if row[0] is not None]
+    existing = {event_id for (event_id,) in conn.execute(
+        "SELECT event_id FROM events WHERE event_id IN (SELECT value FROM json_each(?))", (json.dumps(ids),))}
+
+    kept = []
+    renumbered = []
+    for row in rows:
+        event_id = row[0]
+        if event_id is None or event_id in existing or event_id in seen_ids:
+            renumbered.append((None,) + row[1:])
+        else:
+            seen_ids.add(event_id)
+            kept.append(row)
+    # Новые ID выдаются после явных, иначе автоинкремент может занять ID из этой же пачки
+    return kept + renumbered
+
+
+class ImportCancelled(Exception):
+    pass
+
+
+def _parsed_batches(path, batch_size, counter):
+    for batch in read_batches(path, batch_size, counter):
+        entries = []
+        errors = []
+        for line, raw in batch:
+            try:
+                entries.append((line, parse_row(raw)))
+            except ValueError as e:
+                errors.append(RowError(line, str(e)))
+        yield len(batch), entries, errors
+
+
+@profiled("import_csv")
+def import_csv(db, path, policy=POLICY_SKIP, batch_size=BATCH_SIZE, validate=None,
+               progress=None, is_cancelled=None):
+    total_bytes = os.path.getsize(path) or 1
+    counter = [0]
+    return import_rows(db, _parsed_batches(path, batch_size, counter), policy, validate,
+                       total_bytes // AVERAGE_ROW_BYTES, lambda: counter[0] * 100 // total_bytes,
+                       progress, is_cancelled)
+
+
+def import_rows(db, batches, policy=POLICY_SKIP, validate=None, estimated_rows=0, position=None,
+                progress=None, is_cancelled=None):
+    # batches — пачки (прочитано записей, [(номер строки, событие как из parse_row)], ошибки разбора);
+    # position() — сколько процентов источника уже прочитано
+    if policy not in POLICIES:
+        raise ValueError(f"Неизвестная политика конфликтов: {policy}")
+
+    read = written = invalid = 0
+    errors = []
+    seen_ids = set()
+    insert_sql = _INSERT_SQL[policy]
+    types = type_cache(db)
+    # Названий типов единицы, а строк — миллионы: ID внутри транзакции не меняются
+    type_ids = {}
+    bulk_fts = fts_available(db) and estimated_rows >= BULK_FTS_ROWS
+
+    def reject(error):
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append(error)
+
+    def type_id(conn, name):
+        if name not in type_ids:
+            type_ids[name] = types.id_for(conn, name)
+        return type_ids[name]
+
+    # Весь импорт — одна транзакция: при ошибке или отмене база не меняется
+    try:
+        with db.transaction() as conn:
+            # Другие процессы всё равно перечитают выборку целиком, построчный журнал не нужен
+            drop_change_log_triggers(conn)
+            if bulk_fts:
+                drop_fts_triggers(conn)
+            dropped_indexes = []
+            if (validate is None and estimated_rows >= BULK_INDEX_ROWS
+                    and estimated_rows >= conn.execute("SELECT IFNULL(MAX(event_id), 0) FROM events").fetchone()[0]):
+                dropped_indexes = drop_event_indexes(conn)
+
+            for count, entries, parse_errors in batches:
+                if is_cancelled is not None and is_cancelled():
+                    raise ImportCancelled()
+
+                invalid += len(parse_errors)
+                for error in parse_errors:
+                    reject(error)
+                read += count
+                # Названия типов заменяются ID до проверки: validate сравнивает типы с базой
+                entries = [(line, row[:5] + (type_id(conn, row[5]),) + row[6:]) for line, row in entries]
+
+                if validate is not None and entries:
+                    rejected = validate(conn, entries)
+                    if rejected:
+                        invalid += len(rejected)
+                        for error in rejected:
+                            reject(error)
+                        rejected_lines = {error.line for error in rejected}
+                        entries = [entry for entry in entries if entry[0] not in rejected_lines]
+
+                rows = [row for _, row in entries]
+                if policy == POLICY_RENUMBER:
+                    rows = _renumber_conflicts(conn, rows, seen_ids)
+
+                written += conn.executemany(insert_sql, [row for row in rows if len(row) == 6]).rowcount
+                # Повторяющихся событий немного: вставляем по одному, чтобы знать их ID
+                for row in rows:
+                    if len(row) == 6:
+                        continue
+                    cursor = conn.execute(insert_sql, row[:6])
+                    if cursor.rowcount:
+                        written += 1
+                        set_rule(conn, row[0] if row[0] is not None else cursor.lastrowid, row[6])
+
+                if progress is not None and position is not None:
+                    progress(min(99, position()))
+
+            create_indexes(conn, dropped_indexes)
+            if bulk_fts:
+                rebuild_fts(conn)
+                create_fts_triggers(conn)
+            create_change_log_triggers(conn)
+            if written:
+                log_reload(conn)
+            if progress is not None:
+                progress(100)
+    except ImportCancelled:
+        types.invalidate()
+        return ImportResult(read, 0, 0, errors, True)
+    except Exception:
+        # Типы, созданные в откатившейся транзакции, не должны остаться в кэше
+        types.invalidate()
+        raise
+
+    if written:
+        db.notify(CHANGE_RELOADED)
+    return ImportResult(read, written, read - written - invalid, errors, False)
@@ -0,0 +1,183 @@
+import json
+from collections import namedtuple
+from contextlib import contextmanager
+
+from schedule.db import CHANGE_UPDATED
+
+# Сколько шагов можно отменить
+UNDO_LIMIT = 100
+
+# Шаг отмены — строки журнала с seq от first до last включительно
+JournalStep = namedtuple("JournalStep", "label first last")
+
+_EVENT_VALUES = (
+    "quote(old.title) || ', ' || quote(old.date) || ', ' || quote(old.start_time) || ', ' || "
+    "quote(old.end_time) || ', ' || quote(old.type_id)"
+)
+
+# Для каждого изменения триггер записывает обратную SQL-команду. Развёрнутые
+# повторения — кэш: вместо их восстановления правило помечается неразвёрнутым
+_JOURNAL_TRIGGERS = [
+    """
+    CREATE TEMP TRIGGER IF NOT EXISTS journal_events_insert AFTER INSERT ON main.events
+    WHEN (SELECT recording FROM temp.journal_state) BEGIN
+        INSERT INTO journal (event_id, statement)
+        VALUES (new.event_id, 'DELETE FROM events WHERE event_id = ' || new.event_id);
+    END
+    """,
+    f"""
+    CREATE TEMP TRIGGER IF NOT EXISTS journal_events_update AFTER UPDATE ON main.events
+    WHEN (SELECT recording FROM temp.journal_state) BEGIN
+        INSERT INTO journal (event_id, statement)
+        VALUES (old.event_id, 'UPDATE events SET (title, date, start_time, end_time, type_id) = ('
+                || {_EVENT_VALUES} || ') WHERE event_id = ' || old.event_id);
+    END
+    """,
+    f"""
+    CREATE TEMP TRIGGER IF NOT EXISTS journal_events_delete AFTER DELETE ON main.events
+    WHEN (SELECT recording FROM temp.journal_state) BEGIN
+        INSERT INTO journal (event_id, statement)
+        VALUES (old.event_id, 'INSERT INTO events (event_id, title, date, start_time, end_time, type_id) VALUES ('
+                || old.event_id || ', ' || {_EVENT_VALUES} || ')');
+    END
+    """,
+    """
+    CREATE TEMP TRIGGER IF NOT EXISTS journal_rules_insert AFTER INSERT ON main.recurrence_rules
+    WHEN (SELECT recording FROM temp.journal_state) BEGIN
+        INSERT INTO journal (event_id, statement)
+        VALUES (new.event_id, 'DELETE FROM event_occurrences WHERE event_id = ' || new.event_id);
+        INSERT INTO journal (event_id, statement)
+        VALUES (new.event_id, 'DELETE FROM recurrence_rules WHERE event_id = ' || new.event_id);
+    END
+    """,
+    """
+    CREATE TEMP TRIGGER IF NOT EXISTS journal_rules_update AFTER UPDATE OF rrule, series_end ON main.recurrence_rules
+    WHEN (SELECT recording FROM temp.journal_state)
+        AND (old.rrule IS NOT new.rrule OR old.series_end IS NOT new.series_end) BEGIN
+        INSERT INTO journal (event_id, statement)
+        VALUES (old.event_id, 'DELETE FROM event_occurrences WHERE event_id = ' || old.event_id);
+        INSERT INTO journal (event_id, statement)
+        VALUES (old.event_id, 'UPDATE recurrence_rules SET rrule = ' || quote(old.rrule)
+                || ', series_end = ' || quote(old.series_end)
+                || ', expanded_from = NULL, expanded_to = NULL WHERE event_id = ' || old.event_id);
+    END
+    """,
+    """
+    CREATE TEMP TRIGGER IF NOT EXISTS journal_rules_delete AFTER DELETE ON main.recurrence_rules
+    WHEN (SELECT recording FROM temp.journal_state) BEGIN
+        INSERT INTO journal (event_id, statement)
+        VALUES (old.event_id, 'INSERT INTO recurrence_rules (event_id, rrule, series_end) VALUES ('
+                || old.event_id || ', ' || quote(old.rrule) || ', ' || quote(old.series_end) || ')');
+    END
+    """,
+]
+
+
+class Journal:
+    # Журнал отмены по схеме из документации SQLite (undoredo): временные триггеры
+    # пишут обратные команды во временную таблицу. Отмена шага выполняет его команды
+    # в обратном порядке, а те же триггеры записывают команды для повтора.
+    # Триггеры временные, поэтому журналируется только соединение потока,
+    # создавшего журнал; изменения из других потоков и процессов не попадают в шаги
+    def __init__(self, db, limit=UNDO_LIMIT):
+        self._db = db
+        self.limit = limit
+        self._undo = []
+        self._redo = []
+        self._depth = 0
+        # Вызывается с названием шага, когда команда записала изменения
+        self.step_recorded = None
+
+        conn = db.connection()
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS journal (seq INTEGER PRIMARY KEY, event_id INTEGER, "
+                     "statement TEXT NOT NULL)")
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS journal_state (recording INTEGER NOT NULL)")
+        if conn.execute("SELECT 1 FROM temp.journal_state").fetchone() is None:
+            conn.execute("INSERT INTO temp.journal_state VALUES (0)")
+        for sql in _JOURNAL_TRIGGERS:
+            conn.execute(sql)
+
+    def can_undo(self):
+        return bool(self._undo)
+
+    def can_redo(self):
+        return bool(self._redo)
+
+    @contextmanager
+    def command(self, label):
+        # Всё, что записано внутри, — одна транзакция и один шаг отмены.
+        # Вложенные команды становятся точками сохранения внешней
+        outer = self._depth == 0
+        with self._db.transaction() as conn:
+            if outer:
+                first = self._next_seq(conn)
+                conn.execute("UPDATE temp.journal_state SET recording = 1")
+            self._depth += 1
+            try:
+                yield conn
+            finally:
+                self._depth -= 1
+                if outer:
+                    conn.execute("UPDATE temp.journal_state SET recording = 0")
+            if outer:
+                last = self._next_seq(conn) - 1
+                if last >= first:
+                    self._discard(conn, self._redo)
+                    self._redo = []
+                    self._undo.append(JournalStep(label, first, last))
+                    if len(self._undo) > self.limit:
+                        self._discard(conn, self._undo[:1])
+                        del self._undo[0]
+        if outer and last >= first and self.step_recorded is not None:
+            self.step_recorded(label)
+
+    def undo(self):
+        return self._move(self._undo, self._redo)
+
+    def redo(self):
+        return self._move(self._redo, self._undo)
+
+    def clear(self):
+        # Сторонние изменения (импорт, другой процесс) делают обратные команды неверными
+        with self._db.transaction() as conn:
+            conn.execute("DELETE FROM temp.journal")
+        self._undo = []
+        self._redo = []
+
+    def touches(self, event_ids):
+        # Есть ли в истории шаги, затрагивающие эти события
+        if not (self._undo or self._redo) or not event_ids:
+            return False
+        return self._db.query_one("SELECT EXISTS (SELECT 1 FROM temp.journal WHERE event_id IN "
+                                  "(SELECT value FROM json_each(?)))", (json.dumps(sorted(event_ids)),))[0] == 1
+
+    def _move(self, source, target):
+        if not source:
+            return None
+        step = source[-1]
+        with self._db.transaction() as conn:
+            # Строка правила может ссылаться на событие, которое восстановится следующей командой
+            conn.execute("PRAGMA defer_foreign_keys = ON")
+            rows = conn.execute("SELECT event_id, statement FROM temp.journal WHERE seq BETWEEN ? AND ? "
+                                "ORDER BY seq DESC", (step.first, step.last)).fetchall()
+            conn.execute("DELETE FROM temp.journal WHERE seq BETWEEN ? AND ?", (step.first, step.last))
+            first = self._next_seq(conn)
+            conn.execute("UPDATE temp.journal_state SET recording = 1")
+            try:
+                for _, statement in rows:
+                    conn.execute(statement)
+            finally:
+                conn.execute("UPDATE temp.journal_state SET recording = 0")
+            last = self._next_seq(conn) - 1
+        source.pop()
+        target.append(JournalStep(step.label, first, last))
+        self._db.notify(CHANGE_UPDATED, tuple(sorted({event_id for event_id, _ in rows})))
+        return step.label
+
+    def _discard(self, conn, steps):
+        for step in steps:
+            conn.execute("DELETE FROM temp.journal WHERE seq BETWEEN ? AND ?", (step.first, step.last))
+
+    @staticmethod
+    def _next_seq(conn):
+        return conn.execute("SELECT IFNULL(MAX(seq), 0) + 1 FROM temp.journal").fetchone()[0]
@@ -0,0 +1,422 @@
+import sqlite3
+from collections import Counter, defaultdict
+
+from schedule.db import Database, DEFAULT_DB_PATH
+from schedule.event_types import normalize_type_name, type_key
+from schedule.query import EVENT_FIELDS
+from schedule.timeutil import normalize_date, normalize_time
+
+EVENT_COLUMNS = ", ".join(EVENT_FIELDS)
+
+
+def _create_events(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS events (
+            event_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            date TEXT NOT NULL,
+            start_time TEXT NOT NULL,
+            end_time TEXT NOT NULL,
+            type_id INTEGER
+        )
+    """)
+
+
+def _normalize_date_time(conn):
+    updates = []
+    for event_id, date, start_time, end_time in conn.execute(
+            "SELECT event_id, date, start_time, end_time FROM events"):
+        try:
+            normalized = (normalize_date(date), normalize_time(start_time), normalize_time(end_time))
+        except ValueError:
+            # Нераспознанные значения оставляем как есть, чтобы не потерять данные
+            continue
+        if normalized != (date, start_time, end_time):
+            updates.append(normalized + (event_id,))
+
+    conn.executemany("UPDATE events SET date = ?, start_time = ?, end_time = ? WHERE event_id = ?", updates)
+
+
+def _add_start_ts_and_indexes(conn):
+    conn.execute("""
+        ALTER TABLE events ADD COLUMN start_ts INTEGER
+        GENERATED ALWAYS AS (CAST(strftime('%s', date || ' ' || start_time) AS INTEGER)) VIRTUAL
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_events_date_start ON events (date, start_time)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_events_start_ts ON events (start_ts)")
+
+
+def _fts5_supported(conn):
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x)")
+    except sqlite3.OperationalError:
+        return False
+    conn.execute("DROP TABLE temp.fts5_probe")
+    return True
+
+
+# Триггеры в том виде, в каком их создавала миграция 4: тогда в type_id
+# хранилось само название типа. Текущие определения — в FTS_TRIGGERS
+_FTS_TRIGGERS_V4 = {
+    "events_fts_insert": """
+        CREATE TRIGGER IF NOT EXISTS events_fts_insert AFTER INSERT ON events BEGIN
+            INSERT INTO events_fts (rowid, title, type) VALUES (new.event_id, new.title, new.type_id);
+        END
+    """,
+    "events_fts_delete": """
+        CREATE TRIGGER IF NOT EXISTS events_fts_delete AFTER DELETE ON events BEGIN
+            DELETE FROM events_fts WHERE rowid = old.event_id;
+        END
+    """,
+    "events_fts_update": """
+        CREATE TRIGGER IF NOT EXISTS events_fts_update AFTER UPDATE OF event_id, title, type_id ON events BEGIN
+            DELETE FROM events_fts WHERE rowid = old.event_id;
+            INSERT INTO events_fts (rowid, title, type) VALUES (new.event_id, new.title, new.type_id);
+        END
+    """,
+}
+
+
+FTS_TRIGGERS = {
+    "events_fts_insert": """
+        CREATE TRIGGER IF NOT EXISTS events_fts_insert AFTER INSERT ON events BEGIN
+            INSERT INTO events_fts (rowid, title, type)
+            VALUES (new.event_id, new.title, (SELECT name FROM event_types WHERE type_id = new.type_id));
+        END
+    """,
+    "events_fts_delete": """
+        CREATE TRIGGER IF NOT EXISTS events_fts_delete AFTER DELETE ON events BEGIN
+            DELETE FROM events_fts WHERE rowid = old.event_id;
+        END
+    """,
+    "events_fts_update": """
+        CREATE TRIGGER IF NOT EXISTS events_fts_update AFTER UPDATE OF event_id, title, type_id ON events BEGIN
+            DELETE FROM events_fts WHERE rowid = old.event_id;
+            INSERT INTO events_fts (rowid, title, type)
+            VALUES (new.event_id, new.title, (SELECT name FROM event_types WHERE type_id = new.type_id));
+        END
+    """,
+    "event_types_fts_rename": """
+        CREATE TRIGGER IF NOT EXISTS event_types_fts_rename AFTER UPDATE OF name ON event_types BEGIN
+            DELETE FROM events_fts WHERE rowid IN (SELECT event_id FROM events WHERE type_id = new.type_id);
+            INSERT INTO events_fts (rowid, title, type)
+            SELECT event_id, title, new.name FROM events WHERE type_id = new.type_id;
+        END
+    """,
+}
+
+
+def create_fts_triggers(conn):
+    for sql in FTS_TRIGGERS.values():
+        conn.execute(sql)
+
+
+def drop_fts_triggers(conn):
+    for name in FTS_TRIGGERS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+
+def rebuild_fts(conn):
+    conn.execute("DELETE FROM events_fts")
+    conn.execute("""
+        INSERT INTO events_fts (rowid, title, type)
+        SELECT e.event_id, e.title, t.name FROM events e LEFT JOIN event_types t ON t.type_id = e.type_id
+    """)
+
+
+def drop_event_indexes(conn):
+    # Возвращает определения удалённых индексов, чтобы create_indexes вернул их после
+    # массовой вставки: построить индекс заново быстрее, чем обновлять его на каждую строку
+    indexes = conn.execute("SELECT name, sql FROM sqlite_master "
+                           "WHERE type = 'index' AND tbl_name = 'events' AND sql IS NOT NULL").fetchall()
+    for name, _ in indexes:
+        conn.execute(f"DROP INDEX {name}")
+    return [sql for _, sql in indexes]
+
+
+def create_indexes(conn, definitions):
+    for sql in definitions:
+        conn.execute(sql)
+
+
+def _create_events_fts(conn):
+    # Если SQLite собран без FTS5, поиск работает через casefold() (см. schedule.search)
+    if not _fts5_supported(conn):
+        return
+
+    conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5(
+            title, type,
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        )
+    """)
+    for sql in _FTS_TRIGGERS_V4.values():
+        conn.execute(sql)
+    conn.execute("INSERT INTO events_fts (rowid, title, type) SELECT event_id, title, type_id FROM events")
+
+
+# Все экземпляры событий: одиночные события и развёрнутые повторения
+EVENT_INSTANCES_VIEW = """
+    CREATE VIEW IF NOT EXISTS event_instances AS
+    SELECT event_id, title, date, start_time, end_time, type_id, start_ts FROM events
+    UNION ALL
+    SELECT o.event_id, e.title, o.date, e.start_time, e.end_time, e.type_id, o.start_ts
+    FROM event_occurrences o JOIN events e ON e.event_id = o.event_id
+"""
+
+
+def _add_recurrence(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS recurrence_rules (
+            event_id INTEGER PRIMARY KEY REFERENCES events (event_id) ON DELETE CASCADE,
+            rrule TEXT NOT NULL,
+            series_end TEXT,
+            expanded_from TEXT,
+            expanded_to TEXT
+        )
+    """)
+    # Развёрнутые повторения (кроме первого, которое хранится в events)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS event_occurrences (
+            event_id INTEGER NOT NULL REFERENCES events (event_id) ON DELETE CASCADE,
+            date TEXT NOT NULL,
+            start_ts INTEGER,
+            PRIMARY KEY (event_id, date)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_occurrences_date ON event_occurrences (date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_occurrences_start_ts ON event_occurrences (start_ts)")
+
+    # Триггеры не зависят от PRAGMA foreign_keys, поэтому кэш сбрасывается и у сторонних клиентов
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS events_recurrence_delete AFTER DELETE ON events BEGIN
+            DELETE FROM recurrence_rules WHERE event_id = old.event_id;
+            DELETE FROM event_occurrences WHERE event_id = old.event_id;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS events_recurrence_reset AFTER UPDATE OF date, start_time ON events
+        WHEN EXISTS (SELECT 1 FROM recurrence_rules WHERE event_id = new.event_id) BEGIN
+            DELETE FROM event_occurrences WHERE event_id = new.event_id;
+            UPDATE recurrence_rules SET expanded_from = NULL, expanded_to = NULL WHERE event_id = new.event_id;
+        END
+    """)
+
+    conn.execute(EVENT_INSTANCES_VIEW)
+
+
+def _add_sort_indexes(conn):
+    # Сортировка по столбцу таблицы и постраничная выборка по ключу (столбец, event_id)
+    # идут по индексу: rowid хранится в каждом индексе последним столбцом.
+    # Дата сортируется по уже существующему idx_events_date_start
+    for column in ("title", "start_time", "end_time", "type_id"):
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_events_{column} ON events ({column})")
+
+
+def _add_event_types(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS event_types (
+            type_id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        )
+    """)
+
+    # До этой версии в type_id хранилось название типа как есть. Написания,
+    # отличающиеся регистром и пробелами, сводятся к самому частому
+    spellings = defaultdict(Counter)
+    raw_values = defaultdict(list)
+    for raw, count in conn.execute("SELECT type_id, COUNT(*) FROM events WHERE type_id IS NOT NULL GROUP BY type_id"):
+        name = normalize_type_name(str(raw))
+        if name:
+            spellings[type_key(name)][name] += count
+            raw_values[type_key(name)].append(raw)
+    # Типы нумеруются по алфавиту, чтобы сортировка по типу сразу шла в привычном порядке
+    names = sorted((counter.most_common(1)[0][0] for counter in spellings.values()), key=str.casefold)
+    conn.executemany("INSERT INTO event_types (name) VALUES (?)", [(name,) for name in names])
+    type_ids = {type_key(name): type_id for type_id, name in conn.execute("SELECT type_id, name FROM event_types")}
+
+    conn.execute("CREATE TEMP TABLE type_map (raw PRIMARY KEY, type_id INTEGER)")
+    conn.executemany("INSERT INTO temp.type_map VALUES (?, ?)",
+                     [(raw, type_ids[key]) for key, raws in raw_values.items() for raw in raws])
+
+    # Столбец с REFERENCES можно добавить без пересборки таблицы (значение по умолчанию NULL).
+    # Пересборка опасна: DROP TABLE events при включённых внешних ключах
+    # каскадно удалил бы правила повторения
+    conn.execute("DROP VIEW IF EXISTS event_instances")
+    for name in _FTS_TRIGGERS_V4:
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+    conn.execute("DROP INDEX IF EXISTS idx_events_type_id")
+    conn.execute("ALTER TABLE events RENAME COLUMN type_id TO type_name")
+    conn.execute("ALTER TABLE events ADD COLUMN type_id INTEGER REFERENCES event_types (type_id)")
+    conn.execute("""
+        UPDATE events SET type_id = (SELECT type_id FROM temp.type_map WHERE raw = events.type_name)
+        WHERE type_name IS NOT NULL
+    """)
+    conn.execute("ALTER TABLE events DROP COLUMN type_name")
+    conn.execute("DROP TABLE temp.type_map")
+
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_events_type_id ON events (type_id)")
+    # Покрывающий индекс для статистики по типам (см. event_types.type_statistics)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_events_date_type ON events (date, type_id, start_time, end_time)")
+    conn.execute(EVENT_INSTANCES_VIEW)
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'events_fts'").fetchone():
+        create_fts_triggers(conn)
+        rebuild_fts(conn)
+
+
+# Журнал изменений для других процессов, работающих с той же базой (см. schedule.changes).
+# I/U/D — событие добавлено, изменено, удалено; T — изменён справочник типов; R — перечитать всё
+CHANGE_LOG_TRIGGERS = {
+    "change_log_events_insert": """
+        CREATE TRIGGER IF NOT EXISTS change_log_events_insert AFTER INSERT ON events BEGIN
+            INSERT INTO change_log (event_id, op) VALUES (new.event_id, 'I');
+        END
+    """,
+    "change_log_events_update": """
+        CREATE TRIGGER IF NOT EXISTS change_log_events_update AFTER UPDATE ON events BEGIN
+            INSERT INTO change_log (event_id, op) SELECT old.event_id, 'D' WHERE old.event_id IS NOT new.event_id;
+            INSERT INTO change_log (event_id, op) VALUES (new.event_id, 'U');
+        END
+    """,
+    "change_log_events_delete": """
+        CREATE TRIGGER IF NOT EXISTS change_log_events_delete AFTER DELETE ON events BEGIN
+            INSERT INTO change_log (event_id, op) VALUES (old.event_id, 'D');
+        END
+    """,
+    # Правило повторения меняет то, как событие показывается в таблице
+    "change_log_rules_insert": """
+        CREATE TRIGGER IF NOT EXISTS change_log_rules_insert AFTER INSERT ON recurrence_rules BEGIN
+            INSERT INTO change_log (event_id, op) VALUES (new.event_id, 'U');
+        END
+    """,
+    "change_log_rules_update": """
+        CREATE TRIGGER IF NOT EXISTS change_log_rules_update AFTER UPDATE OF rrule, series_end ON recurrence_rules
+        BEGIN
+            INSERT INTO change_log (event_id, op) VALUES (new.event_id, 'U');
+        END
+    """,
+    "change_log_rules_delete": """
+        CREATE TRIGGER IF NOT EXISTS change_log_rules_delete AFTER DELETE ON recurrence_rules BEGIN
+            INSERT INTO change_log (event_id, op) VALUES (old.event_id, 'U');
+        END
+    """,
+    "change_log_types_update": """
+        CREATE TRIGGER IF NOT EXISTS change_log_types_update AFTER UPDATE OF name ON event_types BEGIN
+            INSERT INTO change_log (event_id, op) VALUES (NULL, 'T');
+        END
+    """,
+    "change_log_types_delete": """
+        CREATE TRIGGER IF NOT EXISTS change_log_types_delete AFTER DELETE ON event_types BEGIN
+            INSERT INTO change_log (event_id, op) VALUES (NULL, 'T');
+        END
+    """,
+}
+
+
+def create_change_log_triggers(conn):
+    for sql in CHANGE_LOG_TRIGGERS.values():
+        conn.execute(sql)
+
+
+def drop_change_log_triggers(conn):
+    for name in CHANGE_LOG_TRIGGERS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+
+def log_reload(conn):
+    # Вместо построчного журнала массовой записи (импорт) — одна отметка «перечитать всё»
+    conn.execute("INSERT INTO change_log (event_id, op) VALUES (NULL, 'R')")
+
+
+def _add_change_log(conn):
+    # seq без AUTOINCREMENT: новые номера больше всех оставшихся, а старые записи
+    # удаляются с начала журнала, так что номера не повторяются
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS change_log (
+            seq INTEGER PRIMARY KEY,
+            event_id INTEGER,
+            op TEXT NOT NULL
+        )
+    """)
+    create_change_log_triggers(conn)
+
+
+# Порядок менять нельзя: номер миграции хранится в PRAGMA user_version
+MIGRATIONS = [
+    _create_events,
+    _normalize_date_time,
+    _add_start_ts_and_indexes,
+    _create_events_fts,
+    _add_recurrence,
+    _add_sort_indexes,
+    _add_event_types,
+    _add_change_log,
+]
+
+
+def schema_version(db):
+    return db.query_one("PRAGMA user_version")[0]
+
+
+def migrate(db):
+    version = schema_version(db)
+    for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        with db.transaction() as conn:
+            migration(conn)
+            conn.execute(f"PRAGMA user_version = {number}")
+    return schema_version(db)
+
+
+QUERY_PLAN_CHECKS = {
+    "filter_by_date": (
+        f"SELECT {EVENT_COLUMNS} FROM events WHERE date BETWEEN ? AND ?",
+        ("2024-01-01", "2024-12-31"),
+    ),
+    "filter_events": (
+        f"SELECT {EVENT_COLUMNS} FROM events WHERE date = ?",
+        ("2024-12-12",),
+    ),
+    "sort_by_title_page": (
+        f"SELECT {EVENT_COLUMNS} FROM events WHERE (title, event_id) > (?, ?) ORDER BY title, event_id LIMIT ?",
+        ("", 0, 256),
+    ),
+    "sort_by_date_page": (
+        f"SELECT {EVENT_COLUMNS} FROM events WHERE (date, start_time, event_id) < (?, ?, ?)"
+        " ORDER BY date DESC, start_time DESC, event_id DESC LIMIT ?",
+        ("9999-12-31", "23:59:59", 0, 256),
+    ),
+    "type_stats": (
+        "SELECT type_id, substr(date, 1, 7), COUNT(*) FROM events WHERE date BETWEEN ? AND ? GROUP BY 1, 2",
+        ("2024-01-01", "2024-12-31"),
+    ),
+    "next_events": (
+        "SELECT event_id, title, start_ts FROM events WHERE start_ts >= ? ORDER BY start_ts LIMIT ?",
+        (0, 100),
+    ),
+}
+
+
+def explain(db, sql, params=()):
+    return [row[3] for row in db.query("EXPLAIN QUERY PLAN " + sql, params)]
+
+
+def check_query_plans(db, checks=QUERY_PLAN_CHECKS):
+    results = []
+    for name, (sql, params) in checks.items():
+        details = explain(db, sql, params)
+        uses_index = any(detail.startswith("SEARCH") and "INDEX" in detail for detail in details)
+        results.append((name, details, uses_index))
+    return results
+
+
+if __name__ == "__main__":
+    database = Database(DEFAULT_DB_PATH)
+    try:
+        print(f"Версия схемы: {migrate(database)}")
+        for name, details, uses_index in check_query_plans(database):
+            print(f"{'OK  ' if uses_index else 'SCAN'} {name}: {'; '.join(details)}")
+    except sqlite3.Error as e:
+        print(f"Ошибка базы данных: {e}")
+    finally:
+        database.close()
@@ -0,0 +1,89 @@
+from calendar import monthrange
+from collections import OrderedDict, defaultdict, namedtuple
+
+from schedule.event_types import TYPE_NAME_SQL
+from schedule.recurrence import ensure_window
+
+# Сводка по дню для отрисовки ячейки календаря
+DaySummary = namedtuple("DaySummary", "count busy_minutes first_start last_end")
+# days: дата -> DaySummary, events: дата -> строки событий этого дня по времени начала
+MonthData = namedtuple("MonthData", "days events")
+
+# Сколько месяцев держать в памяти: год вперёд-назад при листании
+MONTH_CACHE_SIZE = 12
+
+_DAYS_SQL = """
+    SELECT date, COUNT(*),
+           SUM(strftime('%s', end_time) - strftime('%s', start_time)) / 60,
+           MIN(start_time), MAX(end_time)
+    FROM event_instances
+    WHERE date BETWEEN ? AND ?
+    GROUP BY date
+"""
+
+_EVENTS_SQL = f"""
+    SELECT event_id, title, date, start_time, end_time, {TYPE_NAME_SQL}
+    FROM event_instances AS events
+    WHERE date BETWEEN ? AND ?
+    ORDER BY date, start_time, event_id
+"""
+
+
+def month_bounds(year, month):
+    return f"{year:04d}-{month:02d}-01", f"{year:04d}-{month:02d}-{monthrange(year, month)[1]:02d}"
+
+
+def neighbour_months(year, month):
+    previous = (year - 1, 12) if month == 1 else (year, month - 1)
+    following = (year + 1, 1) if month == 12 else (year, month + 1)
+    return previous, following
+
+
+def load_month(db, year, month, progress=None, is_cancelled=None):
+    first, last = month_bounds(year, month)
+    ensure_window(db, first, last)
+
+    days = {row[0]: DaySummary(*row[1:]) for row in db.query(_DAYS_SQL, (first, last))}
+    if is_cancelled is not None and is_cancelled():
+        return None
+    events = defaultdict(list)
+    for row in db.query(_EVENTS_SQL, (first, last)):
+        events[row[2]].append(row)
+
+    if progress is not None:
+        progress(100)
+    return MonthData(days, dict(events))
+
+
+class MonthCache:
+    # LRU месяцев. version растёт при каждом изменении расписания,
+    # чтобы загрузка, начатая до изменения, не попала в кэш
+    def __init__(self, capacity=MONTH_CACHE_SIZE):
+        self.capacity = capacity
+        self.version = 0
+        self._months = OrderedDict()
+
+    def get(self, key):
+        data = self._months.get(key)
+        if data is not None:
+            self._months.move_to_end(key)
+        return data
+
+    def put(self, key, data, version=None):
+        if version is not None and version != self.version:
+            return False
+        self._months[key] = data
+        self._months.move_to_end(key)
+        while len(self._months) > self.capacity:
+            self._months.popitem(last=False)
+        return True
+
+    def clear(self):
+        self.version += 1
+        self._months.clear()
+
+    def __contains__(self, key):
+        return key in self._months
+
+    def __len__(self):
+        return len(self._months)
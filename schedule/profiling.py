@@ -0,0 +1,328 @@
+import functools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque, namedtuple
+
+# Профилирование включается переменной окружения или настройкой приложения.
+# Выключенное оно почти ничего не стоит: соединения с БД создаются обычными,
+# а обёртки операций проверяют один флаг
+PROFILE_ENV = "SCHEDULE_PROFILE"
+# Куда сохранить статистику при выходе
+PROFILE_DUMP_ENV = "SCHEDULE_PROFILE_DUMP"
+SLOW_QUERY_ENV = "SCHEDULE_SLOW_QUERY_MS"
+
+# Запросы дольше стольких миллисекунд попадают в журнал вместе с планом
+SLOW_QUERY_MS = 50
+# Сколько последних медленных запросов хранить
+SLOW_QUERY_LIMIT = 50
+# Длина текста запроса в статистике
+SQL_PREVIEW = 200
+# Раз во столько строк цикл for по курсору сдаёт накопленное время профайлеру
+ITER_FLUSH_ROWS = 1000
+
+# Запросы, для которых EXPLAIN QUERY PLAN имеет смысл
+_EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+OperationStats = namedtuple("OperationStats", "name count total_ms max_ms")
+SlowQuery = namedtuple("SlowQuery", "sql duration_ms plan thread")
+
+log = logging.getLogger(__name__)
+
+
+def _env_flag(name):
+    return os.environ.get(name, "").strip().lower() not in ("", "0", "false", "no")
+
+
+def _sql_preview(sql):
+    return " ".join(sql.split())[:SQL_PREVIEW]
+
+
+class _Counter:
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds, call=True, elapsed=None):
+        # call=False — продолжение уже посчитанного вызова (выборка строк запроса):
+        # время идёт в сумму, а максимум — по всему вызову, elapsed
+        if call:
+            self.count += 1
+        self.total += seconds
+        longest = seconds if elapsed is None else elapsed
+        if longest > self.max:
+            self.max = longest
+
+
+class _Section:
+    __slots__ = ("_profiler", "_name", "_started")
+
+    def __init__(self, profiler, name):
+        self._profiler = profiler
+        self._name = name
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._profiler.record(self._name, time.perf_counter() - self._started)
+        return False
+
+
+class _DisabledSection:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_DISABLED = _DisabledSection()
+
+
+class Profiler:
+    # Счётчики общие для всех потоков: операции импорта и экспорта идут в фоне
+    def __init__(self, enabled=False, slow_query_ms=SLOW_QUERY_MS):
+        self.enabled = enabled
+        self.slow_query_ms = slow_query_ms
+        self._lock = threading.Lock()
+        self.reset()
+
+    def enable(self):
+        self.enabled = True
+
+    def reset(self):
+        with self._lock:
+            self._operations = {}
+            self._queries = {}
+            self._slow = deque(maxlen=SLOW_QUERY_LIMIT)
+            self._stalls = 0
+            self._longest_stall = 0.0
+            self._started = time.time()
+
+    def section(self, name):
+        if not self.enabled:
+            return _DISABLED
+        return _Section(self, name)
+
+    def record(self, name, seconds, call=True, elapsed=None):
+        with self._lock:
+            counter = self._operations.get(name)
+            if counter is None:
+                counter = self._operations[name] = _Counter()
+            counter.add(seconds, call, elapsed)
+
+    def record_query(self, sql, seconds, call=True, elapsed=None):
+        key = _sql_preview(sql)
+        with self._lock:
+            counter = self._queries.get(key)
+            if counter is None:
+                counter = self._queries[key] = _Counter()
+            counter.add(seconds, call, elapsed)
+
+    def record_slow_query(self, sql, seconds, plan):
+        entry = SlowQuery(_sql_preview(sql), round(seconds * 1000, 1), plan, threading.current_thread().name)
+        with self._lock:
+            self._slow.append(entry)
+        log.warning("Медленный запрос (%.1f мс): %s\n%s", entry.duration_ms, entry.sql, plan)
+
+    def record_stall(self, seconds):
+        with self._lock:
+            self._stalls += 1
+            self._longest_stall = max(self._longest_stall, seconds)
+
+    def operations(self):
+        return self._summary(self._operations)
+
+    def queries(self, limit=None):
+        # Самые затратные запросы — первыми
+        rows = sorted(self._summary(self._queries), key=lambda stats: stats.total_ms, reverse=True)
+        return rows if limit is None else rows[:limit]
+
+    def _summary(self, counters):
+        with self._lock:
+            items = [(name, counter.count, counter.total, counter.max) for name, counter in counters.items()]
+        return [OperationStats(name, count, round(total * 1000, 1), round(longest * 1000, 1))
+                for name, count, total, longest in sorted(items)]
+
+    def slow_queries(self):
+        with self._lock:
+            return list(self._slow)
+
+    def stalls(self):
+        with self._lock:
+            return self._stalls, round(self._longest_stall * 1000, 1)
+
+    def snapshot(self):
+        stalls, longest = self.stalls()
+        return {
+            "started": self._started,
+            "uptime_s": round(time.time() - self._started, 1),
+            "operations": [stats._asdict() for stats in self.operations()],
+            "queries": [stats._asdict() for stats in self.queries()],
+            "slow_queries": [query._asdict() for query in self.slow_queries()],
+            "stalls": {"count": stalls, "longest_ms": longest},
+        }
+
+    def dump(self, path):
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.snapshot(), file, ensure_ascii=False, indent=2)
+
+
+def _slow_query_ms():
+    try:
+        return float(os.environ.get(SLOW_QUERY_ENV, SLOW_QUERY_MS))
+    except ValueError:
+        return SLOW_QUERY_MS
+
+
+profiler = Profiler(_env_flag(PROFILE_ENV), _slow_query_ms())
+
+
+def profiled(name):
+    # Декоратор для крупных операций: обновление модели, импорт, экспорт, напоминания
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not profiler.enabled:
+                return func(*args, **kwargs)
+            with _Section(profiler, name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def dump_on_exit():
+    path = os.environ.get(PROFILE_DUMP_ENV)
+    if profiler.enabled and path:
+        profiler.dump(path)
+
+
+class TimedCursor(sqlite3.Cursor):
+    # Время запроса — это execute и все выборки строк из курсора, в том числе
+    # обход в цикле for. Там время копится и сдаётся профайлеру раз в
+    # ITER_FLUSH_ROWS строк, в конце выборки и при закрытии курсора
+    _pending = 0.0
+    _pending_rows = 0
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._pending += time.perf_counter() - started
+            self._flush_rows()
+            raise
+        self._pending += time.perf_counter() - started
+        self._pending_rows += 1
+        if self._pending_rows >= ITER_FLUSH_ROWS:
+            self._flush_rows()
+        return row
+
+    def _flush_rows(self):
+        pending = self._pending
+        self._pending = 0.0
+        self._pending_rows = 0
+        if pending:
+            self._add(pending)
+
+    def close(self):
+        self._flush_rows()
+        super().close()
+
+    def execute(self, sql, parameters=()):
+        self._flush_rows()
+        self._sql = sql
+        self._counted = False
+        self._params = parameters
+        self._elapsed = 0.0
+        self._reported = False
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._add(time.perf_counter() - started)
+
+    def executemany(self, sql, seq_of_parameters):
+        self._flush_rows()
+        self._sql = sql
+        self._counted = False
+        self._params = None
+        self._elapsed = 0.0
+        self._reported = False
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._add(time.perf_counter() - started)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            self._add(time.perf_counter() - started)
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        try:
+            return super().fetchmany(self.arraysize if size is None else size)
+        finally:
+            self._add(time.perf_counter() - started)
+
+    def fetchall(self):
+        started = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            self._add(time.perf_counter() - started)
+
+    def _add(self, seconds):
+        sql = getattr(self, "_sql", None)
+        if sql is None:
+            return
+        self._elapsed += seconds
+        # Вызов считается один раз, на execute; время выборки строк добавляется к нему
+        call = not self._counted
+        self._counted = True
+        profiler.record("db", seconds, call, self._elapsed)
+        profiler.record_query(sql, seconds, call, self._elapsed)
+        if not self._reported and self._elapsed * 1000 >= profiler.slow_query_ms:
+            self._reported = True
+            profiler.record_slow_query(sql, self._elapsed, self._plan())
+
+    def _plan(self):
+        if self._params is None or not self._sql.lstrip().upper().startswith(_EXPLAINABLE):
+            return ""
+        # Обычный курсор, чтобы план не попал в статистику сам
+        try:
+            rows = sqlite3.Cursor(self.connection).execute(f"EXPLAIN QUERY PLAN {self._sql}",
+                                                           self._params).fetchall()
+        except sqlite3.Error as e:
+            return f"план недоступен: {e}"
+        return "\n".join(row[-1] for row in rows)
+
+
+class TimedConnection(sqlite3.Connection):
+    # Фабрика соединений Database, когда профилирование включено
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        with profiler.section("db.script"):
+            return super().executescript(sql_script)
@@ -0,0 +1,153 @@
+from schedule.event_types import TYPE_NAME_SQL
+from schedule.search import SearchClause
+
+EVENT_FIELDS = ("event_id", "title", "date", "start_time", "end_time", "type_id")
+
+NO_SEARCH = SearchClause("", (), "", (), None)
+
+# Столбцы сортировки для каждого поля. Хвост event_id делает порядок полным,
+# поэтому следующую страницу можно искать по ключу последней строки, а не по OFFSET.
+# Дата сортируется вместе со временем начала — так подходит индекс (date, start_time).
+# Тип сортируется по ID: события группируются по типам, а порядок остаётся индексным
+SORT_COLUMNS = {
+    "event_id": (),
+    "title": ("title",),
+    "date": ("date", "start_time"),
+    "start_time": ("start_time",),
+    "end_time": ("end_time",),
+    "type_id": ("type_id",),
+}
+
+RANK_COLUMN = "hits.hit_rank"
+# Только тип может быть NULL; для остальных столбцов условие страницы проще
+NULLABLE_COLUMNS = {"events.type_id"}
+
+
+class EventQuery:
+    # Неизменяемый конвейер выборки событий: каждый шаг возвращает новый запрос,
+    # compile() собирает всё в один параметризованный SELECT
+    __slots__ = ("search", "filters", "window", "sort_field", "descending")
+
+    def __init__(self, search=NO_SEARCH, filters=(), window=None, sort_field=None, descending=False):
+        self.search = search
+        self.filters = filters
+        self.window = window
+        self.sort_field = sort_field
+        self.descending = descending
+
+    def _replace(self, **changes):
+        values = {name: getattr(self, name) for name in self.__slots__}
+        values.update(changes)
+        return EventQuery(**values)
+
+    def searching(self, clause):
+        return self._replace(search=clause)
+
+    def where(self, condition, params=()):
+        return self._replace(filters=self.filters + ((condition, tuple(params)),))
+
+    def dates(self, date_from=None, date_to=None):
+        # С диапазоном дат выборка идёт по event_instances и включает повторения.
+        # Открытая сторона окна остаётся None — её закрывает ensure_window
+        query = self._replace(window=(date_from or None, date_to or None))
+        if date_from:
+            query = query.where("events.date >= ?", (date_from,))
+        if date_to:
+            query = query.where("events.date <= ?", (date_to,))
+        return query
+
+    def times(self, time_from=None, time_to=None):
+        query = self
+        if time_from:
+            query = query.where("events.start_time >= ?", (time_from,))
+        if time_to:
+            query = query.where("events.end_time <= ?", (time_to,))
+        return query
+
+    def event_type(self, type_id):
+        return self.where("events.type_id IS ?", (type_id,))
+
+    def sorted_by(self, field, descending=False):
+        if field not in SORT_COLUMNS:
+            raise ValueError(f"Неизвестное поле сортировки: {field}")
+        return self._replace(sort_field=field, descending=descending)
+
+    @property
+    def ranked(self):
+        # Без явной сортировки результаты поиска идут по релевантности
+        return self.sort_field is None and bool(self.search.order_by)
+
+    def key_fields(self):
+        # Поля событий, задающие порядок строк (ранг поиска — не поле события)
+        fields = [] if self.ranked else list(SORT_COLUMNS[self.sort_field or "event_id"])
+        fields.append("event_id")
+        # В event_instances у повторений один event_id, различаются они датой
+        if self.window is not None and "date" not in fields:
+            fields.append("date")
+        return fields
+
+    def key_columns(self):
+        columns = [f"events.{field}" for field in self.key_fields()]
+        return [RANK_COLUMN] + columns if self.ranked else columns
+
+    def compile(self, after=None, limit=None, with_rank=False, type_names=False):
+        # after — ключ последней строки предыдущей страницы (см. page_key).
+        # with_rank добавляет ранг поиска седьмым столбцом: без него page_key не построить.
+        # type_names подставляет название типа вместо ID — для экспорта и вывода в CLI
+        columns = ", ".join(TYPE_NAME_SQL if type_names and field == "type_id" else f"events.{field}"
+                            for field in EVENT_FIELDS)
+        if with_rank and self.ranked:
+            columns += f", {RANK_COLUMN}"
+        source = "event_instances AS events" if self.window is not None else "events"
+        sql = f"SELECT {columns} FROM {source}"
+        params = list(self.search.join_params)
+        if self.search.join:
+            sql += " " + self.search.join
+
+        conditions = []
+        if self.search.where:
+            conditions.append(self.search.where)
+            params.extend(self.search.params)
+        for condition, condition_params in self.filters:
+            conditions.append(condition)
+            params.extend(condition_params)
+        key_columns = self.key_columns()
+        if after is not None:
+            condition, key_params = _after_condition(key_columns, after, self.descending and not self.ranked)
+            conditions.append(condition)
+            params.extend(key_params)
+        if conditions:
+            sql += " WHERE " + " AND ".join(f"({condition})" for condition in conditions)
+
+        direction = " DESC" if self.descending and not self.ranked else ""
+        sql += " ORDER BY " + ", ".join(column + direction for column in key_columns)
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return sql, tuple(params)
+
+    def page_key(self, row):
+        # Ключ строки, выбранной compile(): поля событий и, при ранжировании, ранг
+        values = {f"events.{field}": value for field, value in zip(EVENT_FIELDS, row)}
+        if self.ranked:
+            values[RANK_COLUMN] = row[len(EVENT_FIELDS)]
+        return tuple(values[column] for column in self.key_columns())
+
+
+def _after_condition(columns, key, descending):
+    # Строки после key в порядке ORDER BY columns. Сравнение кортежей
+    # использует индекс, но не работает с NULL: NULL в SQLite идут первыми
+    # при ASC и последними при DESC, их приходится добирать отдельно
+    operator = "<" if descending else ">"
+    first = columns[0]
+    if first in NULLABLE_COLUMNS and key[0] is None:
+        rest = ", ".join(columns[1:])
+        condition = f"{first} IS NULL AND ({rest}) {operator} ({', '.join('?' * (len(key) - 1))})"
+        if not descending:
+            condition = f"({condition}) OR {first} IS NOT NULL"
+        return condition, key[1:]
+
+    condition = f"({', '.join(columns)}) {operator} ({', '.join('?' * len(key))})"
+    if descending and first in NULLABLE_COLUMNS:
+        condition = f"({condition}) OR {first} IS NULL"
+    return condition, key
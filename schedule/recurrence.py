@@ -0,0 +1,232 @@
+from datetime import date, timedelta
+from functools import lru_cache
+
+from schedule.timeutil import DATE_FORMAT, normalize_date, to_epoch
+
+FREQ_DAILY = "DAILY"
+FREQ_WEEKLY = "WEEKLY"
+
+WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+
+
+class RecurrenceRule:
+    # Правило в духе RRULE: FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,WE;UNTIL=20250601;COUNT=16;EXDATE=20250308
+    __slots__ = ("freq", "interval", "by_weekday", "until", "count", "exdates")
+
+    def __init__(self, freq, interval=1, by_weekday=(), until=None, count=None, exdates=()):
+        if freq not in (FREQ_DAILY, FREQ_WEEKLY):
+            raise ValueError(f"Неподдерживаемая частота повторения: {freq}")
+        if interval < 1:
+            raise ValueError("Интервал повторения должен быть положительным")
+        if count is not None and count < 1:
+            raise ValueError("Число повторений должно быть положительным")
+        self.freq = freq
+        self.interval = interval
+        self.by_weekday = tuple(sorted(set(by_weekday)))
+        self.until = until
+        self.count = count
+        self.exdates = frozenset(exdates)
+
+    def __eq__(self, other):
+        return isinstance(other, RecurrenceRule) and format_rrule(self) == format_rrule(other)
+
+    def __hash__(self):
+        return hash(format_rrule(self))
+
+    def __repr__(self):
+        return f"RecurrenceRule({format_rrule(self)!r})"
+
+
+def _parse_date(value):
+    value = value.strip()
+    if len(value) == 8 and value.isdigit():
+        value = f"{value[:4]}-{value[4:6]}-{value[6:]}"
+    return date.fromisoformat(normalize_date(value))
+
+
+@lru_cache(maxsize=1024)
+def parse_rrule(text):
+    parts = {}
+    for part in text.strip().removeprefix("RRULE:").split(";"):
+        if not part.strip():
+            continue
+        key, sep, value = part.partition("=")
+        if not sep:
+            raise ValueError(f"Некорректная часть правила повторения: {part!r}")
+        parts[key.strip().upper()] = value.strip()
+
+    try:
+        by_weekday = [WEEKDAYS.index(day.strip().upper())
+                      for day in parts.get("BYDAY", "").split(",") if day.strip()]
+    except ValueError:
+        raise ValueError(f"Некорректные дни недели: {parts['BYDAY']!r}") from None
+
+    return RecurrenceRule(
+        freq=parts.get("FREQ", "").upper(),
+        interval=int(parts.get("INTERVAL", 1)),
+        by_weekday=by_weekday,
+        until=_parse_date(parts["UNTIL"]) if "UNTIL" in parts else None,
+        count=int(parts["COUNT"]) if "COUNT" in parts else None,
+        exdates=[_parse_date(value) for value in parts.get("EXDATE", "").split(",") if value.strip()],
+    )
+
+
+def format_rrule(rule):
+    parts = [f"FREQ={rule.freq}"]
+    if rule.interval != 1:
+        parts.append(f"INTERVAL={rule.interval}")
+    if rule.by_weekday:
+        parts.append("BYDAY=" + ",".join(WEEKDAYS[day] for day in rule.by_weekday))
+    if rule.until is not None:
+        parts.append(f"UNTIL={rule.until:%Y%m%d}")
+    if rule.count is not None:
+        parts.append(f"COUNT={rule.count}")
+    if rule.exdates:
+        parts.append("EXDATE=" + ",".join(f"{day:%Y%m%d}" for day in sorted(rule.exdates)))
+    return ";".join(parts)
+
+
+def describe_rrule(rule):
+    if rule.freq == FREQ_DAILY:
+        text = "каждый день" if rule.interval == 1 else f"каждые {rule.interval} дн."
+    else:
+        text = "каждую неделю" if rule.interval == 1 else f"каждые {rule.interval} нед."
+        if rule.by_weekday:
+            names = ("пн", "вт", "ср", "чт", "пт", "сб", "вс")
+            text += " (" + ", ".join(names[day] for day in rule.by_weekday) + ")"
+    if rule.until is not None:
+        text += f" до {rule.until:%d.%m.%Y}"
+    if rule.count is not None:
+        text += f", {rule.count} раз"
+    return text
+
+
+def _candidates(rule, dtstart, skip_to=None):
+    # Все даты серии по порядку, без учёта UNTIL/COUNT/EXDATE.
+    # skip_to позволяет не перебирать прошлые периоды бесконечной серии
+    if rule.freq == FREQ_DAILY:
+        step = rule.interval
+        first = 0
+        if skip_to is not None and skip_to > dtstart:
+            first = (skip_to - dtstart).days // step * step
+        offset = first
+        while True:
+            yield dtstart + timedelta(days=offset)
+            offset += step
+    else:
+        weekdays = rule.by_weekday or (dtstart.weekday(),)
+        week_start = dtstart - timedelta(days=dtstart.weekday())
+        step = 7 * rule.interval
+        offset = 0
+        if skip_to is not None and skip_to > week_start:
+            offset = (skip_to - week_start).days // step * step
+        while True:
+            for weekday in weekdays:
+                day = week_start + timedelta(days=offset + weekday)
+                if day >= dtstart:
+                    yield day
+            offset += step
+
+
+def expand(rule, dtstart, window_start, window_end):
+    if isinstance(dtstart, str):
+        dtstart = date.fromisoformat(dtstart)
+    if isinstance(window_start, str):
+        window_start = date.fromisoformat(window_start)
+    if isinstance(window_end, str):
+        window_end = date.fromisoformat(window_end)
+
+    # COUNT требует считать повторения с самого начала серии
+    skip_to = window_start if rule.count is None else None
+    result = []
+    for number, day in enumerate(_candidates(rule, dtstart, skip_to), start=1):
+        if day > window_end or (rule.until is not None and day > rule.until):
+            break
+        if rule.count is not None and number > rule.count:
+            break
+        if day >= window_start and day not in rule.exdates:
+            result.append(day)
+    return result
+
+
+def series_end(rule, dtstart):
+    if rule.until is not None:
+        return rule.until
+    if rule.count is not None:
+        if isinstance(dtstart, str):
+            dtstart = date.fromisoformat(dtstart)
+        for number, day in enumerate(_candidates(rule, dtstart), start=1):
+            if number == rule.count:
+                return day
+    return None
+
+
+def close_window(db, date_from=None, date_to=None):
+    # Открытую сторону окна (None) закрывают даты расписания: конечные серии
+    # попадают в окно целиком, бесконечные — до последней даты расписания.
+    # Заданные границы не меняются; None вместо окна — расписание пусто
+    if date_from is not None and date_to is not None:
+        return date_from, date_to
+    first, last = db.query_one("""
+        SELECT MIN(date), MAX(MAX(date), IFNULL((SELECT MAX(series_end) FROM recurrence_rules), ''))
+        FROM events
+    """)
+    if first is None:
+        return None
+    return date_from or first, date_to or last
+
+
+def ensure_window(db, date_from=None, date_to=None):
+    # Повторения разворачиваются в event_occurrences только для запрошенных окон.
+    # Для каждого правила хранится уже развёрнутый диапазон; триггеры сбрасывают его при изменении события.
+    # Открытые стороны окна закрывает close_window
+    window = close_window(db, date_from, date_to)
+    if window is None or window[0] > window[1]:
+        return 0
+    date_from, date_to = window
+
+    stale = db.query("""
+        SELECT r.event_id, r.rrule, e.date, e.start_time, r.expanded_from, r.expanded_to, r.series_end
+        FROM recurrence_rules r JOIN events e USING (event_id)
+        WHERE e.date <= ? AND (r.series_end IS NULL OR r.series_end >= ?)
+          AND (r.expanded_from IS NULL OR r.expanded_from > ? OR r.expanded_to < ?)
+    """, (date_to, date_from, date_from, date_to))
+    if not stale:
+        return 0
+
+    added = 0
+    with db.transaction() as conn:
+        for event_id, rrule, dtstart, start_time, expanded_from, expanded_to, end in stale:
+            new_from = min(date_from, expanded_from) if expanded_from else date_from
+            new_to = max(date_to, expanded_to) if expanded_to else date_to
+            days = [day.strftime(DATE_FORMAT) for day in expand(parse_rrule(rrule), dtstart, max(new_from, dtstart),
+                                                                min(new_to, end or new_to))]
+            rows = [(event_id, day, to_epoch(day, start_time)) for day in days if day != dtstart]
+
+            conn.execute("DELETE FROM event_occurrences WHERE event_id = ?", (event_id,))
+            conn.executemany("INSERT INTO event_occurrences (event_id, date, start_ts) VALUES (?, ?, ?)", rows)
+            conn.execute("UPDATE recurrence_rules SET expanded_from = ?, expanded_to = ? WHERE event_id = ?",
+                         (new_from, new_to, event_id))
+            added += len(rows)
+    return added
+
+
+def set_rule(conn, event_id, rule):
+    if rule is None:
+        conn.execute("DELETE FROM recurrence_rules WHERE event_id = ?", (event_id,))
+        return
+
+    dtstart = conn.execute("SELECT date FROM events WHERE event_id = ?", (event_id,)).fetchone()[0]
+    end = series_end(rule, dtstart)
+    conn.execute("""
+        INSERT INTO recurrence_rules (event_id, rrule, series_end) VALUES (?, ?, ?)
+        ON CONFLICT (event_id) DO UPDATE SET
+            rrule = excluded.rrule, series_end = excluded.series_end,
+            expanded_from = NULL, expanded_to = NULL
+    """, (event_id, format_rrule(rule), end.strftime(DATE_FORMAT) if end else None))
+    conn.execute("DELETE FROM event_occurrences WHERE event_id = ?", (event_id,))
+
+
+def get_rule(db, event_id):
+    row = db.query_one("SELECT rrule FROM recurrence_rules WHERE event_id = ?", (event_id,))
+    return parse_rrule(row[0]) if row else None
@@ -0,0 +1,115 @@
+import heapq
+
+from schedule.profiling import profiled
+from schedule.recurrence import ensure_window
+from schedule.timeutil import DATE_FORMAT, from_epoch
+
+# За сколько секунд до начала события показывать напоминание
+REMINDER_LEAD = 15 * 60
+# Сколько ближайших событий держать в очереди одновременно
+UPCOMING_BATCH = 64
+# На сколько дней вперёд разворачиваются повторяющиеся события для напоминаний
+WINDOW_DAYS = 7
+
+_UPCOMING_SQL = """
+    SELECT event_id, title, start_ts FROM event_instances
+    WHERE (start_ts, event_id) > (?, ?) AND start_ts < ?
+    ORDER BY start_ts, event_id
+    LIMIT ?
+"""
+
+
+class ReminderQueue:
+    def __init__(self, db, lead=REMINDER_LEAD, batch=UPCOMING_BATCH, window_days=WINDOW_DAYS):
+        self._db = db
+        self._lead = lead
+        self._batch = batch
+        self._window = window_days * 24 * 60 * 60
+        self._heap = []
+        # event_id -> {start_ts: title} для актуальных записей кучи;
+        # устаревшие записи в куче пропускаются при извлечении
+        self._scheduled = {}
+        self._fired = set()
+        # Граница загруженной части окна (start_ts, event_id); None — окно загружено целиком
+        self._horizon = None
+        self._window_start = 0
+        self._window_end = 0
+
+    @profiled("reminders.reload")
+    def reload(self, now):
+        self._heap = []
+        self._scheduled = {}
+        self._window_start = now
+        self._window_end = now + self._window
+        ensure_window(self._db, from_epoch(now).strftime(DATE_FORMAT),
+                      from_epoch(self._window_end).strftime(DATE_FORMAT))
+        self._horizon = (now, 0)
+        self._load_more()
+
+    def _load_more(self):
+        if self._horizon is None:
+            return
+        rows = self._db.query(_UPCOMING_SQL, self._horizon + (self._window_end, self._batch))
+        for event_id, title, start_ts in rows:
+            self._push(event_id, title, start_ts)
+        self._horizon = (rows[-1][2], rows[-1][0]) if len(rows) == self._batch else None
+
+    def _push(self, event_id, title, start_ts):
+        if (event_id, start_ts) in self._fired:
+            return
+        self._scheduled.setdefault(event_id, {})[start_ts] = title
+        heapq.heappush(self._heap, (start_ts - self._lead, start_ts, event_id))
+
+    def _is_current(self, entry):
+        _, start_ts, event_id = entry
+        return start_ts in self._scheduled.get(event_id, ())
+
+    def _in_window(self, start_ts, event_id):
+        if start_ts >= self._window_end:
+            return False
+        return self._horizon is None or (start_ts, event_id) <= self._horizon
+
+    def next_due(self):
+        while True:
+            while self._heap and not self._is_current(self._heap[0]):
+                heapq.heappop(self._heap)
+            if self._heap:
+                return self._heap[0][0]
+            if self._horizon is None:
+                return None
+            self._load_more()
+
+    @profiled("reminders.pop_due")
+    def pop_due(self, now):
+        # Окно сдвигается, когда пройдена его половина
+        if now - self._window_start >= self._window // 2:
+            self.reload(now)
+
+        due = []
+        while True:
+            remind_at = self.next_due()
+            if remind_at is None or remind_at > now:
+                break
+            _, start_ts, event_id = heapq.heappop(self._heap)
+            titles = self._scheduled[event_id]
+            title = titles.pop(start_ts)
+            if not titles:
+                del self._scheduled[event_id]
+            self._fired.add((event_id, start_ts))
+            # Событие уже началось, пока приложение не работало — не напоминаем
+            if start_ts >= now:
+                due.append((event_id, title, start_ts))
+
+        self._fired = {key for key in self._fired if key[1] >= now - self._lead}
+        return due
+
+    def event_changed(self, event_id, title, start_ts, now):
+        self._scheduled.pop(event_id, None)
+        if start_ts is not None and start_ts >= now and self._in_window(start_ts, event_id):
+            self._push(event_id, title, start_ts)
+
+    def event_deleted(self, event_id):
+        self._scheduled.pop(event_id, None)
+
+    def __len__(self):
+        return sum(len(titles) for titles in self._scheduled.values())
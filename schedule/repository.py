@@ -0,0 +1,177 @@
+import json
+from collections import namedtuple
+from contextlib import contextmanager
+
+from schedule.db import CHANGE_ADDED, CHANGE_DELETED, CHANGE_UPDATED, Database, DEFAULT_DB_PATH
+from schedule.event_types import type_cache
+from schedule.migrations import migrate
+from schedule.recurrence import ensure_window, set_rule
+from schedule.query import EVENT_FIELDS, EventQuery
+from schedule.search import search_clause
+
+Event = namedtuple("Event", EVENT_FIELDS)
+
+# update_event без rule оставляет правило повторения как есть
+KEEP_RULE = object()
+
+# С такого числа ID групповые операции передают выборку через временную таблицу
+LARGE_SELECTION = 1000
+
+
+def open_database(path=DEFAULT_DB_PATH):
+    db = Database(path)
+    migrate(db)
+    return db
+
+
+def check_times(start_time, end_time):
+    # Время хранится как HH:MM:SS, поэтому строки сравниваются как время
+    if start_time >= end_time:
+        raise ValueError("Время начала должно быть раньше времени окончания!")
+
+
+def get_event(db, event_id):
+    row = db.query_one("SELECT event_id, title, date, start_time, end_time, type_id FROM events WHERE event_id = ?",
+                       (event_id,))
+    return Event(*row) if row else None
+
+
+def add_event(db, title, date, start_time, end_time, event_type, rule=None):
+    # event_type — название типа; незнакомый тип добавляется в справочник
+    check_times(start_time, end_time)
+    types = type_cache(db)
+    try:
+        with db.transaction() as conn:
+            cursor = conn.execute("""
+                INSERT INTO events (title, date, start_time, end_time, type_id)
+                VALUES (?, ?, ?, ?, ?)
+            """, (title, date, start_time, end_time, types.id_for(conn, event_type)))
+            if rule is not None:
+                set_rule(conn, cursor.lastrowid, rule)
+    except Exception:
+        types.invalidate()
+        raise
+    db.notify(CHANGE_ADDED, (cursor.lastrowid,))
+    return cursor.lastrowid
+
+
+def add_events(db, events):
+    # events — кортежи (title, date, start_time, end_time, event_type); всё одной транзакцией
+    types = type_cache(db)
+    event_ids = []
+    try:
+        with db.transaction() as conn:
+            for title, date, start_time, end_time, event_type in events:
+                check_times(start_time, end_time)
+                cursor = conn.execute("""
+                    INSERT INTO events (title, date, start_time, end_time, type_id)
+                    VALUES (?, ?, ?, ?, ?)
+                """, (title, date, start_time, end_time, types.id_for(conn, event_type)))
+                event_ids.append(cursor.lastrowid)
+    except Exception:
+        types.invalidate()
+        raise
+    db.notify(CHANGE_ADDED, event_ids)
+    return event_ids
+
+
+def update_event(db, event_id, title, date, start_time, end_time, event_type, rule=KEEP_RULE):
+    check_times(start_time, end_time)
+    types = type_cache(db)
+    try:
+        with db.transaction() as conn:
+            conn.execute("""
+                UPDATE events
+                SET title = ?, date = ?, start_time = ?, end_time = ?, type_id = ?
+                WHERE event_id = ?
+            """, (title, date, start_time, end_time, types.id_for(conn, event_type), event_id))
+            if rule is not KEEP_RULE:
+                set_rule(conn, event_id, rule)
+    except Exception:
+        types.invalidate()
+        raise
+    db.notify(CHANGE_UPDATED, (event_id,))
+
+
+def delete_event(db, event_id):
+    with db.transaction() as conn:
+        conn.execute("DELETE FROM events WHERE event_id = ?", (event_id,))
+    db.notify(CHANGE_DELETED, (event_id,))
+
+
+@contextmanager
+def _selection(conn, event_ids):
+    # Подзапрос с выбранными ID. Небольшая выборка передаётся одним JSON-параметром,
+    # большая — временной таблицей с первичным ключом
+    if len(event_ids) < LARGE_SELECTION:
+        yield "SELECT value FROM json_each(?)", (json.dumps(event_ids),)
+        return
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS selected_ids (event_id INTEGER PRIMARY KEY)")
+    conn.executemany("INSERT OR IGNORE INTO temp.selected_ids VALUES (?)", ((event_id,) for event_id in event_ids))
+    try:
+        yield "SELECT event_id FROM temp.selected_ids", ()
+    finally:
+        conn.execute("DELETE FROM temp.selected_ids")
+
+
+def delete_events(db, event_ids):
+    # Групповые операции — одна команда на всю выборку и одно уведомление
+    event_ids = tuple(event_ids)
+    with db.transaction() as conn, _selection(conn, event_ids) as (selected, params):
+        conn.execute(f"DELETE FROM events WHERE event_id IN ({selected})", params)
+    db.notify(CHANGE_DELETED, event_ids)
+
+
+def shift_events(db, event_ids, minutes):
+    # Сдвиг времени в пределах суток: если хоть одно событие перешло бы через полночь,
+    # не сдвигается ни одно. time() переносит время через полночь, это и проверяется
+    event_ids = tuple(event_ids)
+    modifier = f"{minutes:+d} minutes"
+    wrapped = "time(end_time, ?) < end_time" if minutes > 0 else "time(start_time, ?) > start_time"
+    with db.transaction() as conn, _selection(conn, event_ids) as (selected, params):
+        row = conn.execute(f"SELECT title FROM events WHERE event_id IN ({selected}) AND {wrapped}",
+                           params + (modifier,)).fetchone()
+        if row is not None:
+            raise ValueError(f"Событие «{row[0]}» после сдвига выйдет за пределы дня")
+        conn.execute(f"""
+            UPDATE events SET start_time = time(start_time, ?), end_time = time(end_time, ?)
+            WHERE event_id IN ({selected})
+        """, (modifier, modifier) + params)
+    db.notify(CHANGE_UPDATED, event_ids)
+
+
+def move_events(db, event_ids, date):
+    event_ids = tuple(event_ids)
+    with db.transaction() as conn, _selection(conn, event_ids) as (selected, params):
+        conn.execute(f"UPDATE events SET date = ? WHERE event_id IN ({selected})", (date,) + params)
+    db.notify(CHANGE_UPDATED, event_ids)
+
+
+def set_events_type(db, event_ids, event_type):
+    event_ids = tuple(event_ids)
+    types = type_cache(db)
+    try:
+        with db.transaction() as conn, _selection(conn, event_ids) as (selected, params):
+            conn.execute(f"UPDATE events SET type_id = ? WHERE event_id IN ({selected})",
+                         (types.id_for(conn, event_type),) + params)
+    except Exception:
+        types.invalidate()
+        raise
+    db.notify(CHANGE_UPDATED, event_ids)
+
+
+def event_query(db, date_from=None, date_to=None, title="", event_type="", text="", time_from=None, time_to=None):
+    # Выборка для таблицы, экспорта и CLI: поиск, диапазон дат и время дня
+    query = EventQuery(search_clause(db, title, event_type, text))
+    if date_from is not None or date_to is not None:
+        query = query.dates(date_from, date_to)
+    return query.times(time_from, time_to)
+
+
+def iter_events(db, query=EventQuery(), limit=None):
+    # Курсор не загружает выборку в память целиком — годится для миллионов строк.
+    # В поле type_id здесь название типа: выборка идёт на вывод, а не в модель
+    if query.window is not None:
+        ensure_window(db, *query.window)
+    sql, params = query.compile(limit=limit, type_names=True)
+    return (Event._make(row[:len(EVENT_FIELDS)]) for row in db.connection().execute(sql, params))
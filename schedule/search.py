@@ -0,0 +1,62 @@
+import re
+from collections import namedtuple
+
+from schedule.event_types import TYPE_NAME_SQL
+
+# join/join_params подключают выборку из полнотекстового индекса,
+# where/params фильтруют таблицу events, order_by задаёт ранжирование
+SearchClause = namedtuple("SearchClause", "join join_params where params order_by")
+
+_TOKEN_RE = re.compile(r'"([^"]+)"|(\S+)')
+
+
+def fts_available(db):
+    row = db.query_one("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'events_fts'")
+    return row is not None
+
+
+def _quote(text):
+    return '"' + text.replace('"', '""') + '"'
+
+
+def parse_terms(text):
+    # Слова в кавычках ищутся как фраза, остальные — по префиксу
+    terms = []
+    for phrase, word in _TOKEN_RE.findall(text or ""):
+        if phrase.strip():
+            terms.append((phrase.strip(), True))
+        elif word:
+            terms.append((word, False))
+    return terms
+
+
+def build_match(title="", event_type="", text=""):
+    parts = []
+    for column, value in (("title", title), ("type", event_type), (None, text)):
+        terms = parse_terms(value)
+        if terms:
+            query = " ".join(_quote(term) if phrase else _quote(term) + "*" for term, phrase in terms)
+            parts.append(f"{column} : ({query})" if column else f"({query})")
+    return " AND ".join(parts)
+
+
+def search_clause(db, title="", event_type="", text=""):
+    if fts_available(db):
+        match = build_match(title, event_type, text)
+        if not match:
+            return SearchClause("", (), "", (), None)
+        join = ("JOIN (SELECT rowid AS hit_id, rank AS hit_rank FROM events_fts WHERE events_fts MATCH ?) AS hits"
+                " ON hits.hit_id = events.event_id")
+        return SearchClause(join, (match,), "", (), "hits.hit_rank")
+
+    # Без FTS5: поиск подстроки без учёта регистра через casefold()
+    conditions = []
+    params = []
+    columns = (("title", title), (f"IFNULL({TYPE_NAME_SQL}, '')", event_type),
+               (f"title || ' ' || IFNULL({TYPE_NAME_SQL}, '')", text))
+    for column, value in columns:
+        for term, _ in parse_terms(value):
+            conditions.append(f"instr(casefold({column}), ?) > 0")
+            params.append(term.casefold())
+    return SearchClause("", (), " AND ".join(conditions), tuple(params), None)
+
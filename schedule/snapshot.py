@@ -0,0 +1,252 @@
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import zlib
+from array import array
+
+from schedule.exporter import ExportResult
+from schedule.importer import BATCH_SIZE, POLICY_SKIP, import_rows
+from schedule.profiling import profiled
+from schedule.recurrence import parse_rrule
+from schedule.timeutil import days_to_date, seconds_to_time
+
+# Снимок расписания — двоичный файл по столбцам (little-endian):
+#   заголовок: сигнатура, версия, флаги, CRC32 данных, число событий, число строк, размер текста;
+#   столбцы по числу событий: ID (int64), дата в днях от 1970-01-01, начало и конец в секундах
+#   от полуночи, номера строк названия, типа и правила повторения (int32, -1 — пусто);
+#   таблица строк: смещения (uint32, строк + 1) и сами строки в UTF-8 подряд.
+# Все столбцы выровнены по своему размеру, поэтому их можно читать прямо из mmap
+SNAPSHOT_EXTENSION = ".snap"
+MAGIC = b"SCHEDSNP"
+VERSION = 1
+_HEADER = struct.Struct("<8sHHIQQQ")
+_COLUMN_TYPES = ("q", "i", "i", "i", "i", "i", "i")
+_NO_STRING = -1
+
+FETCH_SIZE = 2000
+WRITE_BUFFER = 1024 * 1024
+
+# Дата и время переводятся в числа самой SQLite: так Python получает готовые столбцы.
+# Миграция оставляет нераспознанные старые даты и время как есть — для них день равен NULL,
+# а последний столбец — исходные значения, чтобы назвать их в ошибке
+SNAPSHOT_QUERY = """
+    SELECT e.event_id, e.title, CAST(julianday(e.date) - 2440587.5 AS INTEGER),
+           substr(e.start_time, 1, 2) * 3600 + substr(e.start_time, 4, 2) * 60 + substr(e.start_time, 7, 2),
+           substr(e.end_time, 1, 2) * 3600 + substr(e.end_time, 4, 2) * 60 + substr(e.end_time, 7, 2),
+           t.name, r.rrule,
+           CASE WHEN julianday(e.date) IS NULL OR time(e.start_time) IS NULL OR time(e.end_time) IS NULL
+                THEN e.date || ' ' || e.start_time || '–' || e.end_time END
+    FROM events e
+    LEFT JOIN event_types t ON t.type_id = e.type_id
+    LEFT JOIN recurrence_rules r ON r.event_id = e.event_id
+    ORDER BY e.event_id
+"""
+
+
+def _little_endian(column):
+    if sys.byteorder == "big":
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column
+
+
+def is_snapshot(path):
+    with open(path, "rb") as file:
+        return file.read(len(MAGIC)) == MAGIC
+
+
+@profiled("export_snapshot")
+def export_snapshot(db, path, progress=None, is_cancelled=None):
+    conn = db.connection()
+    total = conn.execute("SELECT COUNT(*) FROM events").fetchone()[0] or 1
+    columns = [array(typecode) for typecode in _COLUMN_TYPES]
+    event_ids, dates, starts, ends, titles, types, rules = columns
+    strings = {}
+
+    def string_index(value):
+        if value is None:
+            return _NO_STRING
+        index = strings.get(value)
+        if index is None:
+            index = strings[value] = len(strings)
+        return index
+
+    cursor = conn.execute(SNAPSHOT_QUERY)
+    while True:
+        rows = cursor.fetchmany(FETCH_SIZE)
+        if not rows:
+            break
+        if is_cancelled is not None and is_cancelled():
+            cursor.close()
+            return ExportResult(path, 0, True)
+        for event_id, title, day, start, end, type_name, rrule, invalid in rows:
+            if invalid is not None:
+                cursor.close()
+                raise ValueError(f"Событие {event_id}: нераспознанные дата или время «{invalid}», "
+                                 f"снимок не записан")
+            event_ids.append(event_id)
+            dates.append(day)
+            starts.append(start)
+            ends.append(end)
+            titles.append(string_index(title))
+            types.append(string_index(type_name))
+            rules.append(string_index(rrule))
+        if progress is not None:
+            progress(min(99, len(event_ids) * 100 // total))
+
+    encoded = [value.encode("utf-8") for value in strings]
+    offsets = array("I", [0])
+    for value in encoded:
+        offsets.append(offsets[-1] + len(value))
+    parts = [_little_endian(column) for column in columns + [offsets]] + [b"".join(encoded)]
+
+    checksum = 0
+    for part in parts:
+        checksum = zlib.crc32(part, checksum)
+    header = _HEADER.pack(MAGIC, VERSION, 0, checksum, len(event_ids), len(encoded), offsets[-1])
+
+    # Как и экспорт в CSV: временный файл рядом с целевым, подмена только в конце
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".part")
+    try:
+        with os.fdopen(fd, "wb", buffering=WRITE_BUFFER) as file:
+            file.write(header)
+            for part in parts:
+                file.write(part)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    if progress is not None:
+        progress(100)
+    return ExportResult(path, len(event_ids), False)
+
+
+class Snapshot:
+    # Снимок, открытый только для чтения. Столбцы — представления memoryview прямо
+    # над mmap файла: открытие не копирует данные, строки декодируются по запросу
+    def __init__(self, path, verify=True):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = None
+        self._views = []
+        try:
+            self._open(verify)
+        except BaseException:
+            self.close()
+            raise
+
+    def _open(self, verify):
+        size = os.fstat(self._file.fileno()).st_size
+        if size < _HEADER.size:
+            raise ValueError("Файл не является снимком расписания")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, checksum, count, string_count, text_size = _HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError("Файл не является снимком расписания")
+        if version != VERSION:
+            raise ValueError(f"Неподдерживаемая версия снимка: {version}")
+        expected = _HEADER.size + count * (8 + 4 * (len(_COLUMN_TYPES) - 1)) + (string_count + 1) * 4 + text_size
+        if size != expected:
+            raise ValueError("Снимок повреждён: неверный размер файла")
+
+        data = memoryview(self._map)
+        self._views.append(data)
+        if verify and zlib.crc32(data[_HEADER.size:]) != checksum:
+            raise ValueError("Снимок повреждён: не сходится контрольная сумма")
+
+        self.count = count
+        self.string_count = string_count
+        position = _HEADER.size
+        columns = []
+        for typecode, length in zip(_COLUMN_TYPES + ("I",), (count,) * len(_COLUMN_TYPES) + (string_count + 1,)):
+            columns.append(self._column(data, position, typecode, length))
+            position += columns[-1].itemsize * length
+        (self.event_ids, self.dates, self.starts, self.ends,
+         self.titles, self.types, self.rules, self._offsets) = columns
+        self._text = data[position:]
+        self._views.append(self._text)
+        self._strings = {}
+
+    def _column(self, data, position, typecode, length):
+        raw = data[position:position + array(typecode).itemsize * length]
+        self._views.append(raw)
+        if sys.byteorder == "big":
+            column = array(typecode, raw.tobytes())
+            column.byteswap()
+            return column
+        column = raw.cast(typecode)
+        self._views.append(column)
+        return column
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def string(self, index):
+        if index == _NO_STRING:
+            return None
+        value = self._strings.get(index)
+        if value is None:
+            value = self._strings[index] = str(self._text[self._offsets[index]:self._offsets[index + 1]], "utf-8")
+        return value
+
+    def row(self, index):
+        # Событие в том же виде, что строка ALL_EVENTS_QUERY: ID, название, дата, начало, конец, тип, правило
+        return (self.event_ids[index], self.string(self.titles[index]), days_to_date(self.dates[index]),
+                seconds_to_time(self.starts[index]), seconds_to_time(self.ends[index]),
+                self.string(self.types[index]), self.string(self.rules[index]))
+
+    def close(self):
+        # Представления держат буфер mmap: их нужно освободить до закрытия
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+
+def _snapshot_batches(snapshot, batch_size, done):
+    times = {}
+
+    def time_text(seconds):
+        if seconds not in times:
+            times[seconds] = seconds_to_time(seconds)
+        return times[seconds]
+
+    strings = [snapshot.string(index) for index in range(snapshot.string_count)]
+    rules = {}
+    for first in range(0, len(snapshot), batch_size):
+        entries = []
+        for index in range(first, min(first + batch_size, len(snapshot))):
+            row = (snapshot.event_ids[index], strings[snapshot.titles[index]], days_to_date(snapshot.dates[index]),
+                   time_text(snapshot.starts[index]), time_text(snapshot.ends[index]),
+                   strings[snapshot.types[index]] if snapshot.types[index] != _NO_STRING else None)
+            rule = snapshot.rules[index]
+            if rule != _NO_STRING:
+                if rule not in rules:
+                    rules[rule] = parse_rrule(strings[rule])
+                row += (rules[rule],)
+            entries.append((index + 1, row))
+        done[0] += len(entries)
+        yield len(entries), entries, []
+
+
+@profiled("import_snapshot")
+def import_snapshot(db, path, policy=POLICY_SKIP, batch_size=BATCH_SIZE, validate=None,
+                    progress=None, is_cancelled=None):
+    # Снимок проверен контрольной суммой и записан из базы, поэтому строки не разбираются
+    # заново, как в CSV, а сразу идут пачками в ту же вставку, что и импорт CSV
+    with Snapshot(path) as snapshot:
+        total = len(snapshot) or 1
+        done = [0]
+        return import_rows(db, _snapshot_batches(snapshot, batch_size, done), policy, validate, len(snapshot),
+                           lambda: done[0] * 100 // total, progress, is_cancelled)
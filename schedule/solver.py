@@ -0,0 +1,380 @@
+import csv
+import multiprocessing
+import queue
+import time
+from collections import defaultdict, namedtuple
+from datetime import date, timedelta
+
+from schedule import repository
+from schedule.event_types import normalize_type_name, type_cache, type_key
+from schedule.recurrence import ensure_window
+from schedule.timeutil import DATE_FORMAT, DAY_NAMES, minutes_to_time, normalize_time, time_to_minutes, week_start
+
+# Сетка подбора: сутки делятся на слоты, занятость дня — битовая маска слотов
+SLOT_MINUTES = 15
+DAY_SLOTS = 24 * 60 // SLOT_MINUTES
+WEEK_DAYS = 7
+
+DEFAULT_DAYS = (0, 1, 2, 3, 4)
+DEFAULT_WINDOW = ("08:00:00", "20:00:00")
+DEFAULT_TIME_BUDGET = 5.0
+# Сколько уже размещённых событий можно вытеснить, чтобы поставить неразмещённое
+MAX_EJECTED = 2
+
+# Файл заданий: одна строка — событие (или несколько одинаковых), которое нужно разместить
+REQUEST_HEADER = ["Название", "Длительность", "Тип", "Дни", "С", "До", "Ресурсы", "Количество"]
+
+# duration, window_start и window_end — минуты от начала суток; days — дни недели (0 — понедельник);
+# resources — аудитории, преподаватели, группы: события с общим ресурсом не пересекаются
+PlacementRequest = namedtuple("PlacementRequest", "title duration event_type days window_start window_end resources")
+Placement = namedtuple("Placement", "title date start_time end_time event_type")
+SolveResult = namedtuple("SolveResult", "placements unplaced elapsed cancelled")
+
+# Ключ ресурса «всё расписание»: когда пересечения запрещены между любыми событиями
+_EVERYTHING = ("all",)
+
+_BUSY_SQL = """
+    SELECT date, start_time, end_time, type_id FROM event_instances
+    WHERE date BETWEEN ? AND ?
+"""
+
+
+def _parse_minutes(value):
+    value = value.strip()
+    if ":" in value:
+        return time_to_minutes(value)
+    return int(value)
+
+
+def parse_days(value):
+    # «пн,ср,пт», «пн-пт» или номера дней 1–7; пусто — будние дни
+    value = value.strip().casefold()
+    if not value:
+        return DEFAULT_DAYS
+    days = set()
+    for part in value.replace(" ", "").split(","):
+        first, _, last = part.partition("-")
+        first, last = _day_number(first), _day_number(last or first)
+        if last < first:
+            raise ValueError(f"Некорректный диапазон дней: {part!r}")
+        days.update(range(first, last + 1))
+    return tuple(sorted(days))
+
+
+def _day_number(value):
+    if value in DAY_NAMES:
+        return DAY_NAMES.index(value)
+    if value.isdigit() and 1 <= int(value) <= WEEK_DAYS:
+        return int(value) - 1
+    raise ValueError(f"Некорректный день недели: {value!r}")
+
+
+def parse_request(row):
+    row = [cell.strip() for cell in row] + [""] * (len(REQUEST_HEADER) - len(row))
+    title, duration, event_type, days, window_start, window_end, resources, count = row[:len(REQUEST_HEADER)]
+    if not title:
+        raise ValueError("Не указано название")
+    try:
+        duration = _parse_minutes(duration)
+        count = int(count) if count else 1
+    except ValueError:
+        raise ValueError("Длительность и количество должны быть числами")
+    if duration <= 0 or count <= 0:
+        raise ValueError("Длительность и количество должны быть положительными")
+    window_start = time_to_minutes(normalize_time(window_start or DEFAULT_WINDOW[0]))
+    window_end = time_to_minutes(normalize_time(window_end or DEFAULT_WINDOW[1]))
+    if window_end - window_start < duration:
+        raise ValueError(f"«{title}» не помещается в окно {minutes_to_time(window_start)[:5]}–"
+                         f"{minutes_to_time(window_end)[:5]}")
+    labels = tuple(sorted({label.strip().casefold() for label in resources.split(";") if label.strip()}))
+    request = PlacementRequest(title, duration, normalize_type_name(event_type), parse_days(days),
+                               window_start, window_end, labels)
+    return [request] * count
+
+
+def read_requests(path):
+    requests = []
+    with open(path, newline="", encoding="utf-8-sig") as file:
+        reader = csv.reader(file)
+        next(reader, None)
+        for line, row in enumerate(reader, start=2):
+            if not any(cell.strip() for cell in row):
+                continue
+            try:
+                requests.extend(parse_request(row))
+            except ValueError as e:
+                raise ValueError(f"Строка {line}: {e}")
+    return requests
+
+
+def _resource_keys(event_type, labels, by_type):
+    keys = {("type", type_key(event_type))} if by_type else {_EVERYTHING}
+    keys.update(("resource", label) for label in labels)
+    return frozenset(keys)
+
+
+def load_busy(db, monday, by_type=False):
+    # Уже занятое время недели: (день, первый слот, слот после последнего, ресурс)
+    sunday = monday + timedelta(days=WEEK_DAYS - 1)
+    date_from, date_to = monday.strftime(DATE_FORMAT), sunday.strftime(DATE_FORMAT)
+    ensure_window(db, date_from, date_to)
+    types = type_cache(db)
+    busy = []
+    for day, start_time, end_time, type_id in db.query(_BUSY_SQL, (date_from, date_to)):
+        start = time_to_minutes(start_time) // SLOT_MINUTES
+        end = -(-time_to_minutes(end_time) // SLOT_MINUTES)
+        if end <= start:
+            end = start + 1
+        resource = ("type", type_key(types.name(type_id))) if by_type else _EVERYTHING
+        busy.append(((date.fromisoformat(day) - monday).days, start, min(end, DAY_SLOTS), resource))
+    return busy
+
+
+class _Solver:
+    # Жадное размещение «самые стеснённые — первыми», затем локальный поиск:
+    # вытеснение мешающих событий для неразмещённых и перестановки для улучшения.
+    # Занятость хранится масками по ресурсам, поэтому проверка места — несколько AND
+    def __init__(self, requests, busy, by_type, deadline, is_cancelled):
+        self.requests = requests
+        self.deadline = deadline
+        self.is_cancelled = is_cancelled
+        self.lengths = [-(-request.duration // SLOT_MINUTES) for request in requests]
+        self.keys = [_resource_keys(request.event_type, request.resources, by_type) for request in requests]
+        self.titles = [request.title.casefold() for request in requests]
+        self.candidates = [self._candidates(request, length) for request, length in zip(requests, self.lengths)]
+
+        self.fixed = defaultdict(lambda: [0] * WEEK_DAYS)
+        for day, start, end, resource in busy:
+            self.fixed[resource][day] |= ((1 << (end - start)) - 1) << start
+        self.placed = defaultdict(lambda: [0] * WEEK_DAYS)
+        self.position = [None] * len(requests)
+        self.day_tasks = [set() for _ in range(WEEK_DAYS)]
+        self.day_load = [0] * WEEK_DAYS
+        self.title_days = defaultdict(int)
+
+    @staticmethod
+    def _candidates(request, length):
+        first = -(-request.window_start // SLOT_MINUTES)
+        last = (request.window_end - request.duration) // SLOT_MINUTES
+        return [(day, slot) for day in request.days for slot in range(first, last + 1)
+                if slot + length <= DAY_SLOTS]
+
+    def out_of_time(self):
+        return time.monotonic() > self.deadline or (self.is_cancelled is not None and self.is_cancelled())
+
+    def _mask(self, index, slot):
+        return ((1 << self.lengths[index]) - 1) << slot
+
+    def fits(self, index, day, slot):
+        mask = self._mask(index, slot)
+        for key in self.keys[index]:
+            if ((self.fixed[key][day] if key in self.fixed else 0)
+                    | (self.placed[key][day] if key in self.placed else 0)) & mask:
+                return False
+        return True
+
+    def blocked_by_fixed(self, index, day, slot):
+        mask = self._mask(index, slot)
+        return any(key in self.fixed and self.fixed[key][day] & mask for key in self.keys[index])
+
+    def blockers(self, index, day, slot):
+        mask = self._mask(index, slot)
+        keys = self.keys[index]
+        return [other for other in self.day_tasks[day]
+                if self._mask(other, self.position[other][1]) & mask and keys & self.keys[other]]
+
+    def cost(self, index, day, slot):
+        # Одинаковые занятия — в разные дни, дни загружены ровно, время — пораньше
+        return 1000 * self.title_days[self.titles[index], day] + 10 * self.day_load[day] + slot
+
+    def place(self, index, day, slot):
+        mask = self._mask(index, slot)
+        for key in self.keys[index]:
+            self.placed[key][day] |= mask
+        self.position[index] = (day, slot)
+        self.day_tasks[day].add(index)
+        self.day_load[day] += self.lengths[index]
+        self.title_days[self.titles[index], day] += 1
+
+    def remove(self, index):
+        day, slot = self.position[index]
+        mask = self._mask(index, slot)
+        for key in self.keys[index]:
+            self.placed[key][day] &= ~mask
+        self.position[index] = None
+        self.day_tasks[day].discard(index)
+        self.day_load[day] -= self.lengths[index]
+        self.title_days[self.titles[index], day] -= 1
+
+    def best_position(self, index):
+        best = None
+        best_cost = None
+        for day, slot in self.candidates[index]:
+            if self.fits(index, day, slot):
+                cost = self.cost(index, day, slot)
+                if best_cost is None or cost < best_cost:
+                    best, best_cost = (day, slot), cost
+        return best
+
+    def greedy(self, progress):
+        order = sorted(range(len(self.requests)),
+                       key=lambda index: (len(self.candidates[index]), -self.lengths[index], index))
+        for done, index in enumerate(order, start=1):
+            if self.out_of_time():
+                return
+            position = self.best_position(index)
+            if position is not None:
+                self.place(index, *position)
+            progress(done * 60 // len(order))
+
+    def repair(self, index):
+        # Место для index ценой вытеснения 1–2 событий, которые встанут в другое место
+        for day, slot in sorted(self.candidates[index], key=lambda position: self.cost(index, *position)):
+            if self.blocked_by_fixed(index, day, slot):
+                continue
+            ejected = self.blockers(index, day, slot)
+            if len(ejected) > MAX_EJECTED:
+                continue
+            previous = {other: self.position[other] for other in ejected}
+            for other in ejected:
+                self.remove(other)
+            self.place(index, day, slot)
+            moved = []
+            for other in ejected:
+                position = self.best_position(other)
+                if position is None:
+                    break
+                self.place(other, *position)
+                moved.append(other)
+            else:
+                return True
+            for other in moved:
+                self.remove(other)
+            self.remove(index)
+            for other, position in previous.items():
+                self.place(other, *position)
+        return False
+
+    def improve(self):
+        changed = False
+        for index, position in enumerate(self.position):
+            if position is None:
+                continue
+            if self.out_of_time():
+                break
+            self.remove(index)
+            best = self.best_position(index)
+            # Только строго лучшее место: при равной цене события не «гуляют» по кругу
+            if self.cost(index, *best) < self.cost(index, *position):
+                self.place(index, *best)
+                changed = True
+            else:
+                self.place(index, *position)
+        return changed
+
+    def solve(self, progress):
+        self.greedy(progress)
+        unplaced = [index for index, position in enumerate(self.position) if position is None]
+        while unplaced and not self.out_of_time():
+            before = len(unplaced)
+            for index in unplaced:
+                if self.out_of_time():
+                    break
+                self.repair(index)
+            unplaced = [index for index, position in enumerate(self.position) if position is None]
+            progress(90 - 30 * len(unplaced) // max(1, before))
+            if len(unplaced) == before:
+                break
+        progress(90)
+        while not self.out_of_time() and self.improve():
+            pass
+        progress(100)
+        return self.position
+
+
+def solve_positions(requests, busy, by_type=False, time_budget=DEFAULT_TIME_BUDGET, progress=None,
+                    is_cancelled=None):
+    # Чистая функция без БД: для каждого задания (день недели, слот) или None.
+    # При отмене — None, как у solve_in_process
+    solver = _Solver(requests, busy, by_type, time.monotonic() + time_budget, is_cancelled)
+    positions = solver.solve(progress or (lambda percent: None))
+    if is_cancelled is not None and is_cancelled():
+        return None
+    return positions
+
+
+def _solve_worker(requests, busy, by_type, time_budget, messages):
+    last = [-1]
+
+    def progress(percent):
+        if percent != last[0]:
+            last[0] = percent
+            messages.put(("progress", percent))
+
+    try:
+        messages.put(("done", solve_positions(requests, busy, by_type, time_budget, progress)))
+    except Exception as e:
+        messages.put(("error", str(e)))
+
+
+def solve_in_process(requests, busy, by_type=False, time_budget=DEFAULT_TIME_BUDGET, progress=None,
+                     is_cancelled=None):
+    # Подбор идёт в отдельном процессе: интерфейс и GIL свободны, отмена — просто остановка процесса.
+    # spawn, а не fork: форк процесса с потоками Qt и SQLite небезопасен
+    context = multiprocessing.get_context("spawn")
+    messages = context.Queue()
+    process = context.Process(target=_solve_worker, args=(requests, busy, by_type, time_budget, messages),
+                              daemon=True)
+    process.start()
+    try:
+        while True:
+            if is_cancelled is not None and is_cancelled():
+                return None
+            try:
+                kind, value = messages.get(timeout=0.1)
+            except queue.Empty:
+                if process.exitcode is not None and messages.empty():
+                    raise RuntimeError(f"процесс подбора завершился с кодом {process.exitcode}")
+                continue
+            if kind == "progress":
+                if progress is not None:
+                    progress(value)
+            elif kind == "error":
+                raise RuntimeError(value)
+            else:
+                return value
+    finally:
+        if process.is_alive():
+            process.terminate()
+        process.join()
+
+
+def plan_week(db, requests, monday, by_type=False, time_budget=DEFAULT_TIME_BUDGET, in_process=True,
+              progress=None, is_cancelled=None):
+    # Размещает задания на неделе, начинающейся с monday, вокруг уже записанных событий.
+    # Ничего не записывает: результат сохраняет save_placements
+    started = time.monotonic()
+    busy = load_busy(db, monday, by_type)
+    solve = solve_in_process if in_process else solve_positions
+    positions = solve(requests, busy, by_type, time_budget, progress=progress, is_cancelled=is_cancelled)
+    elapsed = time.monotonic() - started
+    if positions is None:
+        return SolveResult([], list(requests), elapsed, True)
+
+    placements = []
+    unplaced = []
+    for request, position in zip(requests, positions):
+        if position is None:
+            unplaced.append(request)
+            continue
+        day, slot = position
+        start = slot * SLOT_MINUTES
+        placements.append(Placement(request.title, (monday + timedelta(days=day)).strftime(DATE_FORMAT),
+                                    minutes_to_time(start), minutes_to_time(start + request.duration),
+                                    request.event_type))
+    placements.sort(key=lambda placement: (placement.date, placement.start_time, placement.title))
+    return SolveResult(placements, unplaced, elapsed, False)
+
+
+def save_placements(db, placements):
+    return repository.add_events(db, placements)
@@ -0,0 +1,445 @@
+import html
+import json
+import multiprocessing
+import os
+import re
+import sys
+import tempfile
+import threading
+import zlib
+from collections import OrderedDict, namedtuple
+from datetime import date, datetime, timedelta, timezone
+
+from schedule.db import CHANGE_DELETED, CHANGE_RELOADED, Database
+from schedule.event_types import TYPE_NAME_SQL
+from schedule.profiling import profiled
+from schedule.recurrence import ensure_window
+from schedule.timeutil import DATE_FORMAT, DAY_NAMES, time_to_minutes, week_start
+
+FORMAT_HTML = "html"
+FORMAT_PDF = "pdf"
+FORMAT_ICS = "ics"
+FORMATS = (FORMAT_HTML, FORMAT_PDF, FORMAT_ICS)
+
+# Строка сетки — полчаса; сетка не уже рабочего дня, даже если событий мало
+SLOT_MINUTES = 30
+DEFAULT_DAY = (8 * 60, 18 * 60)
+# Сколько раскладок недель держать в памяти
+WEEK_CACHE_SIZE = 64
+FETCH_SIZE = 2000
+WRITE_BUFFER = 1024 * 1024
+# Цвета ячеек: тип события всегда получает один и тот же
+PALETTE = ("#dbe9f6", "#fde2c8", "#d9f2d9", "#f6d5e5", "#e8e0f5", "#fff3bf", "#d3f0ee", "#f2dcd3")
+
+# day — день недели (0 — понедельник), lane — столбец внутри дня для пересекающихся событий,
+# row и span — первая строка сетки и число строк
+TimetableBlock = namedtuple("TimetableBlock", "event_id title event_type start_time end_time day lane row span")
+# first_minute — время первой строки сетки; lanes — число столбцов у каждого дня;
+# event_ids — события недели, по ним кэш решает, что сбросить
+WeekLayout = namedtuple("WeekLayout", "monday first_minute rows lanes blocks event_ids")
+TimetableResult = namedtuple("TimetableResult", "paths events cancelled")
+
+# Диапазон дат идёт по индексам (date, ...) таблиц событий и повторений
+_RANGE_SQL = f"""
+    SELECT event_id, title, date, start_time, end_time, {TYPE_NAME_SQL}
+    FROM event_instances AS events
+    WHERE date BETWEEN ? AND ?
+"""
+_TYPE_FILTER_SQL = " AND type_id = (SELECT type_id FROM event_types WHERE name = ?)"
+_ORDER_SQL = " ORDER BY date, start_time, event_id"
+
+_TYPES_IN_RANGE_SQL = """
+    SELECT DISTINCT t.name FROM event_instances e JOIN event_types t ON t.type_id = e.type_id
+    WHERE e.date BETWEEN ? AND ?
+    ORDER BY t.name
+"""
+
+
+def _range_query(date_from, date_to, event_type):
+    if event_type is None:
+        return _RANGE_SQL + _ORDER_SQL, (date_from, date_to)
+    return _RANGE_SQL + _TYPE_FILTER_SQL + _ORDER_SQL, (date_from, date_to, event_type)
+
+
+def check_range(date_from, date_to):
+    if date_from > date_to:
+        raise ValueError(f"Начальная дата {date_from} позже конечной {date_to}")
+
+
+def week_mondays(date_from, date_to):
+    monday = week_start(date_from)
+    last = date.fromisoformat(date_to)
+    mondays = []
+    while monday <= last:
+        mondays.append(monday)
+        monday += timedelta(days=7)
+    return mondays
+
+
+def build_week_layout(db, monday, event_type=None):
+    sunday = monday + timedelta(days=6)
+    first, last = monday.strftime(DATE_FORMAT), sunday.strftime(DATE_FORMAT)
+    ensure_window(db, first, last)
+    rows = db.query(*_range_query(first, last, event_type))
+
+    spans = [(time_to_minutes(row[3]), max(time_to_minutes(row[4]), time_to_minutes(row[3]) + 1)) for row in rows]
+    first_minute = min([DEFAULT_DAY[0]] + [start // SLOT_MINUTES * SLOT_MINUTES for start, _ in spans])
+    last_minute = max([DEFAULT_DAY[1]] + [-(-end // SLOT_MINUTES) * SLOT_MINUTES for _, end in spans])
+
+    # Столбцы раздаются по строкам сетки, а не по минутам: два события в одном
+    # получасе не должны делить ячейку таблицы
+    blocks = []
+    lane_ends = [[] for _ in range(7)]
+    for (event_id, title, day, start_time, end_time, type_name), (start, end) in zip(rows, spans):
+        weekday = date.fromisoformat(day).weekday()
+        row = (start - first_minute) // SLOT_MINUTES
+        end_row = -(-(end - first_minute) // SLOT_MINUTES)
+        ends = lane_ends[weekday]
+        lane = next((lane for lane, lane_end in enumerate(ends) if lane_end <= row), len(ends))
+        if lane == len(ends):
+            ends.append(end_row)
+        else:
+            ends[lane] = end_row
+        blocks.append(TimetableBlock(event_id, title, type_name, start_time, end_time, weekday, lane, row,
+                                     end_row - row))
+
+    return WeekLayout(monday, first_minute, (last_minute - first_minute) // SLOT_MINUTES,
+                      tuple(max(1, len(ends)) for ends in lane_ends), tuple(blocks),
+                      frozenset(row[0] for row in rows))
+
+
+class WeekLayoutCache:
+    # Раскладки недель по ключу (понедельник, тип). Изменение событий сбрасывает только
+    # недели, где эти события были или оказались. version, как у MonthCache, не даёт
+    # положить в кэш раскладку, посчитанную до изменения
+    def __init__(self, capacity=WEEK_CACHE_SIZE):
+        self.capacity = capacity
+        self.version = 0
+        self._lock = threading.Lock()
+        self._layouts = OrderedDict()
+
+    def layout(self, db, monday, event_type=None):
+        key = (monday, event_type)
+        with self._lock:
+            layout = self._layouts.get(key)
+            if layout is not None:
+                self._layouts.move_to_end(key)
+                return layout
+            version = self.version
+
+        layout = build_week_layout(db, monday, event_type)
+        with self._lock:
+            if version == self.version:
+                self._layouts[key] = layout
+                while len(self._layouts) > self.capacity:
+                    self._layouts.popitem(last=False)
+        return layout
+
+    def invalidate(self, db, kind, event_ids):
+        changed = set(event_ids)
+        mondays = set()
+        if kind != CHANGE_RELOADED and kind != CHANGE_DELETED and changed:
+            # Куда событие попало теперь; повторяющееся может задеть любую неделю
+            rows = db.query("""
+                SELECT e.date, r.event_id IS NOT NULL FROM events e
+                LEFT JOIN recurrence_rules r ON r.event_id = e.event_id
+                WHERE e.event_id IN (SELECT value FROM json_each(?))
+            """, (json.dumps(sorted(changed)),))
+            if any(recurring for _, recurring in rows):
+                kind = CHANGE_RELOADED
+            mondays = {week_start(day) for day, _ in rows}
+
+        with self._lock:
+            self.version += 1
+            if kind == CHANGE_RELOADED or not changed:
+                self._layouts.clear()
+                return
+            for key in [key for key, layout in self._layouts.items()
+                        if key[0] in mondays or layout.event_ids & changed]:
+                del self._layouts[key]
+
+    def clear(self):
+        with self._lock:
+            self.version += 1
+            self._layouts.clear()
+
+    def __len__(self):
+        return len(self._layouts)
+
+
+def _minutes_text(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def _type_color(event_type):
+    if not event_type:
+        return "#eeeeee"
+    return PALETTE[zlib.crc32(event_type.encode("utf-8")) % len(PALETTE)]
+
+
+def render_week_html(layout, heading="", page_break=False):
+    sunday = layout.monday + timedelta(days=6)
+    style = ' style="page-break-before: always"' if page_break else ""
+    parts = [f'<h2{style}>{html.escape(heading)}{" — " if heading else ""}'
+             f'{layout.monday:%d.%m} – {sunday:%d.%m.%Y}</h2>',
+             '<table border="1" cellspacing="0" cellpadding="3" width="100%">',
+             '<tr><th>Время</th>']
+    for day, lanes in enumerate(layout.lanes):
+        parts.append(f'<th colspan="{lanes}">{DAY_NAMES[day].capitalize()} '
+                     f'{layout.monday + timedelta(days=day):%d.%m}</th>')
+    parts.append("</tr>")
+
+    starts = {(block.day, block.lane, block.row): block for block in layout.blocks}
+    covered = set()
+    for block in layout.blocks:
+        covered.update((block.day, block.lane, row) for row in range(block.row + 1, block.row + block.span))
+
+    for row in range(layout.rows):
+        parts.append(f'<tr><td class="time">{_minutes_text(layout.first_minute + row * SLOT_MINUTES)}</td>')
+        for day, lanes in enumerate(layout.lanes):
+            for lane in range(lanes):
+                block = starts.get((day, lane, row))
+                if block is not None:
+                    type_line = f"<br/><i>{html.escape(block.event_type)}</i>" if block.event_type else ""
+                    parts.append(f'<td rowspan="{block.span}" bgcolor="{_type_color(block.event_type)}">'
+                                 f'<b>{html.escape(block.title)}</b><br/>'
+                                 f'{block.start_time[:5]}–{block.end_time[:5]}{type_line}</td>')
+                elif (day, lane, row) not in covered:
+                    parts.append("<td></td>")
+        parts.append("</tr>")
+    parts.append("</table>")
+    return "".join(parts)
+
+
+def render_html(layouts, title="Расписание"):
+    # Каждая неделя — своя страница при печати
+    weeks = [render_week_html(layout, title, number > 0) for number, layout in enumerate(layouts)]
+    return ('<html><head><meta charset="utf-8"/>'
+            f"<title>{html.escape(title)}</title>"
+            "<style>body { font-family: Arial, sans-serif; font-size: 9pt; } "
+            "td.time { color: #555555; } td { vertical-align: top; }</style>"
+            "</head><body>" + "".join(weeks) + "</body></html>")
+
+
+def _replace_file(path, mode, write):
+    # Как экспорт CSV: пишем рядом во временный файл и подменяем целевой только в конце
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".part")
+    try:
+        if mode == "b":
+            os.close(fd)
+            write(temp_path)
+        else:
+            with os.fdopen(fd, "w", encoding="utf-8", newline="", buffering=WRITE_BUFFER) as file:
+                write(file)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+_application = None
+
+
+def _ensure_qt():
+    # PDF рисует Qt. Без окна (командная строка, процессы пакетной выгрузки) нужен свой
+    # QGuiApplication на платформе offscreen; в приложении он уже есть
+    global _application
+    from PyQt5.QtGui import QGuiApplication
+    if QGuiApplication.instance() is None:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        _application = QGuiApplication(sys.argv[:1])
+
+
+def write_pdf(path, document_html):
+    _ensure_qt()
+    from PyQt5.QtCore import QMarginsF
+    from PyQt5.QtGui import QPageLayout, QPageSize, QTextDocument
+    from PyQt5.QtPrintSupport import QPrinter
+
+    def write(temp_path):
+        printer = QPrinter(QPrinter.HighResolution)
+        printer.setOutputFormat(QPrinter.PdfFormat)
+        printer.setOutputFileName(temp_path)
+        printer.setPageLayout(QPageLayout(QPageSize(QPageSize.A4), QPageLayout.Landscape,
+                                          QMarginsF(10, 10, 10, 10), QPageLayout.Millimeter))
+        document = QTextDocument()
+        document.setHtml(document_html)
+        document.print_(printer)
+
+    _replace_file(path, "b", write)
+
+
+def _ics_text(value):
+    return (value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+
+def _ics_line(line):
+    # Строки iCalendar длиннее 75 байт переносятся; продолжение начинается с пробела
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line + "\r\n"
+    pieces = []
+    while encoded:
+        limit = 75 if not pieces else 74
+        cut = min(limit, len(encoded))
+        # Не резать символ UTF-8 посередине
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        pieces.append(encoded[:cut].decode("utf-8"))
+        encoded = encoded[cut:]
+    return "\r\n ".join(pieces) + "\r\n"
+
+
+def _ics_datetime(day, time):
+    # Время в базе — местное без часового пояса, в iCalendar это «плавающее» время
+    return day.replace("-", "") + "T" + time.replace(":", "")
+
+
+def write_ics(db, path, date_from, date_to, event_type=None, title="Расписание", progress=None,
+              is_cancelled=None):
+    # Каждое повторение — отдельное VEVENT со своим UID: календарь телефона
+    # при обновлении подписки заменяет события, а не дублирует их
+    ensure_window(db, date_from, date_to)
+    conn = db.connection()
+    query, params = _range_query(date_from, date_to, event_type)
+    total = conn.execute(f"SELECT COUNT(*) FROM ({query})", params).fetchone()[0] or 1
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    written = [0]
+
+    def write(file):
+        file.write(_ics_line("BEGIN:VCALENDAR") + _ics_line("VERSION:2.0")
+                   + _ics_line("PRODID:-//schedule//timetable//RU") + _ics_line("CALSCALE:GREGORIAN")
+                   + _ics_line(f"X-WR-CALNAME:{_ics_text(title)}"))
+        cursor = conn.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(FETCH_SIZE)
+            if not rows:
+                break
+            if is_cancelled is not None and is_cancelled():
+                cursor.close()
+                raise _Cancelled()
+            file.writelines(
+                _ics_line("BEGIN:VEVENT") + _ics_line(f"UID:{event_id}-{day.replace('-', '')}@schedule")
+                + _ics_line(f"DTSTAMP:{stamp}") + _ics_line(f"DTSTART:{_ics_datetime(day, start_time)}")
+                + _ics_line(f"DTEND:{_ics_datetime(day, end_time)}") + _ics_line(f"SUMMARY:{_ics_text(event_title)}")
+                + (_ics_line(f"CATEGORIES:{_ics_text(type_name)}") if type_name else "")
+                + _ics_line("END:VEVENT")
+                for event_id, event_title, day, start_time, end_time, type_name in rows)
+            written[0] += len(rows)
+            if progress is not None:
+                progress(min(99, written[0] * 100 // total))
+        file.write(_ics_line("END:VCALENDAR"))
+
+    _replace_file(path, "t", write)
+    return written[0]
+
+
+class _Cancelled(Exception):
+    pass
+
+
+@profiled("export_timetable")
+def export_timetable(db, path, fmt, date_from, date_to, event_type=None, cache=None, progress=None,
+                     is_cancelled=None):
+    if fmt not in FORMATS:
+        raise ValueError(f"Неизвестный формат расписания: {fmt}")
+    check_range(date_from, date_to)
+    title = f"Расписание: {event_type}" if event_type else "Расписание"
+    try:
+        if fmt == FORMAT_ICS:
+            events = write_ics(db, path, date_from, date_to, event_type, title, progress, is_cancelled)
+        else:
+            mondays = week_mondays(date_from, date_to)
+            layouts = []
+            for number, monday in enumerate(mondays, start=1):
+                if is_cancelled is not None and is_cancelled():
+                    raise _Cancelled()
+                layouts.append(cache.layout(db, monday, event_type) if cache is not None
+                               else build_week_layout(db, monday, event_type))
+                if progress is not None:
+                    progress(min(99, number * 100 // (len(mondays) + 1)))
+            document_html = render_html(layouts, title)
+            if fmt == FORMAT_PDF:
+                write_pdf(path, document_html)
+            else:
+                _replace_file(path, "t", lambda file: file.write(document_html))
+            events = sum(len(layout.blocks) for layout in layouts)
+    except _Cancelled:
+        return TimetableResult([], 0, True)
+    if progress is not None:
+        progress(100)
+    return TimetableResult([path], events, False)
+
+
+def _file_name(event_type, used):
+    name = re.sub(r"[^\w-]+", "_", event_type).strip("_") or "type"
+    candidate = name
+    number = 2
+    while candidate.casefold() in used:
+        candidate = f"{name}_{number}"
+        number += 1
+    used.add(candidate.casefold())
+    return candidate
+
+
+def _batch_worker(job):
+    db_path, path, fmt, date_from, date_to, event_type = job
+    db = Database(db_path)
+    try:
+        return export_timetable(db, path, fmt, date_from, date_to, event_type)
+    finally:
+        db.close()
+
+
+@profiled("export_timetables")
+def export_timetables(db, directory, fmt, date_from, date_to, event_types=None, processes=None, progress=None,
+                      is_cancelled=None):
+    # По расписанию на каждый тип; файлы рисуют процессы: PDF — работа Qt
+    # в одном потоке, а типов может быть несколько десятков
+    if fmt not in FORMATS:
+        raise ValueError(f"Неизвестный формат расписания: {fmt}")
+    check_range(date_from, date_to)
+    # Повторения разворачиваются здесь, один раз и на целые недели сетки:
+    # процессам остаётся только читать базу
+    mondays = week_mondays(date_from, date_to)
+    ensure_window(db, min(date_from, mondays[0].strftime(DATE_FORMAT)),
+                  max(date_to, (mondays[-1] + timedelta(days=6)).strftime(DATE_FORMAT)))
+    if event_types is None:
+        event_types = [name for (name,) in db.query(_TYPES_IN_RANGE_SQL, (date_from, date_to))]
+    if not event_types:
+        return TimetableResult([], 0, False)
+
+    os.makedirs(directory, exist_ok=True)
+    used = set()
+    jobs = [(os.path.abspath(db.path), os.path.join(directory, f"{_file_name(event_type, used)}.{fmt}"), fmt,
+             date_from, date_to, event_type) for event_type in event_types]
+
+    paths = []
+    events = 0
+    # spawn, как у автоподбора: форк процесса с потоками Qt и SQLite небезопасен
+    context = multiprocessing.get_context("spawn")
+    pool = context.Pool(min(processes or os.cpu_count() or 1, len(jobs)))
+    try:
+        results = pool.imap_unordered(_batch_worker, jobs)
+        for number in range(1, len(jobs) + 1):
+            while True:
+                if is_cancelled is not None and is_cancelled():
+                    pool.terminate()
+                    return TimetableResult(paths, events, True)
+                try:
+                    result = results.next(timeout=0.1)
+                    break
+                except multiprocessing.TimeoutError:
+                    continue
+            paths.extend(result.paths)
+            events += result.events
+            if progress is not None:
+                progress(min(99, number * 100 // len(jobs)))
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+    if progress is not None:
+        progress(100)
+    return TimetableResult(sorted(paths), events, False)
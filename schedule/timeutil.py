@@ -0,0 +1,81 @@
+from functools import lru_cache
+from datetime import date, datetime, timedelta
+
+DATE_FORMAT = "%Y-%m-%d"
+TIME_FORMAT = "%H:%M:%S"
+
+_DATE_INPUT_FORMATS = ("%Y-%m-%d", "%d.%m.%Y", "%Y/%m/%d")
+_TIME_INPUT_FORMATS = ("%H:%M:%S", "%H:%M", "%H.%M")
+
+DAY_NAMES = ("пн", "вт", "ср", "чт", "пт", "сб", "вс")
+
+# Вместо calendar.timegm: модуль calendar тянет за собой locale и замедляет запуск
+_EPOCH = datetime(1970, 1, 1)
+_SECOND = timedelta(seconds=1)
+
+
+# Дат и времён в расписании немного, поэтому разбор кэшируется
+@lru_cache(maxsize=8192)
+def normalize_date(value):
+    value = value.strip()
+    for fmt in _DATE_INPUT_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).strftime(DATE_FORMAT)
+        except ValueError:
+            continue
+    raise ValueError(f"Некорректная дата: {value!r}")
+
+
+@lru_cache(maxsize=8192)
+def normalize_time(value):
+    value = value.strip()
+    for fmt in _TIME_INPUT_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).strftime(TIME_FORMAT)
+        except ValueError:
+            continue
+    raise ValueError(f"Некорректное время: {value!r}")
+
+
+def time_to_minutes(value):
+    hours, minutes = value.split(":")[:2]
+    return int(hours) * 60 + int(minutes)
+
+
+def minutes_to_time(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}:00"
+
+
+# Эпоха считается от локального времени без учёта часового пояса,
+# так же как колонка start_ts в базе (strftime('%s', date || ' ' || start_time))
+def to_epoch(date, time):
+    return (datetime.strptime(f"{date} {time}", f"{DATE_FORMAT} {TIME_FORMAT}") - _EPOCH) // _SECOND
+
+
+def from_epoch(epoch):
+    return _EPOCH + timedelta(seconds=epoch)
+
+
+def now_epoch():
+    return (datetime.now().replace(microsecond=0) - _EPOCH) // _SECOND
+
+
+def time_to_seconds(value):
+    hours, minutes, seconds = value.split(":")
+    return int(hours) * 3600 + int(minutes) * 60 + int(seconds)
+
+
+def seconds_to_time(seconds):
+    return f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+# Дата как число дней от 1970-01-01 (см. schedule.snapshot)
+@lru_cache(maxsize=8192)
+def days_to_date(days):
+    return (_EPOCH + timedelta(days=days)).strftime(DATE_FORMAT)
+
+
+def week_start(value):
+    # Понедельник недели, в которую попадает дата
+    day = date.fromisoformat(normalize_date(value))
+    return day - timedelta(days=day.weekday())
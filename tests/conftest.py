@@ -0,0 +1,24 @@
+import os
+import shutil
+
+import pytest
+
+from schedule import repository
+
+BASELINE_DB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "db", "schedule.db")
+
+
+@pytest.fixture
+def db(tmp_path):
+    # Пустая база с актуальной схемой
+    db = repository.open_database(str(tmp_path / "schedule.db"))
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def baseline_path(tmp_path):
+    # Копия базы из репозитория в исходном виде: тип — текстом, без миграций
+    path = tmp_path / "baseline.db"
+    shutil.copyfile(BASELINE_DB, path)
+    return str(path)
@@ -0,0 +1,67 @@
+import csv
+
+import pytest
+
+from schedule import repository
+from schedule.changes import ChangeWatcher
+from schedule.db import CHANGE_ADDED, CHANGE_DELETED, CHANGE_RELOADED, CHANGE_UPDATED, Database
+from schedule.exporter import HEADER
+from schedule.importer import import_csv
+
+
+@pytest.fixture
+def watched(db):
+    # Вторая копия приложения — отдельный объект Database с тем же файлом
+    other = Database(db.path)
+    watcher = ChangeWatcher(db)
+    changes = []
+    db.add_listener(lambda kind, event_ids: changes.append((kind, event_ids)))
+    yield db, other, watcher, changes
+    other.close()
+
+
+def test_changes_from_another_copy(watched):
+    db, other, watcher, changes = watched
+    assert watcher.poll() == set()
+
+    first = repository.add_event(other, "Лекция", "2024-09-02", "09:00:00", "10:00:00", None)
+    second = repository.add_event(other, "Практика", "2024-09-02", "10:00:00", "11:00:00", None)
+    assert watcher.poll() == {first, second}
+    assert changes == [(CHANGE_ADDED, (first, second))]
+
+    changes.clear()
+    repository.update_event(other, first, "Лекция", "2024-09-03", "09:00:00", "10:00:00", None)
+    repository.delete_event(other, second)
+    assert watcher.poll() == {first, second}
+    assert changes == [(CHANGE_DELETED, (second,)), (CHANGE_UPDATED, (first,))]
+
+
+def test_own_changes_are_not_applied_twice(watched):
+    db, other, watcher, changes = watched
+    own = repository.add_event(db, "Своё", "2024-09-02", "09:00:00", "10:00:00", None)
+    foreign = repository.add_event(other, "Чужое", "2024-09-02", "10:00:00", "11:00:00", None)
+    changes.clear()
+    assert watcher.poll() == {foreign}
+    assert changes == [(CHANGE_ADDED, (foreign,))]
+    assert own not in watcher.poll()
+
+
+def test_import_in_another_copy_reloads(watched, tmp_path):
+    db, other, watcher, changes = watched
+    path = tmp_path / "events.csv"
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        csv.writer(file).writerows([HEADER, ["", "Импорт", "2024-09-02", "09:00", "10:00", ""]])
+    import_csv(other, str(path))
+    assert watcher.poll() is None
+    assert changes == [(CHANGE_RELOADED, ())]
+
+
+def test_pruned_log_reloads(watched, monkeypatch):
+    db, other, watcher, changes = watched
+    for number in range(3):
+        repository.add_event(other, f"Событие {number}", "2024-09-02", "09:00:00", "10:00:00", None)
+    # Другая копия удалила из журнала записи, которые этот процесс ещё не прочитал
+    monkeypatch.setattr("schedule.changes.CHANGE_LOG_KEEP", 1)
+    ChangeWatcher(other).prune()
+    assert watcher.poll() is None
+    assert changes == [(CHANGE_RELOADED, ())]
@@ -0,0 +1,56 @@
+from schedule import repository
+from schedule.conflicts import find_all_conflicts
+from schedule.recurrence import parse_rrule
+from schedule.timeutil import seconds_to_time
+
+
+def test_find_all_conflicts(db):
+    first, second, _, _ = repository.add_events(db, [
+        ("Лекция", "2024-09-02", "09:00:00", "10:30:00", "Лекция"),
+        ("Практика", "2024-09-02", "10:00:00", "11:00:00", "Практика"),
+        ("Семинар", "2024-09-02", "11:00:00", "12:00:00", "Лекция"),
+        ("Лекция", "2024-09-03", "09:30:00", "10:00:00", "Лекция"),
+    ])
+    conflicts = find_all_conflicts(db)
+    assert [(conflict.date, conflict.first.event_id, conflict.second.event_id) for conflict in conflicts] == [
+        ("2024-09-02", first, second)]
+    assert find_all_conflicts(db, by_type=True) == []
+
+
+def test_find_all_conflicts_checks_cancel_within_a_day(db):
+    # Двенадцать тысяч событий подряд в один день: отмена проверяется каждые
+    # 5000 строк, а не только когда меняется дата
+    start = 8 * 3600
+    repository.add_events(db, [("Пара", "2024-09-02", seconds_to_time(start + number),
+                                seconds_to_time(start + number + 1), None) for number in range(12000)])
+    checks = []
+    reported = []
+
+    def is_cancelled():
+        checks.append(None)
+        return False
+
+    assert find_all_conflicts(db, progress=reported.append, is_cancelled=is_cancelled) == []
+    assert len(checks) == 3
+    assert reported == [0, 41, 83, 100]
+
+    assert find_all_conflicts(db, is_cancelled=lambda: len(checks) > 3 or checks.append(None)) is None
+
+
+def test_find_all_conflicts_with_one_bound(db):
+    repository.add_events(db, [
+        ("Лекция", day, start, end, None)
+        for day in ("2024-01-15", "2024-02-15", "2024-03-15")
+        for start, end in (("09:00:00", "10:00:00"), ("09:30:00", "10:30:00"))
+    ])
+    assert [conflict.date for conflict in find_all_conflicts(db, date_from="2024-02-01")] == [
+        "2024-02-15", "2024-03-15"]
+    assert [conflict.date for conflict in find_all_conflicts(db, date_to="2024-02-01")] == ["2024-01-15"]
+
+
+def test_find_all_conflicts_covers_series_past_last_event(db):
+    rule = parse_rrule("FREQ=WEEKLY;COUNT=10")
+    repository.add_event(db, "Лекция", "2024-09-02", "09:00:00", "10:00:00", None, rule)
+    repository.add_event(db, "Практика", "2024-09-02", "09:30:00", "10:30:00", None, rule)
+    assert len(find_all_conflicts(db)) == 10
+    assert len(find_all_conflicts(db, date_from="2024-10-01")) == 5
@@ -0,0 +1,35 @@
+from schedule.event_store import EventStore
+
+ROWS = [(event_id, f"Событие {event_id % 4}", f"2024-09-{event_id % 3 + 1:02d}", "09:00:00", "10:00:00", None)
+        for event_id in range(1, 21)]
+
+
+def _sorted(rows, fields):
+    index = {"event_id": 0, "title": 1, "date": 2}
+    return sorted(rows, key=lambda row: tuple(row[index[field]] for field in fields))
+
+
+def test_positions_follow_inserts_and_removes():
+    fields = ["title", "event_id"]
+    store = EventStore()
+    store.load(_sorted(ROWS, fields))
+    assert store.positions(7, fields) == [[row[0] for row in _sorted(ROWS, fields)].index(7)]
+
+    row = (21, "Событие 0", "2024-09-05", "08:00:00", "09:00:00", None)
+    store.insert(store.insert_position(row, fields), row)
+    position = store.positions(7, fields)[0]
+    store.remove(position)
+    assert store.positions(7, fields) == []
+
+    expected = _sorted([row] + [other for other in ROWS if other[0] != 7], fields)
+    assert [store[index].event_id for index in range(len(store))] == [other[0] for other in expected]
+    for other in expected:
+        assert store.positions(other[0], fields) == [expected.index(other)]
+
+
+def test_positions_of_repeated_event():
+    fields = ["date", "event_id"]
+    rows = _sorted(ROWS + [(5, "Событие 1", "2024-09-04", "09:00:00", "10:00:00", None)], fields)
+    store = EventStore()
+    store.load(rows)
+    assert store.positions(5, fields) == [index for index, row in enumerate(rows) if row[0] == 5]
@@ -0,0 +1,89 @@
+import csv
+
+import pytest
+
+from schedule import repository
+from schedule.conflicts import make_import_validator
+from schedule.exporter import HEADER
+from schedule.importer import POLICY_RENUMBER, POLICY_SKIP, POLICY_UPSERT, import_csv
+
+
+def _write_csv(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(HEADER)
+        writer.writerows(rows)
+    return str(path)
+
+
+@pytest.fixture
+def existing_db(db):
+    repository.add_event(db, "Лекция", "2024-09-02", "09:00:00", "10:00:00", "Лекция")
+    return db
+
+
+def _titles(db):
+    return db.query("SELECT event_id, title FROM events ORDER BY event_id")
+
+
+@pytest.mark.parametrize("policy, expected", [
+    (POLICY_SKIP, [(1, "Лекция"), (2, "Новое")]),
+    (POLICY_UPSERT, [(1, "Замена"), (2, "Новое")]),
+    (POLICY_RENUMBER, [(1, "Лекция"), (2, "Новое"), (3, "Замена")]),
+])
+def test_import_policies(existing_db, tmp_path, policy, expected):
+    path = _write_csv(tmp_path / "events.csv", [
+        ["1", "Замена", "2024-09-02", "11:00", "12:00", "Практика"],
+        ["2", "Новое", "03.09.2024", "09:00", "10:00", ""],
+    ])
+    result = import_csv(existing_db, path, policy)
+    assert result.read == 2 and not result.errors
+    assert _titles(existing_db) == expected
+
+
+def test_import_reports_invalid_rows(db, tmp_path):
+    path = _write_csv(tmp_path / "events.csv", [
+        ["", "Верная", "2024-09-02", "09:00", "10:00", "Лекция", "FREQ=WEEKLY;COUNT=2"],
+        ["x", "Плохой ID", "2024-09-02", "09:00", "10:00", ""],
+        ["", "", "2024-09-02", "09:00", "10:00", ""],
+        ["", "Наоборот", "2024-09-02", "10:00", "09:00", ""],
+        ["", "Мало колонок"],
+    ])
+    result = import_csv(db, path)
+    assert (result.read, result.written) == (5, 1)
+    assert [error.line for error in result.errors] == [3, 4, 5, 6]
+    assert db.query_one("SELECT rrule FROM recurrence_rules")[0] == "FREQ=WEEKLY;COUNT=2"
+
+
+def test_unknown_policy(db, tmp_path):
+    with pytest.raises(ValueError):
+        import_csv(db, _write_csv(tmp_path / "events.csv", []), "merge")
+
+
+def test_validator_rejects_overlaps(existing_db, tmp_path):
+    path = _write_csv(tmp_path / "events.csv", [
+        ["", "С базой", "2024-09-02", "09:30", "10:30", "Практика"],
+        ["", "Свободно", "2024-09-02", "10:00", "11:00", "Практика"],
+        ["", "С пачкой", "2024-09-02", "10:30", "11:30", "Практика"],
+        ["1", "Своё место", "2024-09-02", "09:00", "10:00", "Лекция"],
+    ])
+    result = import_csv(existing_db, path, POLICY_UPSERT, validate=make_import_validator(existing_db))
+    assert [error.line for error in result.errors] == [2, 4]
+    assert _titles(existing_db) == [(1, "Своё место"), (2, "Свободно")]
+
+
+def test_validator_by_type(existing_db, tmp_path):
+    path = _write_csv(tmp_path / "events.csv", [
+        ["", "Другой тип", "2024-09-02", "09:30", "10:30", "Практика"],
+        ["", "Тот же тип", "2024-09-02", "09:30", "10:30", "Лекция"],
+    ])
+    result = import_csv(existing_db, path, validate=make_import_validator(existing_db, by_type=True))
+    assert [error.line for error in result.errors] == [3]
+    assert result.written == 1
+
+
+def test_cancelled_import_changes_nothing(existing_db, tmp_path):
+    path = _write_csv(tmp_path / "events.csv", [["", "Новое", "2024-09-03", "09:00", "10:00", ""]])
+    result = import_csv(existing_db, path, is_cancelled=lambda: True)
+    assert result.cancelled
+    assert _titles(existing_db) == [(1, "Лекция")]
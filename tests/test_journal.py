@@ -0,0 +1,75 @@
+from schedule import repository
+from schedule.journal import Journal
+from schedule.recurrence import get_rule, parse_rrule
+
+
+def _events(db):
+    return db.query("SELECT event_id, title, date, start_time, end_time FROM events ORDER BY event_id")
+
+
+def test_undo_and_redo_restore_each_step(db):
+    journal = Journal(db)
+    with journal.command("Добавление"):
+        event_id = repository.add_event(db, "Лекция", "2024-09-02", "09:00:00", "10:00:00", None)
+    added = _events(db)
+    with journal.command("Изменение"):
+        repository.update_event(db, event_id, "Практика", "2024-09-03", "11:00:00", "12:00:00", None)
+    changed = _events(db)
+    with journal.command("Удаление"):
+        repository.delete_event(db, event_id)
+
+    assert journal.undo() == "Удаление"
+    assert _events(db) == changed
+    assert journal.undo() == "Изменение"
+    assert _events(db) == added
+    assert journal.redo() == "Изменение"
+    assert _events(db) == changed
+    assert journal.undo() == "Изменение"
+    assert journal.undo() == "Добавление"
+    assert _events(db) == []
+    assert not journal.can_undo() and journal.can_redo()
+
+
+def test_undo_restores_recurrence_rule(db):
+    journal = Journal(db)
+    rule = parse_rrule("FREQ=WEEKLY;COUNT=4")
+    event_id = repository.add_event(db, "Йога", "2024-09-02", "09:00:00", "10:00:00", None, rule)
+    with journal.command("Удаление"):
+        repository.delete_event(db, event_id)
+    journal.undo()
+    assert get_rule(db, event_id) == rule
+
+
+def test_new_command_clears_redo_and_limit_drops_oldest(db):
+    journal = Journal(db, limit=2)
+    for number in range(3):
+        with journal.command(f"Шаг {number}"):
+            repository.add_event(db, f"Событие {number}", "2024-09-02", "09:00:00", "10:00:00", None)
+    assert journal.undo() == "Шаг 2"
+    with journal.command("Ещё"):
+        repository.add_event(db, "Ещё", "2024-09-02", "09:00:00", "10:00:00", None)
+    assert not journal.can_redo()
+    assert [journal.undo(), journal.undo(), journal.undo()] == ["Ещё", "Шаг 1", None]
+
+
+def test_failed_command_records_nothing(db):
+    journal = Journal(db)
+    try:
+        with journal.command("Ошибка"):
+            repository.add_event(db, "Лекция", "2024-09-02", "09:00:00", "10:00:00", None)
+            raise RuntimeError
+    except RuntimeError:
+        pass
+    assert not journal.can_undo()
+    assert _events(db) == []
+
+
+def test_touches(db):
+    journal = Journal(db)
+    other = repository.add_event(db, "Вне журнала", "2024-09-02", "09:00:00", "10:00:00", None)
+    with journal.command("Добавление"):
+        event_id = repository.add_event(db, "Лекция", "2024-09-02", "09:00:00", "10:00:00", None)
+    assert journal.touches({event_id})
+    assert not journal.touches({other})
+    journal.clear()
+    assert not journal.touches({event_id}) and not journal.can_undo()
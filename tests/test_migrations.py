@@ -0,0 +1,33 @@
+from schedule.db import Database
+from schedule.migrations import MIGRATIONS, migrate, schema_version
+
+
+def test_migrate_baseline_database(baseline_path):
+    db = Database(baseline_path)
+    try:
+        assert schema_version(db) == 0
+        assert migrate(db) == len(MIGRATIONS)
+        rows = db.query("""
+            SELECT e.event_id, e.title, e.date, e.start_time, e.end_time, t.name
+            FROM events e LEFT JOIN event_types t USING (type_id) ORDER BY e.event_id
+        """)
+        assert rows == [
+            (1, "Методы и средства проектирования", "2024-12-12", "13:49:40", "14:49:40", "Лекция"),
+            (2, "Оценка опыта пользователей", "2024-12-13", "14:50:07", "15:50:07", "Практика"),
+            (3, "Виртуальная реальность", "2024-12-13", "15:50:26", "16:50:26", "Лабораторная"),
+        ]
+        # Повторный запуск ничего не меняет
+        assert migrate(db) == len(MIGRATIONS)
+        assert db.query_one("PRAGMA integrity_check")[0] == "ok"
+    finally:
+        db.close()
+
+
+def test_migrate_keeps_unparseable_dates(baseline_path):
+    db = Database(baseline_path)
+    try:
+        db.connection().execute("UPDATE events SET date = '12 дек' WHERE event_id = 2")
+        migrate(db)
+        assert db.query_one("SELECT date FROM events WHERE event_id = 2")[0] == "12 дек"
+    finally:
+        db.close()
@@ -0,0 +1,46 @@
+import pytest
+
+from schedule import repository
+from schedule.query import EventQuery
+from schedule.recurrence import ensure_window, parse_rrule
+
+EVENTS = [(f"Событие {number % 7}", f"2024-09-{number % 5 + 1:02d}", f"{8 + number % 4:02d}:00:00",
+           f"{12 + number % 3:02d}:00:00", None if number % 3 == 0 else f"Тип {number % 2}") for number in range(40)]
+
+
+@pytest.fixture
+def events_db(db):
+    repository.add_events(db, EVENTS)
+    repository.add_event(db, "Йога", "2024-09-02", "09:00:00", "10:00:00", None, parse_rrule("FREQ=DAILY;COUNT=3"))
+    return db
+
+
+def _pages(db, query, size):
+    rows = []
+    after = None
+    while True:
+        page = db.query(*query.compile(after=after, limit=size))
+        rows.extend(page)
+        if len(page) < size:
+            return rows
+        after = query.page_key(page[-1])
+
+
+@pytest.mark.parametrize("field", ["event_id", "title", "date", "start_time", "end_time", "type_id"])
+@pytest.mark.parametrize("descending", [False, True])
+def test_keyset_pages_match_full_query(events_db, field, descending):
+    query = EventQuery().sorted_by(field, descending)
+    assert _pages(events_db, query, 6) == events_db.query(*query.compile())
+
+
+def test_keyset_pages_with_date_window(events_db):
+    query = EventQuery().dates("2024-09-02", "2024-09-04").sorted_by("title")
+    ensure_window(events_db, *query.window)
+    rows = _pages(events_db, query, 5)
+    assert rows == events_db.query(*query.compile())
+    assert [row[2] for row in rows if row[1] == "Йога"] == ["2024-09-02", "2024-09-03", "2024-09-04"]
+
+
+def test_unknown_sort_field(events_db):
+    with pytest.raises(ValueError):
+        EventQuery().sorted_by("location")
@@ -0,0 +1,61 @@
+from datetime import date
+
+import pytest
+
+from schedule import repository
+from schedule.query import EventQuery
+from schedule.recurrence import ensure_window, expand, format_rrule, parse_rrule, series_end
+
+
+def test_parse_rrule_round_trip():
+    rule = parse_rrule("FREQ=WEEKLY;INTERVAL=2;BYDAY=WE,MO;UNTIL=20250601;EXDATE=20250310")
+    assert rule.freq == "WEEKLY"
+    assert rule.interval == 2
+    assert rule.by_weekday == (0, 2)
+    assert rule.until == date(2025, 6, 1)
+    assert rule.exdates == {date(2025, 3, 10)}
+    assert parse_rrule(format_rrule(rule)) == rule
+
+
+@pytest.mark.parametrize("text", ["FREQ=MONTHLY", "FREQ=WEEKLY;INTERVAL=0", "FREQ=WEEKLY;BYDAY=XX", "FREQ"])
+def test_parse_rrule_rejects_invalid(text):
+    with pytest.raises(ValueError):
+        parse_rrule(text)
+
+
+def test_expand_weekly_by_days():
+    rule = parse_rrule("FREQ=WEEKLY;BYDAY=MO,TH")
+    assert expand(rule, "2024-09-05", "2024-09-01", "2024-09-16") == [
+        date(2024, 9, 5), date(2024, 9, 9), date(2024, 9, 12), date(2024, 9, 16)]
+
+
+def test_expand_count_is_counted_from_series_start():
+    rule = parse_rrule("FREQ=DAILY;INTERVAL=2;COUNT=4")
+    assert expand(rule, "2024-09-01", "2024-09-04", "2024-12-31") == [date(2024, 9, 5), date(2024, 9, 7)]
+    assert series_end(rule, "2024-09-01") == date(2024, 9, 7)
+
+
+def test_expand_skips_exdates_and_stops_at_until():
+    rule = parse_rrule("FREQ=WEEKLY;UNTIL=20240923;EXDATE=20240909")
+    assert expand(rule, "2024-09-02", "2024-01-01", "2025-01-01") == [
+        date(2024, 9, 2), date(2024, 9, 16), date(2024, 9, 23)]
+
+
+def test_ensure_window_with_open_sides(db):
+    repository.add_event(db, "Йога", "2024-09-02", "09:00:00", "10:00:00", None, parse_rrule("FREQ=WEEKLY"))
+    repository.add_event(db, "Зачёт", "2024-12-02", "09:00:00", "10:00:00", None)
+
+    ensure_window(db, None, "2024-09-30")
+    ensure_window(db, "2024-11-01", None)
+    days = [row[0] for row in db.query("SELECT date FROM event_occurrences ORDER BY date")]
+    # Бесконечная серия доходит только до последней даты в расписании
+    assert days[0] == "2024-09-09"
+    assert days[-1] == "2024-12-02"
+
+
+def test_date_filter_with_one_bound_includes_occurrences(db):
+    repository.add_event(db, "Йога", "2024-09-02", "09:00:00", "10:00:00", None, parse_rrule("FREQ=WEEKLY;COUNT=3"))
+    after = list(repository.iter_events(db, EventQuery().dates("2024-09-05", None)))
+    before = list(repository.iter_events(db, EventQuery().dates(None, "2024-09-10")))
+    assert [event.date for event in after] == ["2024-09-09", "2024-09-16"]
+    assert [event.date for event in before] == ["2024-09-02", "2024-09-09"]
@@ -0,0 +1,48 @@
+from schedule import repository
+from schedule.recurrence import parse_rrule
+from schedule.reminders import REMINDER_LEAD, ReminderQueue
+from schedule.timeutil import to_epoch
+
+NOW = to_epoch("2024-09-02", "08:00:00")
+
+
+def test_reminders_fire_once_before_start(db):
+    first = repository.add_event(db, "Лекция", "2024-09-02", "09:00:00", "10:00:00", None)
+    second = repository.add_event(db, "Практика", "2024-09-02", "08:10:00", "09:00:00", None)
+    repository.add_event(db, "Прошло", "2024-09-02", "07:00:00", "07:30:00", None)
+    queue = ReminderQueue(db)
+    queue.reload(NOW)
+
+    assert queue.next_due() == to_epoch("2024-09-02", "08:10:00") - REMINDER_LEAD
+    assert queue.pop_due(NOW) == [(second, "Практика", to_epoch("2024-09-02", "08:10:00"))]
+    assert queue.pop_due(NOW) == []
+    start = to_epoch("2024-09-02", "09:00:00")
+    assert queue.pop_due(start - REMINDER_LEAD - 1) == []
+    assert queue.pop_due(start - REMINDER_LEAD) == [(first, "Лекция", start)]
+    assert queue.next_due() is None
+
+
+def test_reminders_follow_changes(db):
+    event_id = repository.add_event(db, "Лекция", "2024-09-02", "09:00:00", "10:00:00", None)
+    deleted = repository.add_event(db, "Отменено", "2024-09-02", "08:30:00", "09:00:00", None)
+    queue = ReminderQueue(db)
+    queue.reload(NOW)
+
+    moved = to_epoch("2024-09-02", "11:00:00")
+    queue.event_changed(event_id, "Перенесено", moved, NOW)
+    queue.event_deleted(deleted)
+    assert len(queue) == 1
+    assert queue.pop_due(to_epoch("2024-09-02", "10:00:00")) == []
+    assert queue.pop_due(moved - REMINDER_LEAD) == [(event_id, "Перенесено", moved)]
+
+
+def test_reminders_include_occurrences_and_load_in_batches(db):
+    event_id = repository.add_event(db, "Йога", "2024-09-01", "09:00:00", "10:00:00", None,
+                                    parse_rrule("FREQ=DAILY"))
+    queue = ReminderQueue(db, batch=2, window_days=3)
+    queue.reload(NOW)
+    fired = []
+    for day in ("2024-09-02", "2024-09-03", "2024-09-04"):
+        fired += queue.pop_due(to_epoch(day, "08:50:00"))
+    assert fired == [(event_id, "Йога", to_epoch(day, "09:00:00")) for day in ("2024-09-02", "2024-09-03",
+                                                                             "2024-09-04")]
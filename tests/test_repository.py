@@ -0,0 +1,53 @@
+import pytest
+
+from schedule import repository
+from schedule.db import CHANGE_DELETED, CHANGE_UPDATED
+from schedule.repository import LARGE_SELECTION
+
+
+# Небольшая выборка идёт через json_each, большая — через временную таблицу
+@pytest.fixture(params=[3, LARGE_SELECTION + 5], ids=["json", "temp-table"])
+def selection(db, request):
+    event_ids = repository.add_events(db, [(f"Событие {number}", "2024-09-02", "09:00:00", "10:00:00", "Лекция")
+                                           for number in range(request.param)])
+    other = repository.add_event(db, "Не выбрано", "2024-09-02", "09:00:00", "10:00:00", "Лекция")
+    changes = []
+    db.add_listener(lambda kind, ids: changes.append((kind, len(ids))))
+    return db, event_ids, other, changes
+
+
+def _column(db, column, event_ids):
+    return {row[0] for row in db.query(f"SELECT DISTINCT {column} FROM events WHERE event_id IN "
+                                       f"(SELECT value FROM json_each(?))", (str(list(event_ids)),))}
+
+
+def test_shift_and_move_events(selection):
+    db, event_ids, other, changes = selection
+    repository.shift_events(db, event_ids, 90)
+    repository.move_events(db, event_ids, "2024-09-05")
+    assert db.query("SELECT DISTINCT date, start_time, end_time FROM events WHERE event_id != ?", (other,)) == [
+        ("2024-09-05", "10:30:00", "11:30:00")]
+    assert db.query_one("SELECT date, start_time FROM events WHERE event_id = ?", (other,)) == (
+        "2024-09-02", "09:00:00")
+    assert changes == [(CHANGE_UPDATED, len(event_ids))] * 2
+
+
+def test_shift_past_midnight_changes_nothing(selection):
+    db, event_ids, _, changes = selection
+    with pytest.raises(ValueError):
+        repository.shift_events(db, event_ids, 15 * 60)
+    assert _column(db, "start_time", event_ids) == {"09:00:00"}
+    assert changes == []
+    # Временная таблица выборки очищается и после ошибки
+    repository.shift_events(db, event_ids[:1], -60)
+    assert _column(db, "start_time", event_ids[:1]) == {"08:00:00"}
+
+
+def test_set_type_and_delete_events(selection):
+    db, event_ids, other, changes = selection
+    repository.set_events_type(db, event_ids, "Семинар")
+    assert db.query("SELECT DISTINCT t.name FROM events e JOIN event_types t USING (type_id) WHERE event_id != ?",
+                    (other,)) == [("Семинар",)]
+    repository.delete_events(db, event_ids)
+    assert db.query("SELECT event_id FROM events") == [(other,)]
+    assert changes == [(CHANGE_UPDATED, len(event_ids)), (CHANGE_DELETED, len(event_ids))]
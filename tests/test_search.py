@@ -0,0 +1,58 @@
+import pytest
+
+from schedule import repository
+from schedule.recurrence import parse_rrule
+from schedule.search import build_match, fts_available, parse_terms
+
+
+@pytest.fixture(params=[True, False], ids=["fts", "casefold"])
+def events_db(request, db, monkeypatch):
+    if not request.param:
+        monkeypatch.setattr("schedule.search.fts_available", lambda db: False)
+    repository.add_events(db, [
+        ("Лекция по алгебре", "2024-09-02", "09:00:00", "10:30:00", "Лекция"),
+        ("Практика по алгебре", "2024-09-03", "10:00:00", "11:00:00", "Практика"),
+        ("Алгебра, консультация", "2024-09-04", "11:00:00", "12:00:00", None),
+        ("Лекция по геометрии", "2024-09-05", "09:00:00", "10:30:00", "Лекция"),
+    ])
+    return db
+
+
+def _titles(db, **filters):
+    return sorted(event.title for event in repository.iter_events(db, repository.event_query(db, **filters)))
+
+
+def test_parse_terms_and_match():
+    assert parse_terms('алг "по геометрии"  ') == [("алг", False), ("по геометрии", True)]
+    assert build_match(title="алг", event_type='"Лекция"') == 'title : ("алг"*) AND type : ("Лекция")'
+    assert build_match() == ""
+
+
+def test_fts_index_created(db):
+    assert fts_available(db)
+
+
+def test_search_by_title_prefix_ignores_case(events_db):
+    assert _titles(events_db, title="АЛГЕБР") == [
+        "Алгебра, консультация", "Лекция по алгебре", "Практика по алгебре"]
+    assert _titles(events_db, title="лекц алг") == ["Лекция по алгебре"]
+    assert _titles(events_db, title='"по геометрии"') == ["Лекция по геометрии"]
+    assert _titles(events_db, title="химия") == []
+
+
+def test_search_by_type_and_text(events_db):
+    assert _titles(events_db, event_type="лекция") == ["Лекция по алгебре", "Лекция по геометрии"]
+    assert _titles(events_db, text="практика") == ["Практика по алгебре"]
+    assert _titles(events_db, title="алгебр", event_type="практ", date_from="2024-09-03") == [
+        "Практика по алгебре"]
+
+
+def test_search_follows_updates_and_occurrences(events_db):
+    event_id = repository.add_event(events_db, "Йога", "2024-09-02", "07:00:00", "08:00:00", "Спорт",
+                                    parse_rrule("FREQ=DAILY;COUNT=3"))
+    assert _titles(events_db, title="йог", date_from="2024-09-01", date_to="2024-09-30") == ["Йога"] * 3
+    repository.update_event(events_db, event_id, "Пилатес", "2024-09-02", "07:00:00", "08:00:00", "Спорт")
+    assert _titles(events_db, title="йог") == []
+    assert _titles(events_db, title="пилатес", event_type="спорт", date_to="2024-09-02") == ["Пилатес"]
+    repository.delete_events(events_db, [event_id])
+    assert _titles(events_db, event_type="спорт") == []
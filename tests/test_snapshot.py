@@ -0,0 +1,57 @@
+import pytest
+
+from schedule import repository
+from schedule.exporter import ALL_EVENTS_QUERY
+from schedule.recurrence import parse_rrule
+from schedule.snapshot import Snapshot, export_snapshot, import_snapshot, is_snapshot
+
+
+@pytest.fixture
+def events_db(db):
+    repository.add_events(db, [
+        ("Лекция", "2024-09-02", "09:00:00", "10:30:00", "Лекция"),
+        ("Без типа", "2024-09-03", "13:05:07", "23:59:59", None),
+        ("Лекция", "1969-12-31", "08:00:00", "09:00:00", "Лекция"),
+    ])
+    repository.add_event(db, "Йога", "2024-09-02", "07:00:00", "08:00:00", "Спорт",
+                         parse_rrule("FREQ=WEEKLY;BYDAY=MO,TH;COUNT=10"))
+    return db
+
+
+def test_snapshot_round_trip(events_db, tmp_path):
+    path = str(tmp_path / "schedule.snap")
+    result = export_snapshot(events_db, path)
+    assert result.rows == 4 and not result.cancelled
+    assert is_snapshot(path)
+
+    expected = events_db.query(ALL_EVENTS_QUERY)
+    with Snapshot(path) as snapshot:
+        assert [snapshot.row(index) for index in range(len(snapshot))] == expected
+
+    target = repository.open_database(str(tmp_path / "copy.db"))
+    try:
+        assert import_snapshot(target, path).written == 4
+        assert target.query(ALL_EVENTS_QUERY) == expected
+    finally:
+        target.close()
+
+
+def test_snapshot_detects_corruption(events_db, tmp_path):
+    path = tmp_path / "schedule.snap"
+    export_snapshot(events_db, str(path))
+    data = bytearray(path.read_bytes())
+    data[-1] ^= 0xFF
+    path.write_bytes(bytes(data))
+    with pytest.raises(ValueError):
+        Snapshot(str(path))
+    path.write_bytes(bytes(data[:-1]))
+    with pytest.raises(ValueError):
+        Snapshot(str(path))
+
+
+def test_snapshot_rejects_unparseable_dates(events_db, tmp_path):
+    events_db.connection().execute("UPDATE events SET date = '12 дек' WHERE event_id = 2")
+    path = tmp_path / "schedule.snap"
+    with pytest.raises(ValueError, match="Событие 2"):
+        export_snapshot(events_db, str(path))
+    assert not path.exists()
@@ -0,0 +1,88 @@
+import pytest
+
+from schedule import repository
+from schedule.solver import (DEFAULT_DAYS, parse_days, parse_request, plan_week, read_requests,
+                             save_placements)
+from schedule.timeutil import time_to_minutes, week_start
+
+MONDAY = week_start("2024-09-04")
+
+
+def _overlaps(first, second):
+    return first.date == second.date and first.start_time < second.end_time and second.start_time < first.end_time
+
+
+def test_parse_days():
+    assert parse_days("") == DEFAULT_DAYS
+    assert parse_days("пн, ср,ПТ") == (0, 2, 4)
+    assert parse_days("пт-вс,1") == (0, 4, 5, 6)
+    for value in ("пт-пн", "8", "понедельник"):
+        with pytest.raises(ValueError):
+            parse_days(value)
+
+
+def test_parse_request():
+    requests = parse_request(["Алгебра", "1:30", "лекция", "вт", "10:00", "", "Ауд 101; ИСТ-213 ", "2"])
+    assert len(requests) == 2
+    request = requests[0]
+    assert (request.duration, request.event_type, request.days) == (90, "лекция", (1,))
+    assert (request.window_start, request.window_end) == (600, 1200)
+    assert request.resources == ("ауд 101", "ист-213")
+    for row in (["", "90"], ["Алгебра", "час"], ["Алгебра", "90", "", "", "", "", "", "0"],
+                ["Алгебра", "90", "", "", "10:00", "11:00"]):
+        with pytest.raises(ValueError):
+            parse_request(row)
+
+
+def test_read_requests_reports_line(tmp_path):
+    assert len(read_requests("static/files/tasks.csv")) == 7
+    path = tmp_path / "tasks.csv"
+    path.write_text("Название,Длительность\nАлгебра,90\n\nГеометрия,-5\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="Строка 4"):
+        read_requests(str(path))
+
+
+def test_plan_week_avoids_busy_time_and_shared_resources(db):
+    repository.add_event(db, "Занято", "2024-09-02", "08:00:00", "20:00:00", None)
+    repository.add_event(db, "Совещание", "2024-09-03", "09:00:00", "12:00:00", None)
+    requests = (parse_request(["Алгебра", "90", "Лекция", "пн-вт", "09:00", "14:00", "ауд 101", "2"])
+                + parse_request(["Физика", "60", "Лекция", "вт", "09:00", "15:00", "ауд 101"])
+                + parse_request(["Только пн", "60", "", "пн"]))
+    result = plan_week(db, requests, MONDAY, in_process=False)
+    assert not result.cancelled
+    assert [request.title for request in result.unplaced] == ["Алгебра", "Только пн"]
+    assert [(placement.title, placement.date, placement.start_time) for placement in result.placements] == [
+        ("Алгебра", "2024-09-03", "12:00:00"), ("Физика", "2024-09-03", "13:30:00")]
+    assert not _overlaps(*result.placements)
+
+
+def test_plan_week_by_type_shares_time_between_types(db):
+    repository.add_event(db, "Совещание", "2024-09-02", "09:00:00", "10:00:00", "Встреча")
+    requests = (parse_request(["Алгебра", "60", "Лекция", "пн", "09:00", "11:00"])
+                + parse_request(["Семинар", "60", "Встреча", "пн", "09:00", "11:00"]))
+    result = plan_week(db, requests, MONDAY, by_type=True, in_process=False)
+    assert [(placement.title, placement.start_time) for placement in result.placements] == [
+        ("Алгебра", "09:00:00"), ("Семинар", "10:00:00")]
+
+
+def test_plan_week_in_process_and_save(db):
+    requests = read_requests("static/files/tasks.csv")
+    result = plan_week(db, requests, MONDAY, time_budget=1.0)
+    assert not result.unplaced and len(result.placements) == len(requests)
+    for request in requests:
+        assert any(placement.title == request.title and placement.event_type == request.event_type
+                   and request.window_start <= time_to_minutes(placement.start_time)
+                   and time_to_minutes(placement.end_time) <= request.window_end
+                   for placement in result.placements)
+    for index, placement in enumerate(result.placements):
+        assert not any(_overlaps(placement, other) for other in result.placements[index + 1:])
+
+    save_placements(db, result.placements)
+    assert plan_week(db, requests, MONDAY, in_process=False).placements != result.placements
+    assert db.query_one("SELECT COUNT(*) FROM events")[0] == len(requests)
+
+
+def test_plan_week_cancelled(db):
+    requests = parse_request(["Алгебра", "90"])
+    result = plan_week(db, requests, MONDAY, in_process=False, is_cancelled=lambda: True)
+    assert result.cancelled and result.placements == [] and result.unplaced == requests
@@ -0,0 +1,27 @@
+import pytest
+
+from schedule import repository
+from schedule.timetable import FORMAT_HTML, FORMAT_ICS, build_week_layout, export_timetable, export_timetables
+from schedule.timeutil import week_start
+
+
+def test_week_layout_puts_overlaps_in_lanes(db):
+    repository.add_events(db, [
+        ("Лекция", "2024-09-02", "09:00:00", "10:30:00", "Лекция"),
+        ("Практика", "2024-09-02", "10:00:00", "11:00:00", "Практика"),
+        ("Семинар", "2024-09-04", "19:00:00", "20:00:00", None),
+    ])
+    layout = build_week_layout(db, week_start("2024-09-02"))
+    assert layout.lanes == (2, 1, 1, 1, 1, 1, 1)
+    assert [(block.title, block.day, block.lane, block.row, block.span) for block in layout.blocks] == [
+        ("Лекция", 0, 0, 2, 3), ("Практика", 0, 1, 4, 2), ("Семинар", 2, 0, 22, 2)]
+
+
+@pytest.mark.parametrize("fmt", [FORMAT_HTML, FORMAT_ICS])
+def test_timetable_rejects_reversed_range(db, tmp_path, fmt):
+    with pytest.raises(ValueError):
+        export_timetable(db, str(tmp_path / f"week.{fmt}"), fmt, "2024-12-20", "2024-12-01")
+    with pytest.raises(ValueError):
+        export_timetables(db, str(tmp_path / "out"), fmt, "2024-12-20", "2024-12-01")
+    assert not (tmp_path / f"week.{fmt}").exists()
+    assert not (tmp_path / "out").exists()